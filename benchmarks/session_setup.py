@@ -0,0 +1,77 @@
+"""Latency saved per query by setting up the session at connect time instead of SET before every query
+
+Runs the same small query through a pooled engine, once preceded by `SET search_path` / `SET TIME ZONE` (what
+TimeScaleDataFeed did on every call) and once with the settings passed when connecting, and prints p50/p99.
+
+Usage:
+    python benchmarks/session_setup.py --host localhost --port 5432 --username postgres --password postgres \\
+        --database-name datx --schema public --iterations 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+
+def measure(engine, statements, iterations: int) -> np.ndarray:
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            for statement in statements:
+                conn.execute(statement)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--username", default="postgres")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database-name", default="postgres")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--query", default="SELECT now()")
+    args = parser.parse_args()
+
+    url = URL.create(
+        "postgresql+psycopg2",
+        host=args.host,
+        port=args.port,
+        username=args.username,
+        password=args.password,
+        database=args.database_name,
+    )
+    query = text(args.query)
+    set_per_query_engine = create_engine(url)
+    connect_time_engine = create_engine(url, connect_args={"options": f"-c search_path={args.schema} -c timezone=GMT"})
+    cases = {
+        "SET per query": (
+            set_per_query_engine,
+            [text(f"SET search_path TO {args.schema}"), text("SET TIME ZONE 'GMT'"), query],
+        ),
+        "connect-time settings": (connect_time_engine, [query]),
+    }
+
+    results = {}
+    for name, (engine, statements) in cases.items():
+        # Warm up the pool so that connecting is not measured
+        measure(engine, statements, 10)
+        results[name] = measure(engine, statements, args.iterations) * 1000
+        engine.dispose()
+
+    print(f"{'case':<24}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+    for name, latencies in results.items():
+        print(f"{name:<24}{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}")
+    before, after = results["SET per query"], results["connect-time settings"]
+    saved = [np.percentile(before, q) - np.percentile(after, q) for q in (50, 99)]
+    print(f"{'saved per query':<24}{saved[0]:>10.3f}{saved[1]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Vectorised TradingCalendar methods versus the scalar ones applied row by row
+
+Usage:
+    python benchmarks/trading_calendar_many.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from common.trading_calendar import TradingCalendar
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    calendar = TradingCalendar(use_hard_coded_data=True)
+    rng = np.random.default_rng(0)
+    start = np.datetime64("2015-01-01") + rng.integers(0, 3650, args.rows).astype("timedelta64[D]")
+    df = pd.DataFrame({"start": start, "end": start + rng.integers(0, 60, args.rows).astype("timedelta64[D]")})
+
+    cases = {
+        "is_business_day": (
+            lambda: df["start"].apply(lambda d: calendar.is_business_day(d.date())),
+            lambda: calendar.is_business_day_many(df["start"]),
+        ),
+        "offset_busday": (
+            lambda: df["start"].apply(lambda d: calendar.get_offset_busday(d.date(), -1)),
+            lambda: calendar.offset_busday_many(df["start"], -1),
+        ),
+        "busday_diff": (
+            lambda: df.apply(lambda row: calendar.get_busday_diff(row["start"], row["end"]), axis=1),
+            lambda: calendar.busday_diff_many(df["start"], df["end"]),
+        ),
+    }
+
+    print(f"{'method':<20}{'scalar (s)':>12}{'many (s)':>12}{'speedup':>10}")
+    for name, (scalar, many) in cases.items():
+        scalar_time, many_time = timed(scalar), timed(many)
+        print(f"{name:<20}{scalar_time:>12.3f}{many_time:>12.4f}{scalar_time / many_time:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import datetime
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Literal, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from common.data_feed.price_volume_data_feed import PriceVolumeDataFeed
+from common.symbol_info import SymbolInfo
+from common.utils.sql_helper import arrow_to_pandas
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE_LIMIT = 5 * 1024**3
+DEFAULT_OPEN_PERIOD_TTL = 300
+
+
+def _to_datetime(value: Union[str, datetime.datetime, datetime.date]) -> datetime.datetime:
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    if not isinstance(value, datetime.datetime):
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+
+def _month_start(value: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime.datetime) -> datetime.datetime:
+    return datetime.datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _iter_months(start: datetime.datetime, end: datetime.datetime) -> List[datetime.datetime]:
+    """Return the first day of every month touched by [start, end]"""
+    months = []
+    month = _month_start(start)
+    while month <= end:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _group_runs(months: List[datetime.datetime]) -> List[Tuple[datetime.datetime, datetime.datetime]]:
+    """Group sorted month starts into contiguous [start, end) runs"""
+    runs = []
+    for month in months:
+        if runs and runs[-1][1] == month:
+            runs[-1] = (runs[-1][0], _next_month(month))
+        else:
+            runs.append((month, _next_month(month)))
+    return runs
+
+
+class CachedPriceVolumeDataFeed(PriceVolumeDataFeed):
+    """On-disk Parquet cache in front of another PriceVolumeDataFeed
+
+    Data is stored as one file per resolution/symbol/month under `cache_dir`. A query reads the cached months
+    locally and only fetches the missing ones, as few contiguous ranges as possible. A month is final once it was
+    fetched `open_period_ttl` seconds after it ended, otherwise (the current, still-open month) it is refetched when
+    its file is older than `open_period_ttl`. When the cache grows over `size_limit` bytes the least recently read
+    files are evicted. The cache size is a running total of the files written by this instance, the directory is
+    only scanned when the total goes over the limit.
+
+    Queries without symbol or start_date bypass the cache.
+    """
+
+    def __init__(
+        self,
+        data_feed: PriceVolumeDataFeed,
+        cache_dir: str,
+        size_limit: int = DEFAULT_CACHE_SIZE_LIMIT,
+        open_period_ttl: float = DEFAULT_OPEN_PERIOD_TTL,
+    ) -> None:
+        super().__init__()
+        self.data_feed = data_feed
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+        self.open_period_ttl = open_period_ttl
+        # Bytes in cache_dir, None until the first eviction scans it
+        self._cache_size: Union[int, None] = None
+        self._cache_size_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def partition_path(self, resolution: str, symbol: str, month: datetime.datetime) -> str:
+        return os.path.join(self.cache_dir, resolution, symbol, f"{month:%Y-%m}.parquet")
+
+    def is_fresh(self, path: str, month: datetime.datetime) -> bool:
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+        fetched_at = datetime.datetime.fromtimestamp(mtime, datetime.timezone.utc).replace(tzinfo=None)
+        if fetched_at >= _next_month(month) + datetime.timedelta(seconds=self.open_period_ttl):
+            return True
+        return time.time() - mtime <= self.open_period_ttl
+
+    def query_ohlcv(
+        self,
+        symbol: Union[str, List[str], None] = None,
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "day",
+        start_date: Union[str, datetime.datetime, None] = None,
+        end_date: Union[str, datetime.datetime, None] = None,
+        ascending: bool = True,
+        inclusive: Literal["both", "neither", "left", "right"] = "both",
+        order_in_db: bool = False,
+        return_as_dataframe: bool = True,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+    ) -> pd.DataFrame:
+        if symbol is None or start_date is None:
+            return self.data_feed.query_ohlcv(
+                symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db, return_as_dataframe,
+                return_type,
+            )
+
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        start_date = _to_datetime(start_date)
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        end_date = _to_datetime(end_date) if end_date is not None else now
+        months = _iter_months(start_date, min(end_date, now))
+
+        num_written = self.fill_partitions(symbols, resolution, months)
+
+        tables = []
+        for sym in symbols:
+            for month in months:
+                path = self.partition_path(resolution, sym, month)
+                # Empty partitions of the current month are not written, see _write_partitions
+                if not os.path.exists(path):
+                    continue
+                tables.append(pq.read_table(path))
+                stat = os.stat(path)
+                # Only the access time is touched, the modification time tracks when the month was fetched
+                os.utime(path, (time.time(), stat.st_mtime))
+        # The cache only grows by writes. Evict after reading, so that the partitions of this query are never the
+        # ones removed
+        if num_written:
+            self.evict()
+        res = pa.concat_tables(tables, promote_options="permissive") if tables else pa.table({})
+        if res.num_rows:
+            res = res.filter(self._time_mask(res["time"], start_date, end_date, inclusive))
+            res = res.sort_by([("time", "ascending" if ascending else "descending")])
+
+        if return_type == "arrow":
+            return res
+        df = arrow_to_pandas(res)
+        if return_as_dataframe:
+            return df
+        return list(df.itertuples(index=False, name=None))
+
+    def fill_partitions(self, symbols: List[str], resolution: str, months: List[datetime.datetime]) -> int:
+        """Fetch the missing or stale months of `symbols` and write them to the cache
+
+        Indexes and stocks are fetched separately, they are stored in different tables.
+
+        Returns:
+            int: number of partitions written
+        """
+        index_set = set(SymbolInfo.get_index_list())
+        runs_to_symbols: Dict[Tuple[bool, Tuple[Tuple[datetime.datetime, datetime.datetime], ...]], List[str]] = {}
+        for sym in symbols:
+            missing = [
+                month for month in months if not self.is_fresh(self.partition_path(resolution, sym, month), month)
+            ]
+            if missing:
+                runs_to_symbols.setdefault((sym in index_set, tuple(_group_runs(missing))), []).append(sym)
+
+        num_written = 0
+        for (_, runs), run_symbols in runs_to_symbols.items():
+            for run_start, run_end in runs:
+                logger.info(
+                    f"Fetching {resolution} ohlcv of {len(run_symbols)} symbol(s) from {run_start} to {run_end}"
+                )
+                table = self.data_feed.query_ohlcv(
+                    run_symbols, resolution, run_start, run_end, inclusive="left", return_type="arrow"
+                )
+                num_written += self._write_partitions(table, run_symbols, resolution, run_start, run_end)
+        return num_written
+
+    def _write_partitions(
+        self,
+        table: pa.Table,
+        symbols: List[str],
+        resolution: str,
+        run_start: datetime.datetime,
+        run_end: datetime.datetime,
+    ) -> int:
+        if table.num_rows:
+            year_month = pc.add(pc.multiply(pc.year(table["time"]), 100), pc.month(table["time"]))
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        num_written = 0
+        month = run_start
+        while month < run_end:
+            month_table = table
+            if table.num_rows:
+                month_table = table.filter(pc.equal(year_month, month.year * 100 + month.month))
+            for sym in symbols:
+                symbol_table = month_table
+                if month_table.num_rows:
+                    symbol_table = month_table.filter(pc.equal(month_table["symbol"], sym))
+                # Ended months without data are written empty so that they are not fetched again, the current month
+                # may still get data and is not
+                if not symbol_table.num_rows and _next_month(month) > now:
+                    continue
+                self._write_table(symbol_table, self.partition_path(resolution, sym, month))
+                num_written += 1
+            month = _next_month(month)
+        return num_written
+
+    def _write_table(self, table: pa.Table, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        pq.write_table(table, tmp_path)
+        new_size = os.stat(tmp_path).st_size
+        try:
+            old_size = os.stat(path).st_size
+        except FileNotFoundError:
+            old_size = 0
+        os.replace(tmp_path, path)
+        with self._cache_size_lock:
+            if self._cache_size is not None:
+                self._cache_size += new_size - old_size
+
+    @staticmethod
+    def _time_mask(
+        times: pa.ChunkedArray,
+        start_date: datetime.datetime,
+        end_date: datetime.datetime,
+        inclusive: Literal["both", "neither", "left", "right"],
+    ) -> pa.ChunkedArray:
+        start = pa.scalar(start_date, type=times.type)
+        end = pa.scalar(end_date, type=times.type)
+        lower = pc.greater_equal if inclusive in ("both", "left") else pc.greater
+        upper = pc.less_equal if inclusive in ("both", "right") else pc.less
+        return pc.and_(lower(times, start), upper(times, end))
+
+    def evict(self) -> None:
+        """Delete the least recently read files until the cache is under `size_limit` bytes"""
+        with self._cache_size_lock:
+            if self._cache_size is not None and self._cache_size <= self.size_limit:
+                return
+        files = []
+        total_size = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".parquet"):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append((stat.st_atime, stat.st_size, path))
+                total_size += stat.st_size
+        if total_size > self.size_limit:
+            for _, size, path in sorted(files):
+                os.remove(path)
+                total_size -= size
+                logger.debug(f"Evicted {path} from the ohlcv cache")
+                if total_size <= self.size_limit:
+                    break
+        with self._cache_size_lock:
+            self._cache_size = total_size
+
+    def invalidate(self, symbol: Union[str, List[str], None] = None, resolution: Union[str, None] = None) -> None:
+        """Delete the cached files of the given symbol(s) and/or resolution, everything by default"""
+        symbols = [symbol] if isinstance(symbol, str) else symbol
+        for root, _, names in os.walk(self.cache_dir):
+            rel_parts = os.path.relpath(root, self.cache_dir).split(os.sep)
+            if len(rel_parts) != 2:
+                continue
+            if resolution is not None and rel_parts[0] != resolution:
+                continue
+            if symbols is not None and rel_parts[1] not in symbols:
+                continue
+            for name in names:
+                os.remove(os.path.join(root, name))
+        # Rescanned by the next eviction
+        with self._cache_size_lock:
+            self._cache_size = None
@@ -0,0 +1,62 @@
+from typing import List
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "adj_ratio"]
+VOLUME_COLUMNS = ["vol", "total_vol"]
+# Prices are stored as float32 only when they are on a grid of PRICE_DECIMALS decimals that float32 preserves
+PRICE_DECIMALS = 2
+
+
+def _is_float32_lossless(column: pa.ChunkedArray, decimals: int) -> bool:
+    if column.null_count == len(column):
+        return True
+    rounded = pc.round(column, decimals)
+    on_grid = pc.less_equal(pc.abs(pc.subtract(column, rounded)), 1e-9)
+    round_trip = pc.equal(pc.round(column.cast(pa.float32()).cast(pa.float64()), decimals), rounded)
+    return pc.all(pc.and_(on_grid, round_trip)).as_py() is not False
+
+
+def _is_integral(column: pa.ChunkedArray) -> bool:
+    if column.null_count:
+        return False
+    return pc.all(pc.equal(pc.floor(column), column)).as_py() is not False
+
+
+def compact_ohlcv_table(
+    table: pa.Table,
+    price_columns: List[str] = PRICE_COLUMNS,
+    volume_columns: List[str] = VOLUME_COLUMNS,
+    decimals: int = PRICE_DECIMALS,
+) -> pa.Table:
+    """Shrink the column types of OHLCV data, usually by 2-4x in memory
+
+    - time becomes timestamp[ns, UTC], naive timestamps are in GMT
+    - symbol is dictionary-encoded, a pandas Categorical after conversion
+    - prices become float32 when every value has at most `decimals` decimals and keeps them in float32
+    - volumes become int64 when every value is integral and none is null
+
+    Args:
+        table (pa.Table): OHLCV data
+        price_columns (List[str], optional): Defaults to PRICE_COLUMNS.
+        volume_columns (List[str], optional): Defaults to VOLUME_COLUMNS.
+        decimals (int, optional): Defaults to PRICE_DECIMALS.
+
+    Returns:
+        pa.Table: the compacted table
+    """
+    columns = {}
+    for name in table.column_names:
+        column = table[name]
+        if name == "time" and pa.types.is_timestamp(column.type):
+            column = column.cast(pa.timestamp(column.type.unit, tz=column.type.tz or "UTC"))
+            column = column.cast(pa.timestamp("ns", tz="UTC"))
+        elif name == "symbol" and not pa.types.is_dictionary(column.type):
+            column = pc.dictionary_encode(column)
+        elif name in price_columns and pa.types.is_float64(column.type) and _is_float32_lossless(column, decimals):
+            column = column.cast(pa.float32())
+        elif name in volume_columns and pa.types.is_floating(column.type) and _is_integral(column):
+            column = column.cast(pa.int64())
+        columns[name] = column
+    return pa.table(columns)
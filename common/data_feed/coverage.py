@@ -0,0 +1,99 @@
+import base64
+import datetime
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class CoverageReport:
+    """Present / missing trading sessions of a set of symbols
+
+    Attributes:
+        symbols (List[str]): symbol of every row of `present`
+        sessions (np.ndarray): datetime64[D] trading sessions, the columns of `present`
+        present (np.ndarray): bool array of shape (len(symbols), len(sessions))
+        bar_counts (np.ndarray): int array of the same shape, number of bars of every symbol and session
+        resolution (str): resolution that was audited
+    """
+
+    symbols: List[str]
+    sessions: np.ndarray
+    present: np.ndarray
+    bar_counts: np.ndarray
+    resolution: str
+
+    @property
+    def coverage(self) -> pd.Series:
+        """Share of sessions present per symbol"""
+        ratio = self.present.mean(axis=1) if len(self.sessions) else np.ones(len(self.symbols))
+        return pd.Series(ratio, index=pd.Index(self.symbols, name="symbol"), name="coverage")
+
+    def missing_sessions(self, symbol: str) -> List[datetime.date]:
+        row = self.present[self.symbols.index(symbol)]
+        return self.sessions[~row].astype(datetime.date).tolist()
+
+    def gaps(self, symbol: str) -> List[Tuple[datetime.date, datetime.date]]:
+        """Return the runs of consecutive missing sessions of a symbol as (first, last) sessions, both inclusive"""
+        missing = ~self.present[self.symbols.index(symbol)]
+        edges = np.diff(np.concatenate([[False], missing, [False]]).astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        sessions = self.sessions.astype(datetime.date)
+        return [(sessions[start], sessions[end]) for start, end in zip(starts, ends)]
+
+    def to_dict(self) -> dict:
+        """Serialise to a JSON-compatible dict, `present` is stored as a packed bitmap per symbol"""
+        return {
+            "resolution": self.resolution,
+            "symbols": list(self.symbols),
+            "sessions": self.sessions.astype(str).tolist(),
+            "bitmap": [base64.b64encode(row.tobytes()).decode() for row in np.packbits(self.present, axis=1)],
+            "bar_counts": self.bar_counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CoverageReport":
+        sessions = np.array(data["sessions"], dtype="datetime64[D]")
+        packed = [np.frombuffer(base64.b64decode(row), dtype=np.uint8) for row in data["bitmap"]]
+        present = np.array([np.unpackbits(row, count=len(sessions)).astype(bool) for row in packed])
+        return cls(
+            symbols=list(data["symbols"]),
+            sessions=sessions,
+            present=present.reshape(len(data["symbols"]), len(sessions)),
+            bar_counts=np.array(data["bar_counts"], dtype=np.int64).reshape(len(data["symbols"]), len(sessions)),
+            resolution=data["resolution"],
+        )
+
+
+def build_coverage_report(
+    counts: pd.DataFrame,
+    symbols: List[str],
+    sessions: List[datetime.date] | np.ndarray,
+    resolution: str,
+    min_bars: int = 1,
+) -> CoverageReport:
+    """Scatter (symbol, session, num_bars) rows into a CoverageReport
+
+    Args:
+        counts (pd.DataFrame): symbol, session and num_bars, sessions that are not trading days are ignored
+        symbols (List[str]): symbols of the report
+        sessions (List[datetime.date] | np.ndarray): trading sessions of the report
+        resolution (str): audited resolution
+        min_bars (int, optional): a session is present when it has at least `min_bars` bars. Defaults to 1.
+
+    Returns:
+        CoverageReport
+    """
+    sessions = np.asarray(sessions, dtype="datetime64[D]")
+    bar_counts = np.zeros((len(symbols), len(sessions)), dtype=np.int64)
+    if len(counts) and len(sessions):
+        symbol_pos = pd.Index(symbols).get_indexer(counts["symbol"])
+        session_values = pd.to_datetime(counts["session"]).to_numpy().astype("datetime64[D]")
+        session_pos = np.searchsorted(sessions, session_values)
+        session_pos_clipped = np.minimum(session_pos, len(sessions) - 1)
+        known = (symbol_pos >= 0) & (session_pos < len(sessions)) & (sessions[session_pos_clipped] == session_values)
+        bar_counts[symbol_pos[known], session_pos[known]] = counts["num_bars"].to_numpy()[known]
+    return CoverageReport(list(symbols), sessions, bar_counts >= min_bars, bar_counts, resolution)
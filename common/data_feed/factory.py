@@ -1,3 +1,8 @@
+from common.data_feed.cached_data_feed import (
+    DEFAULT_CACHE_SIZE_LIMIT,
+    DEFAULT_OPEN_PERIOD_TTL,
+    CachedPriceVolumeDataFeed,
+)
 from common.data_feed.price_volume_data_feed import AsyncPriceVolumeDataFeed, PriceVolumeDataFeed
 from common.data_feed.timescale.timescale_data_feed import AsyncTimeScaleDataFeed, TimeScaleDataFeed
 
@@ -22,6 +27,36 @@ class DataFeedFactory:
         """
         return TimeScaleDataFeed(db_config, schema)
 
+    @classmethod
+    def CachedPriceVolumeDataFeed(
+        cls,
+        db_config: dict,
+        schema: str = "public",
+        cache_dir: str = ".ohlcv_cache",
+        size_limit: int = DEFAULT_CACHE_SIZE_LIMIT,
+        open_period_ttl: float = DEFAULT_OPEN_PERIOD_TTL,
+    ) -> CachedPriceVolumeDataFeed:
+        """
+        Creates a new PriceVolumeDataFeed that caches OHLCV data on disk as Parquet files, partitioned by
+        resolution/symbol/month.
+
+        Args:
+            db_config (dict): A dictionary containing the configuration details for the database, see
+                `PriceVolumeDataFeed`.
+            schema (str): The schema that contains the price volumne tables.
+            cache_dir (str): The directory of the cache files. Defaults to ".ohlcv_cache".
+            size_limit (int): The maximum size of the cache in bytes, the least recently read files are evicted
+                above it. Defaults to 5 GiB.
+            open_period_ttl (float): Seconds after which the current, still-open month is fetched again.
+                Defaults to 300.
+
+        Returns:
+            CachedPriceVolumeDataFeed: A new instance of CachedPriceVolumeDataFeed.
+        """
+        return CachedPriceVolumeDataFeed(
+            TimeScaleDataFeed(db_config, schema), cache_dir, size_limit=size_limit, open_period_ttl=open_period_ttl
+        )
+
     @classmethod
     def AsyncPriceVolumeDataFeed(cls, db_config: dict, schema: str = "public") -> AsyncPriceVolumeDataFeed:
         """
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+@dataclass
+class OHLCVPanel:
+    """Dense time x symbol OHLCV data
+
+    Attributes:
+        time (np.ndarray): sorted datetime64[us] index of the panel
+        symbols (List[str]): symbol of every column
+        fields (List[str]): field of every layer
+        values (np.ndarray): float64 array of shape (len(fields), len(time), len(symbols)), NaN where a symbol has no
+            bar at a time or the field does not exist for the symbol
+    """
+
+    time: np.ndarray
+    symbols: List[str]
+    fields: List[str]
+    values: np.ndarray
+
+    def __getitem__(self, field: str) -> pd.DataFrame:
+        """Return one field as a time x symbol DataFrame, backed by the panel without a copy"""
+        return pd.DataFrame(
+            self.values[self.fields.index(field)],
+            index=pd.DatetimeIndex(self.time, name="time"),
+            columns=pd.Index(self.symbols, name="symbol"),
+            copy=False,
+        )
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+
+def _time_values(times: pa.ChunkedArray) -> np.ndarray:
+    """Return a timestamp column as int64 microseconds, dropping the time zone (the session runs in GMT)"""
+    return times.cast(pa.timestamp("us", tz=times.type.tz)).cast(pa.int64()).to_numpy()
+
+
+def build_ohlcv_panel(tables: List[pa.Table], symbols: List[str], fields: List[str]) -> OHLCVPanel:
+    """Scatter long (time, symbol, *fields) Arrow tables into a dense OHLCVPanel
+
+    Args:
+        tables (List[pa.Table]): results to combine, a field missing from a table is left as NaN
+        symbols (List[str]): columns of the panel, rows of other symbols are ignored
+        fields (List[str]): layers of the panel
+
+    Returns:
+        OHLCVPanel: the panel
+    """
+    tables = [table for table in tables if table.num_rows]
+    table_times = [_time_values(table["time"]) for table in tables]
+    time_index = np.unique(np.concatenate(table_times)) if table_times else np.empty(0, dtype=np.int64)
+
+    values = np.full((len(fields), len(time_index), len(symbols)), np.nan)
+    symbol_set = pa.array(symbols, type=pa.string())
+    for table, times in zip(tables, table_times):
+        symbol_pos = pc.index_in(table["symbol"], value_set=symbol_set).to_numpy(zero_copy_only=False)
+        known = ~np.isnan(symbol_pos)
+        symbol_pos = symbol_pos[known].astype(np.intp)
+        time_pos = np.searchsorted(time_index, times[known])
+        for field_pos, field in enumerate(fields):
+            if field not in table.column_names:
+                continue
+            column = table[field].cast(pa.float64()).to_numpy(zero_copy_only=False)
+            values[field_pos, time_pos, symbol_pos] = column[known]
+    return OHLCVPanel(time_index.astype("datetime64[us]"), list(symbols), list(fields), values)
@@ -17,6 +17,7 @@ class PriceVolumeDataFeed(ABC):
         inclusive: Literal["both", "neither", "left", "right"] = "both",
         order_in_db: bool = False,
         return_as_dataframe: bool = True,
+        return_type: Literal["pandas", "arrow"] = "pandas",
     ) -> pd.DataFrame:
         """
         Synchronously query OHLCV data for a given symbol(s) and time range.
@@ -24,10 +25,13 @@ class PriceVolumeDataFeed(ABC):
         Args:
             symbol (Union[str, List[str], None], optional): The symbol(s) to retrieve data for. Defaults to None.
             resolution (Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"], optional): The resolution of the data to retrieve. Defaults to "day".
+                Other bucket sizes such as "10min", "2h", "3d" or "1w" are aggregated in the database.
             start_date (Union[str, datetime.datetime, None], optional): The start date of the data to retrieve. Defaults to None.
             end_date (Union[str, datetime.datetime, None], optional): The end date of the data to retrieve. Defaults to None.
             ascending (bool, optional): Whether to sort the data in ascending order. Defaults to True.
             inclusive (Literal["both", "neither", "left", "right"], optional): Whether to include the start and end dates in the retrieved data. Defaults to "both".
+            return_type (Literal["pandas", "arrow"], optional): "arrow" decodes the result columnar through COPY and
+                returns a pyarrow.Table, `return_as_dataframe` is ignored then. Defaults to "pandas".
 
         Returns:
             pd.DataFrame: A list of dictionaries containing OHLCV data for the specified symbol(s) and time range.
@@ -47,6 +51,7 @@ class AsyncPriceVolumeDataFeed(ABC):
         inclusive: Literal["both", "neither", "left", "right"] = "both",
         order_in_db: bool = False,
         return_as_dataframe: bool = True,
+        return_type: Literal["pandas", "arrow"] = "pandas",
     ):
         """
         Asynchronously query OHLCV data for a given symbol(s) and time range.
@@ -54,10 +59,13 @@ class AsyncPriceVolumeDataFeed(ABC):
         Args:
             symbol (Union[str, List[str], None], optional): The symbol(s) to query. Defaults to None.
             resolution (Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"], optional): The resolution of the data to query. Defaults to "day".
+                Other bucket sizes such as "10min", "2h", "3d" or "1w" are aggregated in the database.
             start_date (Union[str, datetime.datetime, None], optional): The start date of the time range to query. Defaults to None.
             end_date (Union[str, datetime.datetime, None], optional): The end date of the time range to query. Defaults to None.
             ascending (bool, optional): Whether to sort the data in ascending order. Defaults to True.
             inclusive (Literal["both", "neither", "left", "right"], optional): Whether to include the start and end dates in the query. Defaults to "both".
+            return_type (Literal["pandas", "arrow"], optional): "arrow" decodes the result columnar through COPY and
+                returns a pyarrow.Table, `return_as_dataframe` is ignored then. Defaults to "pandas".
 
         Returns:
             pd.DataFrame: A pandas DataFrame containing the queried OHLCV data.
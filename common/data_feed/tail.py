@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Literal
+
+import pandas as pd
+import pyarrow as pa
+
+from common.data_feed.timescale.helper import _contruct_ohlcv_query, parse_resolution
+from common.symbol_info import SymbolInfo
+from common.utils.sql_helper import arrow_to_pandas, drop_time_zone
+
+if TYPE_CHECKING:
+    from common.data_feed.timescale.timescale_data_feed import AsyncTimeScaleDataFeed, TimeScaleDataFeed
+
+logger = logging.getLogger(__name__)
+
+
+class _BaseOHLCVTail:
+    def __init__(
+        self,
+        symbols: List[str],
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "1min",
+        max_bars: int = 500,
+        start_date: datetime.datetime | None = None,
+        refresh_last_bar: bool = True,
+    ) -> None:
+        self.symbols = list(symbols)
+        self.resolution = resolution
+        self.max_bars = max_bars
+        if start_date is None:
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            start_date = now - max_bars * parse_resolution(resolution)
+        self.start_date = start_date
+        self.refresh_last_bar = refresh_last_bar
+        self.columns: List[str] | None = None
+        self.last_seen: Dict[str, datetime.datetime] = {}
+        self.buffers: Dict[str, Deque[tuple]] = {symbol: deque(maxlen=max_bars) for symbol in self.symbols}
+
+        index_set = set(SymbolInfo.get_index_list())
+        self.symbol_groups = [
+            group
+            for group in (
+                [symbol for symbol in self.symbols if symbol in index_set],
+                [symbol for symbol in self.symbols if symbol not in index_set],
+            )
+            if group
+        ]
+
+    def _build_queries(self) -> list:
+        queries = []
+        for group in self.symbol_groups:
+            since = min(self.last_seen.get(symbol, self.start_date) for symbol in group)
+            # The last seen bar is fetched again while refresh_last_bar is set, it may still be forming
+            inclusive = "left" if self.refresh_last_bar else "neither"
+            queries.append(
+                _contruct_ohlcv_query(group, self.resolution, since, inclusive=inclusive, order_in_db=False)
+            )
+        return queries
+
+    def _merge(self, tables: List[pa.Table]) -> pd.DataFrame:
+        """Merge fetched rows into the ring buffers and return the new or updated bars"""
+        tables = [drop_time_zone(table) for table in tables if table.num_rows]
+        if not tables:
+            return pd.DataFrame(columns=self.columns)
+        df = arrow_to_pandas(pa.concat_tables(tables, promote_options="permissive"))
+        df = df.sort_values("time", ignore_index=True)
+        if self.columns is None:
+            self.columns = df.columns.tolist()
+        df = df.reindex(columns=self.columns)
+
+        last_seen = pd.to_datetime(df["symbol"].map(self.last_seen))
+        keep = last_seen.isna() | (df["time"] >= last_seen if self.refresh_last_bar else df["time"] > last_seen)
+        df = df[keep.to_numpy()].reset_index(drop=True)
+        for symbol, group in df.groupby("symbol", sort=False):
+            buffer = self.buffers[symbol]
+            for row in group.itertuples(index=False, name=None):
+                if buffer and buffer[-1][0] == row[0]:
+                    buffer[-1] = row
+                else:
+                    buffer.append(row)
+            self.last_seen[symbol] = group["time"].iloc[-1]
+
+        # Symbols without any bar yet move along with the others instead of rescanning from start_date every poll
+        if len(df):
+            max_time = df["time"].iloc[-1]
+            for symbol in self.symbols:
+                self.last_seen.setdefault(symbol, max_time)
+        return df
+
+    def bars(self, symbol: str) -> pd.DataFrame:
+        """Return the last `max_bars` bars of a symbol"""
+        return pd.DataFrame(list(self.buffers[symbol]), columns=self.columns)
+
+    def snapshot(self) -> pd.DataFrame:
+        """Return the buffered bars of all symbols in one DataFrame"""
+        rows = [row for symbol in self.symbols for row in self.buffers[symbol]]
+        return pd.DataFrame(rows, columns=self.columns)
+
+
+class OHLCVTail(_BaseOHLCVTail):
+    """Incrementally follow the OHLCV bars of a set of symbols
+
+    Every `poll()` runs one query per table (index / stock) for the rows newer than the last bar seen per symbol,
+    merges them into an in-memory ring buffer of the last `max_bars` bars per symbol and returns them.
+
+    Args:
+        data_feed (TimeScaleDataFeed): the data feed to query
+        symbols (List[str]): symbols to follow, indexes and stocks can be mixed
+        resolution (str, optional): resolution of the bars. Defaults to "1min".
+        max_bars (int, optional): number of bars kept per symbol. Defaults to 500.
+        start_date (datetime.datetime | None, optional): where the first poll starts. Defaults to None, `max_bars`
+            bars before now.
+        refresh_last_bar (bool, optional): fetch the last seen bar again, for bars that are updated while they are
+            forming. Defaults to True.
+    """
+
+    def __init__(self, data_feed: "TimeScaleDataFeed", symbols: List[str], **kwargs) -> None:
+        super().__init__(symbols, **kwargs)
+        self.data_feed = data_feed
+
+    def poll(self) -> pd.DataFrame:
+        """Fetch the bars since the last poll
+
+        Returns:
+            pd.DataFrame: the new or updated bars, sorted by time
+        """
+        return self._merge([self.data_feed.query_arrow(query) for query in self._build_queries()])
+
+
+class AsyncOHLCVTail(_BaseOHLCVTail):
+    """Asynchronous OHLCVTail that can be iterated with `async for`
+
+    Each iteration waits for a wakeup and yields the new bars. The wakeup is a NOTIFY on `channel` when it is set
+    (e.g. sent by the ingestion job after each batch), with `interval` seconds as a fallback, or every `interval`
+    seconds otherwise. Iterations without new bars are skipped.
+
+    NOTE: You must close the tail by calling `await self.aclose()` after using it.
+
+    Args:
+        data_feed (AsyncTimeScaleDataFeed): the data feed to query
+        symbols (List[str]): symbols to follow, indexes and stocks can be mixed
+        interval (float, optional): seconds between polls. Defaults to 60.
+        channel (str | None, optional): LISTEN/NOTIFY channel that wakes the tail up. Defaults to None.
+        **kwargs: resolution, max_bars, start_date and refresh_last_bar, see OHLCVTail
+    """
+
+    def __init__(
+        self,
+        data_feed: "AsyncTimeScaleDataFeed",
+        symbols: List[str],
+        interval: float = 60,
+        channel: str | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(symbols, **kwargs)
+        self.data_feed = data_feed
+        self.interval = interval
+        self.channel = channel
+        self._listen_conn = None
+        self._wakeup: asyncio.Event | None = None
+
+    async def apoll(self) -> pd.DataFrame:
+        """Fetch the bars since the last poll
+
+        Returns:
+            pd.DataFrame: the new or updated bars, sorted by time
+        """
+        tables = await asyncio.gather(*[self.data_feed.aquery_arrow(query) for query in self._build_queries()])
+        return self._merge(list(tables))
+
+    async def _listen(self) -> None:
+        self._wakeup = asyncio.Event()
+        if self.channel is None:
+            return
+        self._listen_conn = await self.data_feed.engine.connect()
+        raw_conn = await self._listen_conn.get_raw_connection()
+        await raw_conn.driver_connection.add_listener(self.channel, self._on_notify)
+        logger.info(f"Listening on channel {self.channel}")
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._wakeup.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> pd.DataFrame:
+        if self._wakeup is None:
+            await self._listen()
+            # The first iteration fills the buffers right away
+            self._wakeup.set()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            df = await self.apoll()
+            if len(df):
+                return df
+
+    async def aclose(self) -> None:
+        """Stop listening for notifications"""
+        if self._listen_conn is not None:
+            raw_conn = await self._listen_conn.get_raw_connection()
+            await raw_conn.driver_connection.remove_listener(self.channel, self._on_notify)
+            await self._listen_conn.close()
+            self._listen_conn = None
@@ -1,13 +1,66 @@
 import datetime
+import re
 from typing import List, Literal
 
-from sqlalchemy import select
+from sqlalchemy import func, literal_column, select, tuple_
 from common.data_feed.timescale.table_definition import STOCK_RESOLUTION_TABLE_MAP, INDEX_RESOLUTION_TABLE_MAP
 from common.symbol_info import SymbolInfo
 import datetime as dt
 
 INDEX_SET = set(SymbolInfo.get_index_list())
 
+RESOLUTION_BUCKET_MAP = {
+    "1min": dt.timedelta(minutes=1),
+    "5min": dt.timedelta(minutes=5),
+    "15min": dt.timedelta(minutes=15),
+    "30min": dt.timedelta(minutes=30),
+    "1h": dt.timedelta(hours=1),
+    "4h": dt.timedelta(hours=4),
+    "day": dt.timedelta(days=1),
+}
+
+BUCKET_UNIT_MAP = {
+    "min": dt.timedelta(minutes=1),
+    "h": dt.timedelta(hours=1),
+    "d": dt.timedelta(days=1),
+    "day": dt.timedelta(days=1),
+    "w": dt.timedelta(weeks=1),
+    "week": dt.timedelta(weeks=1),
+}
+
+# Default origin of TimescaleDB time_bucket, buckets are aligned on it
+TIME_BUCKET_ORIGIN = dt.datetime(2000, 1, 3)
+
+# How the bars of a finer table are combined into a bucket, columns not listed here are dropped. The result types are
+# declared, so that Arrow queries know the column types without asking the database
+BUCKET_AGGREGATION_MAP = {
+    "open": lambda table: func.first(table.c.open, table.c.time, type_=table.c.open.type),
+    "high": lambda table: func.max(table.c.high),
+    "low": lambda table: func.min(table.c.low),
+    "close": lambda table: func.last(table.c.close, table.c.time, type_=table.c.close.type),
+    "vol": lambda table: func.sum(table.c.vol),
+    "total_vol": lambda table: func.sum(table.c.total_vol),
+    "adj_ratio": lambda table: func.last(table.c.adj_ratio, table.c.time, type_=table.c.adj_ratio.type),
+}
+
+
+def parse_resolution(resolution: str) -> dt.timedelta:
+    """Parse a resolution like "10min", "2h", "3d" or "1w" into its bucket size"""
+    if resolution in RESOLUTION_BUCKET_MAP:
+        return RESOLUTION_BUCKET_MAP[resolution]
+    match = re.fullmatch(r"(\d*)\s*(min|h|day|d|week|w)", resolution.strip())
+    if match is None or match.group(1) == "0":
+        raise ValueError(f"Unsupported resolution: {resolution}")
+    return int(match.group(1) or 1) * BUCKET_UNIT_MAP[match.group(2)]
+
+
+def get_source_resolution(bucket: dt.timedelta) -> str:
+    """Return the coarsest materialised resolution whose bar size divides the bucket"""
+    candidates = [res for res, size in RESOLUTION_BUCKET_MAP.items() if bucket % size == dt.timedelta(0)]
+    if not candidates:
+        raise ValueError(f"No table resolution divides the bucket {bucket}")
+    return max(candidates, key=RESOLUTION_BUCKET_MAP.get)
+
 
 def _contruct_ohlcv_query(
     symbol: str | List[str] | None = None,
@@ -17,7 +70,14 @@ def _contruct_ohlcv_query(
     ascending: bool = True,
     inclusive: Literal["both", "neither", "left", "right"] = "both",
     order_in_db: bool = True,
+    columns: List[str] | None = None,
 ):
+    bucket = None
+    if resolution not in RESOLUTION_BUCKET_MAP:
+        # Arbitrary bucket sizes are aggregated with time_bucket from the coarsest table that divides them
+        bucket = parse_resolution(resolution)
+        resolution = get_source_resolution(bucket)
+
     if isinstance(symbol, str) and symbol in INDEX_SET or isinstance(symbol, list) and symbol[0] in INDEX_SET:
         ohlcv_table = INDEX_RESOLUTION_TABLE_MAP[resolution]
     else:
@@ -47,8 +107,123 @@ def _contruct_ohlcv_query(
     elif end_date and (inclusive == "neither" or inclusive == "left"):
         where_clause.append(ohlcv_table.c.time < end_date)
 
-    query = select(ohlcv_table).where(*where_clause)
+    if columns is None:
+        columns = [col.name for col in ohlcv_table.c]
+    columns = [col for col in columns if col in ohlcv_table.c]
+    if bucket is None:
+        query = select(*[ohlcv_table.c[col] for col in columns]).where(*where_clause)
+        time_column = ohlcv_table.c.time
+    else:
+        # Rendered inline so that the GROUP BY expression matches the selected one with positional parameters too
+        bucket_interval = literal_column(f"INTERVAL '{int(bucket.total_seconds())} seconds'")
+        time_column = func.time_bucket(bucket_interval, ohlcv_table.c.time, type_=ohlcv_table.c.time.type).label("time")
+        select_columns = [time_column, ohlcv_table.c.symbol] + [
+            BUCKET_AGGREGATION_MAP[col](ohlcv_table).label(col) for col in columns if col in BUCKET_AGGREGATION_MAP
+        ]
+        query = select(*select_columns).where(*where_clause).group_by(time_column, ohlcv_table.c.symbol)
     if order_in_db:
-        order_by_clause = ohlcv_table.c.time.asc() if ascending else ohlcv_table.c.time.desc()
+        order_by_clause = time_column.asc() if ascending else time_column.desc()
         query = query.order_by(order_by_clause)
     return query
+
+
+def _construct_ohlcv_page_query(
+    symbol: str | List[str] | None = None,
+    resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "day",
+    start_date: str | datetime.datetime | None = None,
+    end_date: str | datetime.datetime | None = None,
+    inclusive: Literal["both", "neither", "left", "right"] = "both",
+    page_size: int = 100_000,
+    after: tuple | None = None,
+):
+    """Construct the query of one keyset page, ordered by (time, symbol)
+
+    Args:
+        after (tuple | None, optional): (time, symbol) of the last row of the previous page. Defaults to None, the
+            first page.
+    """
+    if after is not None:
+        # The page starts at the last seen time, so that the scan (and time_bucket aggregation) skips earlier rows
+        start_date = after[0]
+        inclusive = "both" if inclusive in ("both", "right") else "left"
+    query = _contruct_ohlcv_query(symbol, resolution, start_date, end_date, inclusive=inclusive, order_in_db=False)
+    page = query.subquery("page")
+    page_query = select(page)
+    if after is not None:
+        page_query = page_query.where(tuple_(page.c.time, page.c.symbol) > tuple_(*after))
+    return page_query.order_by(page.c.time, page.c.symbol).limit(page_size)
+
+
+def _ceil_to_bucket(value: datetime.datetime, bucket: dt.timedelta) -> datetime.datetime:
+    """Round up to the next time_bucket boundary"""
+    origin = TIME_BUCKET_ORIGIN.replace(tzinfo=value.tzinfo)
+    return origin - ((origin - value) // bucket) * bucket
+
+
+def _shard_time_range(
+    start_date: str | datetime.datetime | None,
+    end_date: str | datetime.datetime | None,
+    inclusive: Literal["both", "neither", "left", "right"],
+    time_shard: dt.timedelta | None,
+    bucket: dt.timedelta | None = None,
+) -> List[tuple]:
+    """Split [start_date, end_date] into windows of `time_shard`, inner boundaries are left-closed and right-open
+
+    With a `bucket`, inner boundaries are rounded up to the time_bucket grid, so that no bucket is aggregated in two
+    windows.
+    """
+    if time_shard is not None and time_shard <= dt.timedelta(0):
+        raise ValueError(f"time_shard must be positive, got {time_shard}")
+    if isinstance(start_date, str):
+        start_date = dt.datetime.fromisoformat(start_date)
+    if isinstance(end_date, str):
+        end_date = dt.datetime.fromisoformat(end_date)
+    if time_shard is None or start_date is None or end_date is None:
+        return [(start_date, end_date, inclusive)]
+    left_closed = inclusive in ("both", "left")
+    right_closed = inclusive in ("both", "right")
+    windows = []
+    window_start = start_date
+    while True:
+        window_end = window_start + time_shard
+        if bucket is not None:
+            window_end = _ceil_to_bucket(window_end, bucket)
+        window_end = min(window_end, end_date)
+        is_first, is_last = window_start == start_date, window_end == end_date
+        window_left_closed = left_closed if is_first else True
+        window_right_closed = right_closed if is_last else False
+        window_inclusive = {
+            (True, True): "both",
+            (True, False): "left",
+            (False, True): "right",
+            (False, False): "neither",
+        }[(window_left_closed, window_right_closed)]
+        windows.append((window_start, window_end, window_inclusive))
+        if is_last:
+            return windows
+        window_start = window_end
+
+
+def _construct_coverage_query(
+    symbols: List[str],
+    resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"],
+    start_date: datetime.date,
+    end_date: datetime.date,
+):
+    """Count the bars of every symbol and day in [start_date, end_date]"""
+    if resolution not in RESOLUTION_BUCKET_MAP:
+        resolution = get_source_resolution(parse_resolution(resolution))
+    if symbols[0] in INDEX_SET:
+        ohlcv_table = INDEX_RESOLUTION_TABLE_MAP[resolution]
+    else:
+        ohlcv_table = STOCK_RESOLUTION_TABLE_MAP[resolution]
+    session = func.time_bucket(
+        literal_column("INTERVAL '1 day'"), ohlcv_table.c.time, type_=ohlcv_table.c.time.type
+    ).label("session")
+    start_time = dt.datetime.combine(start_date, dt.time())
+    end_time = dt.datetime.combine(end_date + dt.timedelta(days=1), dt.time())
+    return (
+        select(ohlcv_table.c.symbol, session, func.count().label("num_bars"))
+        .where(ohlcv_table.c.symbol.in_(symbols), ohlcv_table.c.time >= start_time, ohlcv_table.c.time < end_time)
+        .group_by(ohlcv_table.c.symbol, session)
+    )
@@ -1,21 +1,89 @@
+import asyncio
 import datetime
-from typing import List, Literal
+import logging
+import time
+from dataclasses import dataclass
+from multiprocessing.pool import ThreadPool
+from typing import AsyncIterator, Iterator, List, Literal
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+import pyarrow as pa
+from sqlalchemy import create_engine
 from sqlalchemy.engine import URL
 from sqlalchemy.ext.asyncio import create_async_engine
 
+from common.data_feed.compact import compact_ohlcv_table
+from common.data_feed.coverage import CoverageReport, build_coverage_report
+from common.data_feed.panel import OHLCVPanel, build_ohlcv_panel
 from common.data_feed.price_volume_data_feed import AsyncPriceVolumeDataFeed, PriceVolumeDataFeed
+from common.price_adjustment import PriceAdjustment, apply_adjustment_factors
 from common.symbol_info import SymbolInfo
+from common.trading_calendar import TradingCalendar
+from common.utils.sql_helper import (
+    acopy_query_to_arrow,
+    arrow_to_pandas,
+    arrow_types_from_select,
+    copy_query_to_arrow,
+    drop_time_zone,
+    render_query,
+)
 
-from common.data_feed.timescale.helper import _contruct_ohlcv_query
+from common.data_feed.timescale.helper import (
+    RESOLUTION_BUCKET_MAP,
+    _construct_coverage_query,
+    _construct_ohlcv_page_query,
+    _contruct_ohlcv_query,
+    _shard_time_range,
+    parse_resolution,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ShardTiming:
+    """Timing of one shard of `AsyncTimeScaleDataFeed.aquery_ohlcv_many`, in seconds"""
+
+    request_index: int
+    symbols: List[str]
+    start_date: datetime.datetime | None
+    end_date: datetime.datetime | None
+    wait: float
+    elapsed: float
+    num_rows: int
+
+
+def _create_price_adjustment(db_config: dict, price_adjustment: PriceAdjustment | None) -> PriceAdjustment:
+    if price_adjustment is not None:
+        return price_adjustment
+    return PriceAdjustment({"database_type": "postgres", **db_config})
+
+
+def _to_return_type(
+    df: pd.DataFrame, return_as_dataframe: bool, return_type: Literal["pandas", "arrow"]
+) -> pd.DataFrame | pa.Table | list:
+    if return_type == "arrow":
+        return pa.Table.from_pandas(df, preserve_index=False)
+    if return_as_dataframe:
+        return df
+    return list(df.itertuples(index=False, name=None))
 
 
 class TimeScaleDataFeed(PriceVolumeDataFeed):
-    def __init__(self, db_config: dict, schema: str) -> None:
+    def __init__(
+        self,
+        db_config: dict,
+        schema: str,
+        price_adjustment: PriceAdjustment | None = None,
+        adjustment_ratio_col: str = "ratio",
+        trading_calendar: TradingCalendar | None = None,
+    ) -> None:
         super().__init__()
         self.db_config = db_config
+        self.schema = schema
+        # Tables are rendered schema-qualified and the session is set up when connecting, so that every query is a
+        # single round-trip instead of SET search_path / SET TIME ZONE first
+        self.schema_translate_map = {None: schema}
         self.engine = create_engine(
             URL.create(
                 "postgresql+psycopg2",
@@ -24,10 +92,14 @@ class TimeScaleDataFeed(PriceVolumeDataFeed):
                 username=db_config["username"],
                 password=db_config["password"],
                 database=db_config["database_name"],
-            )
+            ),
+            connect_args={"options": f"-c search_path={schema} -c timezone=GMT"},
+            execution_options={"schema_translate_map": self.schema_translate_map},
         )
-        self.schema = schema
         self.index_set = set(SymbolInfo.get_index_list())
+        self._price_adjustment = price_adjustment
+        self.adjustment_ratio_col = adjustment_ratio_col
+        self._trading_calendar = trading_calendar
 
     def query_ohlcv(
         self,
@@ -39,11 +111,38 @@ class TimeScaleDataFeed(PriceVolumeDataFeed):
         inclusive: Literal["both", "neither", "left", "right"] = "both",
         order_in_db: bool = False,
         return_as_dataframe: bool = True,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+        adjust: Literal["back", "forward"] | None = None,
+        compact: bool = False,
     ) -> pd.DataFrame:
+        """
+        See `PriceVolumeDataFeed.query_ohlcv`.
+
+        Args:
+            adjust (Literal["back", "forward"] | None, optional): Adjust open, high, low and close for the price
+                adjustment events. "back" keeps the latest prices, "forward" the earliest ones. Defaults to None.
+            compact (bool, optional): Decode through the Arrow path into compact types, see `compact_ohlcv_table`:
+                categorical symbol, float32 prices when lossless enough, int64 volumes and datetime64[ns, UTC] time.
+                A DataFrame (or a pyarrow.Table for return_type "arrow") is returned. Defaults to False.
+        """
+        if adjust is not None:
+            df = self.query_ohlcv(
+                symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db, compact=compact
+            )
+            return _to_return_type(self.adjust_ohlcv(df, adjust), return_as_dataframe, return_type)
+        if compact:
+            table = self.query_ohlcv(
+                symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db, return_type="arrow"
+            )
+            table = compact_ohlcv_table(table)
+            return table if return_type == "arrow" else arrow_to_pandas(table)
         query = _contruct_ohlcv_query(symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db)
         with self.engine.connect() as conn:
-            conn.execute(text(f"SET search_path TO {self.schema}"))
-            conn.execute(text("SET TIME ZONE 'GMT'"))
+            if return_type == "arrow":
+                res = self._copy_query_to_arrow(conn, query)
+                if not order_in_db:
+                    res = res.sort_by([("time", "ascending" if ascending else "descending")])
+                return res
             result = conn.execute(query)
             rows = result.fetchall()
             columns = result.keys()
@@ -57,11 +156,178 @@ class TimeScaleDataFeed(PriceVolumeDataFeed):
                     res = sorted(res, key=lambda x: x[0], reverse=not ascending)
         return res
 
+    @property
+    def price_adjustment(self) -> PriceAdjustment:
+        self._price_adjustment = _create_price_adjustment(self.db_config, self._price_adjustment)
+        return self._price_adjustment
+
+    @property
+    def trading_calendar(self) -> TradingCalendar:
+        if self._trading_calendar is None:
+            self._trading_calendar = TradingCalendar()
+        return self._trading_calendar
+
+    def adjust_ohlcv(self, df: pd.DataFrame, adjust: Literal["back", "forward"] = "back") -> pd.DataFrame:
+        """Adjust OHLCV data with the cached cumulative adjustment factors of its symbols, indexes are left as is"""
+        symbols = [symbol for symbol in df["symbol"].unique().tolist() if symbol not in self.index_set]
+        if not symbols:
+            return df
+        factors = self.price_adjustment.get_adjustment_factors(symbols, self.adjustment_ratio_col)
+        return apply_adjustment_factors(df, factors, adjust)
+
+    def _copy_query_to_arrow(self, conn, query) -> pa.Table:
+        cursor = conn.connection.cursor()
+        try:
+            return copy_query_to_arrow(
+                cursor,
+                render_query(cursor, query, self.engine.dialect, self.schema_translate_map),
+                column_types=arrow_types_from_select(query),
+            )
+        finally:
+            cursor.close()
+
+    def query_arrow(self, query) -> pa.Table:
+        """Run a SELECT statement on the ohlcv schema and decode the result into a pyarrow.Table through COPY"""
+        with self.engine.connect() as conn:
+            return self._copy_query_to_arrow(conn, query)
+
+    def iter_ohlcv(
+        self,
+        symbol: str | List[str] | None = None,
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "day",
+        start_date: str | datetime.datetime | None = None,
+        end_date: str | datetime.datetime | None = None,
+        inclusive: Literal["both", "neither", "left", "right"] = "both",
+        chunk_size: int = 100_000,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+    ) -> Iterator[pd.DataFrame | pa.Table]:
+        """
+        Iterate over OHLCV data in chunks ordered by (time, symbol), for ranges too large to load at once. Every chunk
+        is a separate query that continues after the (time, symbol) of the previous chunk, so memory stays bounded
+        and no cursor is held open between chunks.
+
+        Args:
+            symbol (str | List[str] | None, optional): The symbol(s) to retrieve data for. Defaults to None.
+            resolution (Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"], optional): The resolution of the data to retrieve. Defaults to "day".
+            start_date (str | datetime.datetime | None, optional): The start date of the data to retrieve. Defaults to None.
+            end_date (str | datetime.datetime | None, optional): The end date of the data to retrieve. Defaults to None.
+            inclusive (Literal["both", "neither", "left", "right"], optional): Whether to include the start and end dates in the retrieved data. Defaults to "both".
+            chunk_size (int, optional): The number of rows per chunk. Defaults to 100000.
+            return_type (Literal["pandas", "arrow"], optional): Yield DataFrames or pyarrow.Tables. Defaults to "pandas".
+
+        Yields:
+            pd.DataFrame | pa.Table: Chunks of at most `chunk_size` rows.
+        """
+        after = None
+        while True:
+            query = _construct_ohlcv_page_query(symbol, resolution, start_date, end_date, inclusive, chunk_size, after)
+            chunk = self.query_arrow(query)
+            if chunk.num_rows:
+                yield chunk if return_type == "arrow" else arrow_to_pandas(chunk)
+            if chunk.num_rows < chunk_size:
+                return
+            after = (chunk["time"][-1].as_py(), chunk["symbol"][-1].as_py())
+
+    def audit_coverage(
+        self,
+        symbols: List[str],
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "day",
+        start_date: str | datetime.date | None = None,
+        end_date: str | datetime.date | None = None,
+        min_bars: int = 1,
+    ) -> CoverageReport:
+        """
+        Audit which trading sessions have data, per symbol. The bars are counted per symbol and day with one
+        aggregated query per table (index / stock), and the counts are compared with the trading calendar.
+
+        Args:
+            symbols (List[str]): The symbols to audit, indexes and stocks can be mixed.
+            resolution (Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"], optional): The resolution to audit. Defaults to "day".
+            start_date (str | datetime.date | None, optional): The first session. Defaults to None, 30 days ago.
+            end_date (str | datetime.date | None, optional): The last session. Defaults to None, today.
+            min_bars (int, optional): The number of bars a session needs to count as present, e.g. 1 for daily bars
+                or the number of minutes of a session for 1min bars. Defaults to 1.
+
+        Returns:
+            CoverageReport: Present sessions as a bitmap per symbol, serialisable with `to_dict` so that it can be
+                cached, and the gaps per symbol for an incremental loader.
+        """
+        end_date = pd.Timestamp(end_date or datetime.date.today()).date()
+        start_date = pd.Timestamp(start_date or end_date - datetime.timedelta(days=30)).date()
+        sessions = [day.date() for day in self.trading_calendar.get_trading_days(start_date, end_date)]
+        symbol_groups = [
+            [symbol for symbol in symbols if symbol in self.index_set],
+            [symbol for symbol in symbols if symbol not in self.index_set],
+        ]
+        tables = [
+            self.query_arrow(_construct_coverage_query(group, resolution, start_date, end_date))
+            for group in symbol_groups
+            if group
+        ]
+        counts = pd.concat(
+            [arrow_to_pandas(drop_time_zone(table, "session")) for table in tables] or [pd.DataFrame()],
+            ignore_index=True,
+        )
+        return build_coverage_report(counts, symbols, sessions, resolution, min_bars)
+
+    def query_ohlcv_panel(
+        self,
+        symbols: List[str],
+        fields: List[str] | None = None,
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "day",
+        start_date: str | datetime.datetime | None = None,
+        end_date: str | datetime.datetime | None = None,
+        inclusive: Literal["both", "neither", "left", "right"] = "both",
+    ) -> OHLCVPanel:
+        """
+        Query OHLCV data of many symbols as a dense time x symbol panel. Indexes and stocks can be mixed, their
+        tables are queried concurrently and scattered straight into the panel without a long DataFrame.
+
+        Args:
+            symbols (List[str]): The symbols to retrieve data for, the columns of the panel.
+            fields (List[str] | None, optional): The fields to retrieve, the layers of the panel. A field that only
+                exists in the stock tables (e.g. total_vol) is NaN for indexes. Defaults to open, high, low, close, vol.
+            resolution (Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"], optional): The resolution of the data to retrieve. Defaults to "day".
+            start_date (str | datetime.datetime | None, optional): The start date of the data to retrieve. Defaults to None.
+            end_date (str | datetime.datetime | None, optional): The end date of the data to retrieve. Defaults to None.
+            inclusive (Literal["both", "neither", "left", "right"], optional): Whether to include the start and end dates in the retrieved data. Defaults to "both".
+
+        Returns:
+            OHLCVPanel: The panel, `panel["close"]` is a time x symbol DataFrame.
+        """
+        fields = fields or ["open", "high", "low", "close", "vol"]
+        symbol_groups = [
+            [symbol for symbol in symbols if symbol in self.index_set],
+            [symbol for symbol in symbols if symbol not in self.index_set],
+        ]
+        queries = [
+            _contruct_ohlcv_query(
+                group, resolution, start_date, end_date, inclusive=inclusive, order_in_db=False,
+                columns=["time", "symbol", *fields],
+            )
+            for group in symbol_groups
+            if group
+        ]
+        if len(queries) > 1:
+            with ThreadPool(processes=len(queries)) as pool:
+                tables = pool.map(self.query_arrow, queries)
+        else:
+            tables = [self.query_arrow(query) for query in queries]
+        return build_ohlcv_panel(tables, symbols, fields)
+
 
 class AsyncTimeScaleDataFeed(AsyncPriceVolumeDataFeed):
-    def __init__(self, db_config: dict, schema: str) -> None:
+    def __init__(
+        self,
+        db_config: dict,
+        schema: str,
+        price_adjustment: PriceAdjustment | None = None,
+        adjustment_ratio_col: str = "ratio",
+    ) -> None:
         super().__init__()
         self.db_config = db_config
+        self.schema = schema
+        self.schema_translate_map = {None: schema}
         self.engine = create_async_engine(
             URL.create(
                 "postgresql+asyncpg",
@@ -70,9 +336,18 @@ class AsyncTimeScaleDataFeed(AsyncPriceVolumeDataFeed):
                 username=db_config["username"],
                 password=db_config["password"],
                 database=db_config["database_name"],
-            )
+            ),
+            connect_args={"server_settings": {"search_path": schema, "timezone": "GMT"}},
+            execution_options={"schema_translate_map": self.schema_translate_map},
         )
-        self.schema = schema
+        self.index_set = set(SymbolInfo.get_index_list())
+        self._price_adjustment = price_adjustment
+        self.adjustment_ratio_col = adjustment_ratio_col
+
+    @property
+    def price_adjustment(self) -> PriceAdjustment:
+        self._price_adjustment = _create_price_adjustment(self.db_config, self._price_adjustment)
+        return self._price_adjustment
 
     async def close(self):
         await self.engine.dispose()
@@ -87,11 +362,38 @@ class AsyncTimeScaleDataFeed(AsyncPriceVolumeDataFeed):
         inclusive: Literal["both", "neither", "left", "right"] = "both",
         order_in_db: bool = False,
         return_as_dataframe: bool = True,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+        adjust: Literal["back", "forward"] | None = None,
+        compact: bool = False,
     ):
+        """
+        See `AsyncPriceVolumeDataFeed.aquery_ohlcv`.
+
+        Args:
+            adjust (Literal["back", "forward"] | None, optional): Adjust open, high, low and close for the price
+                adjustment events. "back" keeps the latest prices, "forward" the earliest ones. Defaults to None.
+            compact (bool, optional): Decode through the Arrow path into compact types, see `compact_ohlcv_table`:
+                categorical symbol, float32 prices when lossless enough, int64 volumes and datetime64[ns, UTC] time.
+                A DataFrame (or a pyarrow.Table for return_type "arrow") is returned. Defaults to False.
+        """
+        if adjust is not None:
+            df = await self.aquery_ohlcv(
+                symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db, compact=compact
+            )
+            return _to_return_type(await self.aadjust_ohlcv(df, adjust), return_as_dataframe, return_type)
+        if compact:
+            table = await self.aquery_ohlcv(
+                symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db, return_type="arrow"
+            )
+            table = compact_ohlcv_table(table)
+            return table if return_type == "arrow" else arrow_to_pandas(table)
         query = _contruct_ohlcv_query(symbol, resolution, start_date, end_date, ascending, inclusive, order_in_db)
         async with self.engine.connect() as conn:
-            await conn.execute(text(f"SET search_path TO {self.schema}"))
-            await conn.execute(text("SET TIME ZONE 'GMT'"))
+            if return_type == "arrow":
+                res = await self._acopy_query_to_arrow(conn, query)
+                if not order_in_db:
+                    res = res.sort_by([("time", "ascending" if ascending else "descending")])
+                return res
             result = await conn.execute(query)
             rows = result.fetchall()
             columns = result.keys()
@@ -104,3 +406,160 @@ class AsyncTimeScaleDataFeed(AsyncPriceVolumeDataFeed):
                 if not order_in_db:
                     res = sorted(res, key=lambda x: x[0], reverse=not ascending)
         return res
+
+    async def aadjust_ohlcv(self, df: pd.DataFrame, adjust: Literal["back", "forward"] = "back") -> pd.DataFrame:
+        """Adjust OHLCV data with the cached cumulative adjustment factors of its symbols, indexes are left as is"""
+        symbols = [symbol for symbol in df["symbol"].unique().tolist() if symbol not in self.index_set]
+        if not symbols:
+            return df
+        # PriceAdjustment is synchronous, its queries run in a thread to keep the event loop free
+        factors = await asyncio.to_thread(
+            self.price_adjustment.get_adjustment_factors, symbols, self.adjustment_ratio_col
+        )
+        return apply_adjustment_factors(df, factors, adjust)
+
+    async def _acopy_query_to_arrow(self, conn, query) -> pa.Table:
+        raw_conn = await conn.get_raw_connection()
+        compiled = query.compile(
+            dialect=self.engine.dialect,
+            schema_translate_map=self.schema_translate_map,
+            render_schema_translate=True,
+            compile_kwargs={"render_postcompile": True},
+        )
+        args = [compiled.params[name] for name in compiled.positiontup]
+        return await acopy_query_to_arrow(
+            raw_conn.driver_connection, str(compiled), *args, column_types=arrow_types_from_select(query)
+        )
+
+    async def aquery_arrow(self, query) -> pa.Table:
+        """Run a SELECT statement on the ohlcv schema and decode the result into a pyarrow.Table through COPY"""
+        async with self.engine.connect() as conn:
+            return await self._acopy_query_to_arrow(conn, query)
+
+    async def aquery_ohlcv_many(
+        self,
+        requests: List[dict],
+        max_concurrency: int = 5,
+        symbols_per_shard: int = 200,
+        time_shard: datetime.timedelta | None = None,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+        return_timings: bool = False,
+    ) -> List[pd.DataFrame | pa.Table] | tuple[List[pd.DataFrame | pa.Table], List[ShardTiming]]:
+        """
+        Run many OHLCV queries concurrently. Every request is split into shards of at most `symbols_per_shard`
+        symbols (indexes and stocks apart) and `time_shard` long time windows. At most `max_concurrency` shards run at
+        once, each on its own pooled connection, so keep it within the pool size (5 + 10 overflow by default).
+
+        Args:
+            requests (List[dict]): keyword arguments of `aquery_ohlcv`: symbol, resolution, start_date, end_date,
+                inclusive. Results are sorted by time.
+            max_concurrency (int, optional): The maximum number of shards queried at once. Defaults to 5.
+            symbols_per_shard (int, optional): The maximum number of symbols per shard. Defaults to 200.
+            time_shard (datetime.timedelta | None, optional): The length of the time windows, requests without both
+                start_date and end_date are not split by time. Windows of bucketed resolutions (e.g. "2h") end on
+                bucket boundaries. Defaults to None, not split by time.
+            return_type (Literal["pandas", "arrow"], optional): Return DataFrames or pyarrow.Tables. Defaults to "pandas".
+            return_timings (bool, optional): Also return the timing of every shard, to size the pool and the
+                concurrency. Defaults to False.
+
+        Returns:
+            The result of every request in order, and the shard timings when `return_timings` is set.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        timings: List[ShardTiming] = []
+
+        async def run_shard(request_index, symbols, resolution, start_date, end_date, inclusive) -> pa.Table:
+            queued_at = time.perf_counter()
+            async with semaphore:
+                started_at = time.perf_counter()
+                query = _contruct_ohlcv_query(
+                    symbols, resolution, start_date, end_date, inclusive=inclusive, order_in_db=False
+                )
+                table = await self.aquery_arrow(query)
+            elapsed = time.perf_counter() - started_at
+            timings.append(
+                ShardTiming(
+                    request_index, symbols, start_date, end_date, started_at - queued_at, elapsed, table.num_rows
+                )
+            )
+            return table
+
+        request_shards = []
+        for request_index, request in enumerate(requests):
+            symbol = request.get("symbol")
+            if symbol is None or isinstance(symbol, str):
+                symbol_chunks = [symbol]
+            else:
+                symbol_chunks = [
+                    group[i : i + symbols_per_shard]
+                    for group in (
+                        [sym for sym in symbol if sym in self.index_set],
+                        [sym for sym in symbol if sym not in self.index_set],
+                    )
+                    for i in range(0, len(group), symbols_per_shard)
+                ]
+            resolution = request.get("resolution", "day")
+            # Buckets aggregated on the fly must not be split across windows
+            bucket = None if resolution in RESOLUTION_BUCKET_MAP else parse_resolution(resolution)
+            windows = _shard_time_range(
+                request.get("start_date"), request.get("end_date"), request.get("inclusive", "both"), time_shard, bucket
+            )
+            request_shards.append(
+                [
+                    run_shard(request_index, chunk, resolution, *window)
+                    for window in windows
+                    for chunk in symbol_chunks
+                ]
+            )
+
+        shard_results = await asyncio.gather(*[asyncio.gather(*shards) for shards in request_shards])
+        results = []
+        for tables in shard_results:
+            tables = [table for table in tables if table.num_rows] or tables[:1]
+            if len({table.schema.field("time").type for table in tables}) > 1:
+                # Indexes and stocks were requested together, their time columns differ in time zone
+                tables = [drop_time_zone(table) for table in tables]
+            table = pa.concat_tables(tables, promote_options="permissive").sort_by("time") if tables else pa.table({})
+            results.append(table if return_type == "arrow" else arrow_to_pandas(table))
+
+        total_rows = sum(timing.num_rows for timing in timings)
+        logger.debug(f"Queried {len(timings)} shard(s), {total_rows} rows, max {max_concurrency} at once")
+        if return_timings:
+            timings.sort(key=lambda timing: timing.request_index)
+            return results, timings
+        return results
+
+    async def aiter_ohlcv(
+        self,
+        symbol: str | List[str] | None = None,
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "day",
+        start_date: str | datetime.datetime | None = None,
+        end_date: str | datetime.datetime | None = None,
+        inclusive: Literal["both", "neither", "left", "right"] = "both",
+        chunk_size: int = 100_000,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+    ) -> AsyncIterator[pd.DataFrame | pa.Table]:
+        """
+        Asynchronously iterate over OHLCV data in chunks ordered by (time, symbol), see `TimeScaleDataFeed.iter_ohlcv`.
+
+        Args:
+            symbol (str | List[str] | None, optional): The symbol(s) to retrieve data for. Defaults to None.
+            resolution (Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"], optional): The resolution of the data to retrieve. Defaults to "day".
+            start_date (str | datetime.datetime | None, optional): The start date of the data to retrieve. Defaults to None.
+            end_date (str | datetime.datetime | None, optional): The end date of the data to retrieve. Defaults to None.
+            inclusive (Literal["both", "neither", "left", "right"], optional): Whether to include the start and end dates in the retrieved data. Defaults to "both".
+            chunk_size (int, optional): The number of rows per chunk. Defaults to 100000.
+            return_type (Literal["pandas", "arrow"], optional): Yield DataFrames or pyarrow.Tables. Defaults to "pandas".
+
+        Yields:
+            pd.DataFrame | pa.Table: Chunks of at most `chunk_size` rows.
+        """
+        after = None
+        while True:
+            query = _construct_ohlcv_page_query(symbol, resolution, start_date, end_date, inclusive, chunk_size, after)
+            chunk = await self.aquery_arrow(query)
+            if chunk.num_rows:
+                yield chunk if return_type == "arrow" else arrow_to_pandas(chunk)
+            if chunk.num_rows < chunk_size:
+                return
+            after = (chunk["time"][-1].as_py(), chunk["symbol"][-1].as_py())
@@ -0,0 +1,79 @@
+import logging
+import weakref
+from typing import List, Literal, Union
+
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseConnector:
+    """Async counterpart of DatabaseConnector over connection pools that are created on first use.
+
+    A pool belongs to the event loop it was created in, so every event loop using the connector gets its own pool and
+    one connector can be shared by threads that each run a loop. The pools of loops that have been closed are
+    terminated when another pool is created.
+    NOTE: Every loop must close its pool by calling `await self.close()` after using the connector.
+    """
+
+    def __init__(
+        self,
+        host=None,
+        port=None,
+        username=None,
+        password=None,
+        database_name=None,
+        min_pool_size: int = 1,
+        max_pool_size: int = 10,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.database_name = database_name
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        # Event loop -> its pool
+        self.pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    async def get_pool(self):
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Close the pool of the running event loop"""
+        raise NotImplementedError
+
+    async def aquery_by_sql(
+        self, sql: str, *args, return_type: Literal["pandas", "arrow"] = "pandas"
+    ) -> Union[pd.DataFrame, pa.Table]:
+        """Query Dataframe from database using SQL query
+
+        Args:
+            sql (str): SQL Query, with positional placeholders for `args`
+            return_type (Literal["pandas", "arrow"], optional): return a DataFrame or a columnar Arrow table.
+                Defaults to "pandas".
+        """
+        raise NotImplementedError
+
+    async def aexecute_sql(self, sql: str, *args) -> None:
+        raise NotImplementedError
+
+    async def aexecute_transaction(self, statements: List[str]) -> None:
+        raise NotImplementedError
+
+    async def acopy(self, df: pd.DataFrame, table: str, schema: str = None, chunk_size: int = None) -> None:
+        """Bulk-insert df into an existing table"""
+        raise NotImplementedError
+
+    async def aupsert(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        keys: List[str],
+        include_updated_at=False,
+        schema: str = None,
+        chunk_size: int = None,
+    ) -> None:
+        """Upsert df into an existing table with a primary key or unique constraint on `keys`"""
+        raise NotImplementedError
@@ -0,0 +1,171 @@
+import asyncio
+import io
+import logging
+import threading
+import time
+import uuid
+import weakref
+
+import asyncpg
+import pandas as pd
+from sqlalchemy.dialects.postgresql.base import PGDialect
+
+from common.utils.sql_helper import (
+    COPY_CHUNK_SIZE,
+    COPY_NULL,
+    acopy_query_to_arrow,
+    gen_upsert_from_select,
+    iter_csv_chunks,
+)
+
+from .async_database_connector import AsyncDatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+PG_INTEGER_TYPE_OIDS = {20, 21, 23}
+
+
+class AsyncPostgresDatabaseConnector(AsyncDatabaseConnector):
+    def __init__(self, host, port, username, password, database_name, **kwargs):
+        super().__init__(host, port, username, password, database_name, **kwargs)
+        if self.port is None:
+            self.port = 5432
+        self.identifier_preparer = PGDialect().identifier_preparer
+        # One lock per event loop, an asyncio.Lock binds to the first loop that waits on it
+        self._pool_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Guards self.pools and self._pool_locks, which are shared by the threads running the loops
+        self._pools_lock = threading.Lock()
+
+    async def get_pool(self) -> asyncpg.Pool:
+        loop = asyncio.get_running_loop()
+        pool = self.pools.get(loop)
+        if pool is not None:
+            return pool
+        with self._pools_lock:
+            pool_lock = self._pool_locks.setdefault(loop, asyncio.Lock())
+        async with pool_lock:
+            pool = self.pools.get(loop)
+            if pool is None:
+                self._terminate_closed_loop_pools()
+                pool = await asyncpg.create_pool(
+                    host=self.host,
+                    port=self.port,
+                    user=self.username,
+                    password=self.password,
+                    database=self.database_name,
+                    min_size=self.min_pool_size,
+                    max_size=self.max_pool_size,
+                )
+                with self._pools_lock:
+                    self.pools[loop] = pool
+        return pool
+
+    def _terminate_closed_loop_pools(self) -> None:
+        """Terminate the pools of closed loops, which cannot be closed gracefully any more
+
+        The pools of loops that are still open are left alone, they may be in use by another thread.
+        """
+        with self._pools_lock:
+            closed_loops = [loop for loop in self.pools.keys() if loop.is_closed()]
+            closed_pools = [self.pools.pop(loop) for loop in closed_loops]
+            for loop in closed_loops:
+                self._pool_locks.pop(loop, None)
+        for pool in closed_pools:
+            pool.terminate()
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            pool = self.pools.pop(loop, None)
+            self._pool_locks.pop(loop, None)
+        if pool is not None:
+            await pool.close()
+        self._terminate_closed_loop_pools()
+
+    def quote_identifier(self, name: str) -> str:
+        return self.identifier_preparer.quote(name)
+
+    def qualified_table_name(self, table: str, schema: str = None) -> str:
+        if schema:
+            return f"{self.identifier_preparer.quote_schema(schema)}.{self.quote_identifier(table)}"
+        return self.quote_identifier(table)
+
+    async def aquery_by_sql(self, sql, *args, return_type="pandas"):
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            if return_type == "arrow":
+                return await acopy_query_to_arrow(conn, sql, *args)
+            stmt = await conn.prepare(sql)
+            rows = await stmt.fetch(*args)
+            columns = [attribute.name for attribute in stmt.get_attributes()]
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+    async def aexecute_sql(self, sql, *args):
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(sql, *args)
+
+    async def aexecute_transaction(self, statements):
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for statement in statements:
+                    await conn.execute(statement)
+
+    async def _copy_df(self, conn, df: pd.DataFrame, table: str, schema: str = None, chunk_size: int = None) -> None:
+        """COPY df into a table as CSV chunks, on `conn`"""
+        column_str = ", ".join(self.quote_identifier(col) for col in df.columns)
+        stmt = await conn.prepare(f"SELECT {column_str} FROM {self.qualified_table_name(table, schema)} LIMIT 0")
+        integer_columns = [
+            col
+            for col, attribute in zip(df.columns, stmt.get_attributes())
+            if attribute.type.oid in PG_INTEGER_TYPE_OIDS
+        ]
+        for chunk in iter_csv_chunks(df, integer_columns, chunk_size or COPY_CHUNK_SIZE):
+            await conn.copy_to_table(
+                table,
+                source=io.BytesIO(chunk.encode()),
+                columns=list(df.columns),
+                schema_name=schema,
+                format="csv",
+                null=COPY_NULL,
+            )
+
+    async def acopy(self, df, table, schema=None, chunk_size=None):
+        if df.empty:
+            return
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await self._copy_df(conn, df, table, schema, chunk_size)
+
+    async def aupsert(self, df, table, keys, include_updated_at=False, schema=None, chunk_size=None):
+        """Stream df into a temporary staging table with COPY, then merge it with a single
+        INSERT ... SELECT ... ON CONFLICT DO UPDATE"""
+        if df.empty:
+            return
+        if include_updated_at:
+            df = df.assign(updated_at=pd.Timestamp.utcnow())
+        start = time.perf_counter()
+        columns = df.columns.tolist()
+        column_str = ", ".join(self.quote_identifier(col) for col in columns)
+        staging_table = f"_stg_{table[:40]}_{uuid.uuid4().hex[:8]}"
+        pool = await self.get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"CREATE TEMP TABLE {self.quote_identifier(staging_table)} ON COMMIT DROP AS "
+                    f"SELECT {column_str} FROM {self.qualified_table_name(table, schema)} WITH NO DATA"
+                )
+                await self._copy_df(conn, df, staging_table, chunk_size=chunk_size)
+                await conn.execute(
+                    gen_upsert_from_select(
+                        self.qualified_table_name(table, schema),
+                        self.quote_identifier(staging_table),
+                        [self.quote_identifier(col) for col in columns],
+                        [self.quote_identifier(key) for key in keys],
+                    )
+                )
+        logger.info(f"Upserted {len(df)} rows into {table} via COPY in {time.perf_counter() - start:.2f}s")
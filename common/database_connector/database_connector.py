@@ -1,13 +1,79 @@
 import logging
-from typing import List, Union
+import math
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterator, List, Literal, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+from cachetools import TTLCache
 from sqlalchemy import Column, MetaData, Table, create_engine, inspect, text
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import column as sql_column
+from sqlalchemy import table as sql_table
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import NoSuchTableError, SQLAlchemyError
+
+from .pool import TimedQueuePool, get_pool_stats
 
 logger = logging.getLogger(__name__)
 
+STAGING_BATCH_SIZE = 10000
+METADATA_CACHE_TTL = 600
+METADATA_CACHE_SIZE = 1024
+
+
+@dataclass
+class TableMetadata:
+    table: Table
+    primary_keys: List[str]
+    columns: List[str]
+
+
+def build_table_metadata(table_name: str, schema: str, columns: List[dict], pk_constraint: dict) -> TableMetadata:
+    """Build TableMetadata from the output of Inspector.get_columns and Inspector.get_pk_constraint"""
+    table = Table(
+        table_name,
+        MetaData(schema=schema),
+        *(Column(column["name"], column["type"], nullable=column.get("nullable", True)) for column in columns),
+        extend_existing=True,  # Extend the existing schema
+        schema=schema,
+    )
+    primary_keys = list((pk_constraint or {}).get("constrained_columns") or [])
+    return TableMetadata(table, primary_keys, [column["name"] for column in columns])
+
+
+def iter_record_batches(df: pd.DataFrame, batch_size: int) -> Iterator[List[dict]]:
+    """Yield df as lists of record dicts, `batch_size` rows at a time, with NaN/NaT converted to None.
+
+    Conversion happens column by column on one slice at a time, so only a single batch of Python objects is alive.
+    """
+    columns = df.columns.tolist()
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start : start + batch_size]
+        values = []
+        for col in columns:
+            series = chunk[col].astype(object)
+            if series.hasnans:
+                series = series.where(chunk[col].notna(), None)
+            values.append(series.tolist())
+        yield [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _arrow_schema(columns: List[str], arrow_types: List[Optional[pa.DataType]], arrays: List[pa.Array]) -> pa.Schema:
+    """Fix the schema of a chunked Arrow result from its first chunk
+
+    Columns of unknown type take the type inferred from the first chunk, or string when they are all NULL in it.
+    """
+    return pa.schema(
+        [
+            (name, arrow_type or (pa.string() if pa.types.is_null(array.type) else array.type))
+            for name, arrow_type, array in zip(columns, arrow_types, arrays)
+        ]
+    )
+
 
 class DatabaseConnector:
     def __init__(
@@ -17,35 +83,129 @@ class DatabaseConnector:
         username=None,
         password=None,
         database_name=None,
+        metadata_cache_ttl: float = METADATA_CACHE_TTL,
+        engine: Engine = None,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_pre_ping: bool = False,
+        pool_recycle: int = -1,
     ):
+        """
+        Args:
+            metadata_cache_ttl (float, optional): seconds a reflected table definition is reused before it is
+                reflected again. Defaults to 600.
+            engine (Engine, optional): existing engine to reuse instead of creating one, the pool options are
+                ignored then. Defaults to None.
+            pool_size, max_overflow, pool_pre_ping, pool_recycle: connection pool options, see
+                `sqlalchemy.create_engine`.
+        """
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.database_name = database_name
+        self.pool_options = dict(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle,
+        )
         self.uri = self.create_uri()
-        self.engine = self.init_engine(self.uri)
+        self.engine = engine if engine is not None else self.init_engine(self.uri)
+        self._metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=metadata_cache_ttl)
+        self._metadata_lock = threading.RLock()
 
     def create_uri(self) -> str:
         raise NotImplementedError
 
     def init_engine(self, uri):
-        engine = create_engine(uri, connect_args={'connect_timeout': 3600})
+        engine = create_engine(
+            uri, connect_args={'connect_timeout': 3600}, poolclass=TimedQueuePool, **self.pool_options
+        )
         return engine
 
-    def query_by_sql(self, sql: str, chunk=False, chunk_size=5000) -> Union[pd.DataFrame, List[pd.DataFrame]]:
+    def pool_stats(self) -> dict:
+        """Usage of the connection pool behind this connector's engine, see `get_pool_stats`"""
+        return get_pool_stats(self.engine.pool)
+
+    def query_by_sql(
+        self,
+        sql: str,
+        chunk=False,
+        chunk_size=5000,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+        params: dict = None,
+    ) -> Union[pd.DataFrame, pa.Table, Iterator[Union[pd.DataFrame, pa.RecordBatch]]]:
         """Query Dataframe from database using SQL query
 
         Args:
             sql (str): SQL Query
+            return_type (Literal["pandas", "arrow"], optional): return a DataFrame or a columnar Arrow table,
+                see `query_arrow`. Defaults to "pandas".
+            params (dict, optional): values of the `:name` bound parameters in sql, see
+                `common.helper.ParamFilterBuilder`. Defaults to None.
 
         Returns:
-            Union[pd.DataFrame, List[pd.DataFrame]]: result, return list if retrieval in chunk
+            Union[pd.DataFrame, pa.Table, Iterator]: result, return an iterator of chunks if retrieval in chunk,
+            see `iter_query`
         """
+        if chunk:
+            return self.iter_query(sql, chunk_size=chunk_size, return_type=return_type, params=params)
+        if return_type == "arrow":
+            return self.query_arrow(sql, params=params)
         with self.engine.connect() as conn:
-            df = pd.read_sql(text(sql), conn, chunksize=chunk_size if chunk else None)
+            df = pd.read_sql(text(sql), conn, params=params)
         return df
 
+    def query_arrow(self, sql: str, params: dict = None) -> pa.Table:
+        """Query an Arrow table from database using SQL query. Use `arrow_to_pandas` from
+        `common.utils.sql_helper` to convert it to pandas with as few copies as possible."""
+        return pa.Table.from_pandas(self.query_by_sql(sql, params=params), preserve_index=False)
+
+    def iter_query(
+        self,
+        sql: str,
+        chunk_size: int = 5000,
+        return_type: Literal["pandas", "arrow"] = "pandas",
+        params: dict = None,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """Stream the result of a SQL query in chunks through a server-side cursor
+
+        The connection stays checked out until the iterator is exhausted or closed, and at most `chunk_size` rows
+        are buffered client-side, so arbitrarily large results are scanned in constant memory.
+
+        Args:
+            sql (str): SQL Query
+            chunk_size (int, optional): rows per chunk. Defaults to 5000.
+            return_type (Literal["pandas", "arrow"], optional): yield DataFrames or Arrow record batches. All the
+                batches have the schema of the first one. Defaults to "pandas".
+            params (dict, optional): values of the `:name` bound parameters in sql. Defaults to None.
+
+        Yields:
+            Union[pd.DataFrame, pa.RecordBatch]: one chunk of the result
+        """
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+                text(sql), params or {}
+            )
+            columns = list(result.keys())
+            arrow_types = self.arrow_types_from_description(result.cursor.description)
+            schema = None
+            for rows in result.partitions(chunk_size):
+                if return_type == "arrow":
+                    arrays = [pa.array(values) for values in zip(*rows)]
+                    if schema is None:
+                        schema = _arrow_schema(columns, arrow_types, arrays)
+                    yield pa.RecordBatch.from_arrays(
+                        [array.cast(field.type) for array, field in zip(arrays, schema)], schema=schema
+                    )
+                else:
+                    yield pd.DataFrame(rows, columns=columns)
+
+    def arrow_types_from_description(self, description) -> List[Optional[pa.DataType]]:
+        """Arrow types of the result columns known from the DB-API cursor description, None where unknown"""
+        return [None] * len(description)
+
     def upsert(
         self,
         df: pd.DataFrame,
@@ -55,17 +215,48 @@ class DatabaseConnector:
         include_updated_at=False,
         schema: str = None,
         auto_create_table=True,
+        method: Literal["insert", "copy"] = "insert",
+        batch_size: int = None,
+        transaction: Literal["single", "batch"] = "single",
     ):
-        df = df.replace({np.nan: None})
+        """Upsert a DataFrame into a table
+
+        Args:
+            method (Literal["insert", "copy"], optional): "insert" renders one multi-row INSERT statement,
+                "copy" streams the DataFrame through COPY into a staging table and merges it with a single
+                INSERT ... SELECT (Postgres only, requires primary_key=True). Defaults to "insert".
+            batch_size (int, optional): with method="insert", convert and execute df in slices of this many rows
+                using executemany, keeping memory bounded. With method="copy" or primary_key=False, the chunk size
+                used to load the staging table. Defaults to None, the whole frame at once.
+            transaction (Literal["single", "batch"], optional): with batch_size, "single" runs all batches in one
+                all-or-nothing transaction, "batch" commits after every batch. Defaults to "single".
+        """
+        if method == "copy" and not primary_key:
+            raise ValueError("method='copy' is only supported with primary_key=True")
         if include_updated_at:
-            df["updated_at"] = pd.Timestamp.utcnow()
+            df = df.assign(updated_at=pd.Timestamp.utcnow())
         if primary_key:
-            self.upsert_with_primary_keys(df, table, keys, schema=schema, auto_create_table=auto_create_table)
+            if method == "insert" and batch_size is None:
+                df = df.replace({np.nan: None})
+            self.upsert_with_primary_keys(
+                df,
+                table,
+                keys,
+                schema=schema,
+                auto_create_table=auto_create_table,
+                method=method,
+                batch_size=batch_size,
+                transaction=transaction,
+            )
         else:
-            self.upsert_with_non_primary_keys(df, table, keys, schema=schema, auto_create_table=auto_create_table)
+            self.upsert_with_non_primary_keys(
+                df, table, keys, schema=schema, auto_create_table=auto_create_table, batch_size=batch_size
+            )
 
     def insert(self, df: pd.DataFrame, table: str, schema=None, if_exists: str = "append"):
         df.to_sql(table, if_exists=if_exists, index=False, con=self.engine, schema=schema)
+        if if_exists == "replace":
+            self.invalidate_metadata(table, schema)
 
     def upsert_with_non_primary_keys(
         self,
@@ -74,13 +265,14 @@ class DatabaseConnector:
         keys: List[str],
         schema=None,
         auto_create_table=False,
+        batch_size: int = None,
     ):
-        from .mysql_database_connector import MysqlDatabaseConnector
+        """Upsert df into a table whose keys are not backed by a primary key or unique constraint
+
+        df is bulk-loaded into a temporary staging table, then merged with one UPDATE ... FROM join on the key
+        columns and one anti-join INSERT, all in a single transaction. NULL keys match NULL keys.
+        """
         table_existed = self.check_table_exists(table, schema)
-        if schema:
-            table_name = f"{schema}.{table}"
-        else:
-            table_name = table
 
         if not table_existed:
             if auto_create_table:
@@ -95,55 +287,19 @@ class DatabaseConnector:
             else:
                 raise AssertionError(f"The table name {table} does not exists, create it first.")
 
-        current_db_records = self.query_by_sql(f"Select count(1) as num_records from {table_name}")
-        current_db_records = current_db_records["num_records"].values[0]
-        if current_db_records > 20000:
-            raise AssertionError("Cant upsert with non primary keys in large table (>20000 rows)")
-        current_db_df = self.query_by_sql(f"Select * from {table_name}")
-        db_key_values = current_db_df[keys].drop_duplicates().values.tolist()
-        update_rows = []
-        insert_rows = []
-        for _, row in df.iterrows():
-            row_key_values = [row[k] if not pd.isna(row[k]) else None for k in keys]
-            if row_key_values in db_key_values:
-                update_rows.append(row)
-            else:
-                insert_rows.append(row)
-        logger.info(f"{len(update_rows)=}")
-        for row in update_rows:
-            sql = f"""UPDATE {table_name}
-"""
-            where_condition = []
-            set_stm = []
-            for col in row.index:
-                if pd.isna(row[col]):
-                    if col in keys:
-                        if isinstance(self, MysqlDatabaseConnector):
-                            where_condition.append(f""" `{col}` is null """)
-                        else:
-                            where_condition.append(f""" "{col}" is null """)
-                    else:
-                        if isinstance(self, MysqlDatabaseConnector):
-                            set_stm.append(f""" `{col}`=null """)
-                        else:
-                            set_stm.append(f""""{col}"=null """)
-                else:
-                    if col in keys:
-                        if isinstance(self, MysqlDatabaseConnector):
-                            where_condition.append(f""" `{col}`='{row[col]}' """)
-                        else:
-                            where_condition.append(f""""{col}"='{row[col]}' """)
-                    else:
-                        if isinstance(self, MysqlDatabaseConnector):
-                            set_stm.append(f""" `{col}`='{row[col]}' """)
-                        else:
-                            set_stm.append(f""""{col}"='{row[col]}' """)
-            sql += " SET " + ", ".join(set_stm)
-            sql += " WHERE " + " AND ".join(where_condition)
-            self.execute_sql(sql)
-        logger.info(f"{len(insert_rows)=}")
-        if len(insert_rows):
-            pd.DataFrame(insert_rows).to_sql(table, if_exists="append", index=False, con=self.engine, schema=schema)
+        if df.empty:
+            return
+        columns = df.columns.tolist()
+        nullable_keys = [key for key in keys if df[key].isna().any()]
+        with self.engine.begin() as conn:
+            staging_table = self.create_staging_table(conn, table, columns, schema)
+            self.load_staging_table(conn, staging_table, df, table, schema, batch_size=batch_size)
+            update_stmt = self.gen_merge_update_statement(staging_table, table, keys, columns, nullable_keys, schema)
+            num_updated = conn.execute(text(update_stmt)).rowcount if update_stmt else 0
+            insert_stmt = self.gen_merge_insert_statement(staging_table, table, keys, columns, nullable_keys, schema)
+            num_inserted = conn.execute(text(insert_stmt)).rowcount
+            self.drop_staging_table(conn, staging_table)
+        logger.info(f"{num_updated=}, {num_inserted=}")
 
     def upsert_with_primary_keys(
         self,
@@ -153,6 +309,9 @@ class DatabaseConnector:
         check: bool = True,
         schema: str = None,
         auto_create_table=True,
+        method: Literal["insert", "copy"] = "insert",
+        batch_size: int = None,
+        transaction: Literal["single", "batch"] = "single",
     ):
         table_existed = self.check_table_exists(table, schema)
         # If table is not exists in database, dump data directly
@@ -176,11 +335,18 @@ class DatabaseConnector:
             # Check key unique
             self.upsert_check_df(df, keys)
 
+        if method == "insert" and batch_size is not None:
+            self.upsert_in_batches(df, table, keys, schema, batch_size=batch_size, transaction=transaction)
+            return
+
         conn = self.engine.connect()
         trans = conn.begin()
         try:
-            stmt = self.gen_upsert_statement(df, table, keys, schema)
-            conn.execute(stmt)
+            if method == "copy":
+                self.copy_upsert(conn, df, table, keys, schema, chunk_size=batch_size)
+            else:
+                stmt = self.gen_upsert_statement(df, table, keys, schema)
+                conn.execute(stmt)
             trans.commit()
         except SQLAlchemyError as e:
             trans.rollback()
@@ -195,23 +361,144 @@ class DatabaseConnector:
         finally:
             conn.close()
 
+    def upsert_in_batches(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        keys: List[str],
+        schema: str = None,
+        batch_size: int = 10000,
+        transaction: Literal["single", "batch"] = "single",
+    ) -> None:
+        """Upsert df slice by slice with executemany, logging the throughput of every batch
+
+        Args:
+            transaction (Literal["single", "batch"], optional): "single" rolls back every batch on failure,
+                "batch" commits after each batch so a failure keeps the batches already written.
+                Defaults to "single".
+        """
+        if transaction not in ("single", "batch"):
+            raise ValueError(f"Not supported transaction={transaction}")
+        if df.empty:
+            return
+        stmt = self.gen_upsert_template(table, keys, df.columns.tolist(), schema)
+        num_batches = math.ceil(len(df) / batch_size)
+        batch_no = 0
+        with self.engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                for batch_no, records in enumerate(iter_record_batches(df, batch_size), start=1):
+                    start = time.perf_counter()
+                    conn.execute(stmt, records)
+                    if transaction == "batch":
+                        trans.commit()
+                        trans = conn.begin()
+                    elapsed = time.perf_counter() - start
+                    logger.info(
+                        f"Upserted batch {batch_no}/{num_batches} into {table}: {len(records)} rows in {elapsed:.2f}s "
+                        f"({len(records) / max(elapsed, 1e-9):.0f} rows/s)"
+                    )
+                trans.commit()
+            except Exception as error:
+                trans.rollback()
+                logger.error(f"Upsert into {table} failed at batch {batch_no}/{num_batches}: {repr(error)}")
+                raise error
+
     def gen_upsert_statement(self, df, table, keys, schema):
         raise NotImplementedError
 
+    def gen_upsert_template(self, table: str, keys: List[str], columns: List[str], schema: str = None):
+        """Upsert statement without values, to be executed with a list of records (executemany)"""
+        raise NotImplementedError
+
+    def copy_upsert(
+        self, conn, df: pd.DataFrame, table: str, keys: List[str], schema: str = None, chunk_size: int = None
+    ) -> None:
+        """Upsert df through a bulk-loaded staging table, inside the transaction of `conn`"""
+        raise NotImplementedError(f"{type(self).__name__} does not support method='copy'")
+
+    def create_staging_table(self, conn, table: str, columns: List[str], schema: str = None) -> str:
+        """Create an empty temporary table with the given columns and column types of `table`
+
+        Returns:
+            str: unquoted name of the staging table
+        """
+        raise NotImplementedError
+
+    def load_staging_table(
+        self, conn, staging_table: str, df: pd.DataFrame, table: str, schema: str = None, batch_size: int = None
+    ) -> None:
+        """Insert df into the staging table with bound parameters (executemany), `batch_size` rows at a time"""
+        stmt = sql_table(staging_table, *(sql_column(col) for col in df.columns)).insert()
+        for records in iter_record_batches(df, batch_size or STAGING_BATCH_SIZE):
+            conn.execute(stmt, records)
+
+    def drop_staging_table(self, conn, staging_table: str) -> None:
+        conn.execute(text(f"DROP TABLE {self.quote_identifier(staging_table)}"))
+
+    def null_safe_equal(self, left: str, right: str) -> str:
+        raise NotImplementedError
+
+    def gen_merge_update_statement(
+        self,
+        staging_table: str,
+        table: str,
+        keys: List[str],
+        columns: List[str],
+        nullable_keys: List[str] = [],
+        schema: str = None,
+    ) -> str:
+        """UPDATE joining the target table to the staging table on keys, None when there is nothing to set"""
+        raise NotImplementedError
+
+    def gen_merge_insert_statement(
+        self,
+        staging_table: str,
+        table: str,
+        keys: List[str],
+        columns: List[str],
+        nullable_keys: List[str] = [],
+        schema: str = None,
+    ) -> str:
+        """INSERT of the staging rows whose keys are not in the target table yet"""
+        column_str = ", ".join(self.quote_identifier(col) for col in columns)
+        select_str = ", ".join(f"s.{self.quote_identifier(col)}" for col in columns)
+        return (
+            f"INSERT INTO {self.qualified_table_name(table, schema)} ({column_str}) "
+            f"SELECT {select_str} FROM {self.quote_identifier(staging_table)} AS s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {self.qualified_table_name(table, schema)} AS t "
+            f"WHERE {self.gen_key_join_condition(keys, nullable_keys)})"
+        )
+
+    def gen_key_join_condition(self, keys: List[str], nullable_keys: List[str] = []) -> str:
+        """Join condition between target `t` and staging `s`, NULL-safe only for keys that may hold NULL,
+        so the others can still use the target's indexes"""
+        conditions = []
+        for key in keys:
+            left, right = f"t.{self.quote_identifier(key)}", f"s.{self.quote_identifier(key)}"
+            conditions.append(self.null_safe_equal(left, right) if key in nullable_keys else f"{left} = {right}")
+        return " AND ".join(conditions)
+
+    def quote_identifier(self, name: str) -> str:
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def qualified_table_name(self, table: str, schema: str = None) -> str:
+        if schema:
+            return f"{self.engine.dialect.identifier_preparer.quote_schema(schema)}.{self.quote_identifier(table)}"
+        return self.quote_identifier(table)
+
     def upsert_check_database(self, table_name, columns: List[str], schema: str = None) -> None:
         """Check whether given table and columns exists or not
         Args:
             table_name (str): name of table need to check
             columns (List[str]): list of column names
         """
-        try:
-            sql = f"""Select "{'","'.join(columns)}"
-from {table_name if not schema else schema + '.' + table_name}
-limit 1;
-            """
-            self.query_by_sql(sql)
-        except Exception as error:
-            raise error
+        metadata = self.get_table_metadata(table_name, schema)
+        if metadata is None:
+            raise NoSuchTableError(table_name if not schema else f"{schema}.{table_name}")
+        missing_columns = [col for col in columns if col not in metadata.columns]
+        if missing_columns:
+            raise ValueError(f"Columns {missing_columns} do not exist in table {table_name}")
 
     def upsert_check_df(self, df: pd.DataFrame, keys: List[str]) -> None:
         """Check whether values in keys columns of df are unique or not
@@ -246,21 +533,69 @@ limit 1;
             # Table not exists
             return
 
+    def get_table_metadata(self, table_name: str, schema: str = None) -> Union[TableMetadata, None]:
+        """Reflected table, primary keys and columns of a table, cached per (schema, table) for
+        `metadata_cache_ttl` seconds
+
+        Returns:
+            TableMetadata | None: None if the table does not exist, which is not cached
+        """
+        key = (schema, table_name)
+        with self._metadata_lock:
+            metadata = self._metadata_cache.get(key)
+        if metadata is not None:
+            return metadata
+        inspector = inspect(self.engine)
+        try:
+            columns = inspector.get_columns(table_name, schema)
+        except NoSuchTableError:
+            return None
+        metadata = build_table_metadata(table_name, schema, columns, inspector.get_pk_constraint(table_name, schema))
+        with self._metadata_lock:
+            self._metadata_cache[key] = metadata
+        return metadata
+
+    def warm_metadata(self, tables: List[Union[str, Tuple[str, str]]], schema: str = None) -> None:
+        """Reflect many tables into the metadata cache with one inspector pass per schema
+
+        Args:
+            tables (List[str | tuple[str, str]]): table names, or (schema, table) tuples
+            schema (str, optional): schema of the tables given by name. Defaults to None.
+        """
+        tables_by_schema = defaultdict(list)
+        for table in tables:
+            table_schema, table_name = table if isinstance(table, tuple) else (schema, table)
+            tables_by_schema[table_schema].append(table_name)
+
+        inspector = inspect(self.engine)
+        for table_schema, table_names in tables_by_schema.items():
+            multi_columns = inspector.get_multi_columns(schema=table_schema, filter_names=table_names)
+            multi_pk_constraints = inspector.get_multi_pk_constraint(schema=table_schema, filter_names=table_names)
+            with self._metadata_lock:
+                for (_, table_name), columns in multi_columns.items():
+                    pk_constraint = multi_pk_constraints.get((table_schema, table_name)) or multi_pk_constraints.get(
+                        (None, table_name)
+                    )
+                    self._metadata_cache[(table_schema, table_name)] = build_table_metadata(
+                        table_name, table_schema, columns, pk_constraint
+                    )
+
+    def invalidate_metadata(self, table_name: str = None, schema: str = None) -> None:
+        """Drop a table from the metadata cache, or the whole cache if table_name is None"""
+        with self._metadata_lock:
+            if table_name is None:
+                self._metadata_cache.clear()
+            else:
+                self._metadata_cache.pop((schema, table_name), None)
+
     def check_table_exists(self, table_name, schema):
-        return inspect(self.engine).has_table(table_name, schema)
+        return self.get_table_metadata(table_name, schema) is not None
 
     def gen_table_instance_from_database(self, table_name, schema=None):
-        metadata = MetaData(schema=schema)
-        inspector = inspect(self.engine)
-        table_columns = inspector.get_columns(table_name, schema)
-        table = Table(
-            table_name,
-            metadata,
-            *(Column(column["name"], column["type"]) for column in table_columns),
-            extend_existing=True,  # Extend the existing schema
-            schema=schema,
-        )
-        return table
+        metadata = self.get_table_metadata(table_name, schema)
+        if metadata is None:
+            raise NoSuchTableError(table_name if not schema else f"{schema}.{table_name}")
+        return metadata.table
 
     def execute_sql(self, sql: str):
         with self.engine.connect() as conn:
@@ -268,7 +603,10 @@ limit 1;
             conn.commit()
 
     def get_primary_keys(self, table, schema):
-        return [k.name for k in inspect(self.gen_table_instance_from_database(table, schema)).primary_key]
+        metadata = self.get_table_metadata(table, schema)
+        if metadata is None:
+            raise NoSuchTableError(table if not schema else f"{schema}.{table}")
+        return list(metadata.primary_keys)
 
     def get_unique_constraint(self, table):
         records = inspect(self.engine).get_unique_constraints(table)
@@ -279,8 +617,9 @@ limit 1;
 
     def create_table(self, table, columns: List[Column] = [], schema: str = None):
         metadata = MetaData(schema=schema)
-        table = Table(table, metadata, *columns, schema=schema)
+        orm_table = Table(table, metadata, *columns, schema=schema)
         metadata.create_all(bind=self.engine, checkfirst=True)
+        self.invalidate_metadata(orm_table.name, schema)
 
     def execute_transaction(self, statements: list[str], autocommit=False):
         if not autocommit:
@@ -1,12 +1,29 @@
-from typing import List, Literal
+import os
+import threading
+from typing import Dict, List, Literal, Tuple
+
+from sqlalchemy.engine import Engine
+
+from .async_database_connector import AsyncDatabaseConnector
+from .async_postgres_database_connector import AsyncPostgresDatabaseConnector
 from .database_connector import DatabaseConnector
 from .mysql_database_connector import MysqlDatabaseConnector
+from .pool import get_pool_stats
 from .postgres_database_connector import PostgresDatabaseConnector
 
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_pre_ping", "pool_recycle")
+
 
 class DatabaseConnectorFactory(object):
     def __init__(self):
         self.creators = {}
+        self.async_creators = {}
+        self._engines: Dict[Tuple, Engine] = {}
+        self._async_connectors: Dict[Tuple, AsyncDatabaseConnector] = {}
+        self._engines_lock = threading.Lock()
+        self._pid = os.getpid()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
 
     def get_connector(
         self,
@@ -17,12 +34,30 @@ class DatabaseConnectorFactory(object):
         password: str,
         database_name: str,
         *args,
+        shared_engine: bool = True,
         **kwargs,
     ) -> DatabaseConnector:
+        """Create a connector. By default connectors created with the same connection parameters and pool options
+        share one engine, and so one connection pool, for the whole process.
+
+        Args:
+            shared_engine (bool, optional): reuse the process-wide engine for these parameters. Defaults to True.
+            kwargs: passed to the connector, e.g. pool_size, max_overflow, pool_pre_ping, pool_recycle
+        """
         creator = self.creators.get(database_type)
         if not creator:
             raise AssertionError(f"Database {database_type} is not supported")
-        return creator(host, port, username, password, database_name, *args, **kwargs)
+        if not shared_engine:
+            return creator(host, port, username, password, database_name, *args, **kwargs)
+
+        key = self._engine_key(database_type, host, port, username, password, database_name, kwargs)
+        with self._engines_lock:
+            self._check_fork()
+            engine = self._engines.get(key)
+            connector = creator(host, port, username, password, database_name, *args, engine=engine, **kwargs)
+            if engine is None:
+                self._engines[key] = connector.engine
+        return connector
 
     def register_connector(
         self,
@@ -35,8 +70,90 @@ class DatabaseConnectorFactory(object):
     def supported_types(self) -> List[str]:
         return self.creators.keys()
 
+    def get_async_connector(
+        self,
+        database_type: Literal["postgres", "timescale"],
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        database_name: str,
+        *args,
+        shared_pool: bool = True,
+        **kwargs,
+    ) -> AsyncDatabaseConnector:
+        """Create an async connector. By default the same connector, and so one connection pool, is returned for the
+        same connection parameters and pool options.
+
+        Args:
+            shared_pool (bool, optional): reuse the process-wide connector for these parameters. Defaults to True.
+            kwargs: passed to the connector, e.g. min_pool_size, max_pool_size
+        """
+        creator = self.async_creators.get(database_type)
+        if not creator:
+            raise AssertionError(f"Async database {database_type} is not supported")
+        if not shared_pool:
+            return creator(host, port, username, password, database_name, *args, **kwargs)
+
+        key = (database_type, host, str(port), username, password, database_name, tuple(sorted(kwargs.items())))
+        with self._engines_lock:
+            self._check_fork()
+            connector = self._async_connectors.get(key)
+            if connector is None:
+                connector = creator(host, port, username, password, database_name, *args, **kwargs)
+                self._async_connectors[key] = connector
+        return connector
+
+    def register_async_connector(
+        self,
+        database_type: Literal["postgres", "timescale"],
+        creator: AsyncDatabaseConnector,
+    ) -> None:
+        self.async_creators[database_type] = creator
+
+    def pool_stats(self) -> Dict[str, dict]:
+        """Usage of every shared connection pool, keyed by
+        `database_type://username@host:port/database_name[?pool options]`"""
+        with self._engines_lock:
+            engines = list(self._engines.items())
+        stats = {}
+        for (database_type, host, port, username, _, database_name, pool_options), engine in engines:
+            label = f"{database_type}://{username}@{host}:{port}/{database_name}"
+            if pool_options:
+                label += "?" + "&".join(f"{option}={value}" for option, value in pool_options)
+            stats[label] = get_pool_stats(engine.pool)
+        return stats
+
+    def dispose_engines(self) -> None:
+        """Close all pooled connections and forget the shared engines"""
+        with self._engines_lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+    @staticmethod
+    def _engine_key(database_type, host, port, username, password, database_name, kwargs) -> Tuple:
+        pool_options = tuple((option, kwargs[option]) for option in POOL_OPTIONS if option in kwargs)
+        return (database_type, host, str(port), username, password, database_name, pool_options)
+
+    def _check_fork(self) -> None:
+        # Fallback for platforms without os.register_at_fork
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+    def _reset_after_fork(self) -> None:
+        # Pooled connections belong to the parent, the child must not use nor close them
+        self._engines_lock = threading.Lock()
+        self._pid = os.getpid()
+        for engine in self._engines.values():
+            engine.dispose(close=False)
+        self._async_connectors.clear()
+
 
 database_connector_factory = DatabaseConnectorFactory()
 database_connector_factory.register_connector("postgres", PostgresDatabaseConnector)
 database_connector_factory.register_connector("timescale", PostgresDatabaseConnector)
 database_connector_factory.register_connector("mysql", MysqlDatabaseConnector)
+database_connector_factory.register_async_connector("postgres", AsyncPostgresDatabaseConnector)
+database_connector_factory.register_async_connector("timescale", AsyncPostgresDatabaseConnector)
@@ -1,13 +1,15 @@
+import uuid
 from urllib.parse import quote
 
+from sqlalchemy import text
 from sqlalchemy.dialects.mysql import insert
 
 from .database_connector import DatabaseConnector
 
 
 class MysqlDatabaseConnector(DatabaseConnector):
-    def __init__(self, host, port, username, password, database_name):
-        super().__init__(host, port, username, password, database_name)
+    def __init__(self, host, port, username, password, database_name, **kwargs):
+        super().__init__(host, port, username, password, database_name, **kwargs)
         if self.port is None:
             self.port = 3306
 
@@ -22,3 +24,42 @@ class MysqlDatabaseConnector(DatabaseConnector):
         update_dict = {x.name: x for x in stmt.inserted if x.name not in keys and x.name in df.columns}
         stmt = stmt.on_duplicate_key_update(update_dict)
         return stmt
+
+    def gen_upsert_template(self, table, keys, columns, schema=None):
+        orm_table = self.gen_table_instance_from_database(table, schema)
+        stmt = insert(orm_table)
+        update_dict = {x.name: x for x in stmt.inserted if x.name not in keys and x.name in columns}
+        if not update_dict:
+            return stmt.prefix_with("IGNORE")
+        return stmt.on_duplicate_key_update(update_dict)
+
+    def create_staging_table(self, conn, table, columns, schema=None):
+        staging_table = f"_stg_{table[:40]}_{uuid.uuid4().hex[:8]}"
+        column_str = ", ".join(self.quote_identifier(col) for col in columns)
+        conn.execute(
+            text(
+                f"CREATE TEMPORARY TABLE {self.quote_identifier(staging_table)} AS "
+                f"SELECT {column_str} FROM {self.qualified_table_name(table, schema)} LIMIT 0"
+            )
+        )
+        return staging_table
+
+    def drop_staging_table(self, conn, staging_table):
+        # TEMPORARY keeps the statement from implicitly committing the transaction
+        conn.execute(text(f"DROP TEMPORARY TABLE {self.quote_identifier(staging_table)}"))
+
+    def null_safe_equal(self, left, right):
+        return f"{left} <=> {right}"
+
+    def gen_merge_update_statement(self, staging_table, table, keys, columns, nullable_keys=[], schema=None):
+        update_columns = [col for col in columns if col not in keys]
+        if not update_columns:
+            return None
+        set_str = ", ".join(
+            f"t.{self.quote_identifier(col)} = s.{self.quote_identifier(col)}" for col in update_columns
+        )
+        return (
+            f"UPDATE {self.qualified_table_name(table, schema)} AS t "
+            f"JOIN {self.quote_identifier(staging_table)} AS s ON {self.gen_key_join_condition(keys, nullable_keys)} "
+            f"SET {set_str}"
+        )
@@ -0,0 +1,48 @@
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.num_checkouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait_time = time.perf_counter() - start
+            with self._stats_lock:
+                self.num_checkouts += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+
+
+def get_pool_stats(pool) -> dict:
+    """Snapshot of a pool's usage: size, checked-in/out and overflow connections, and checkout wait times in seconds.
+    Wait times include opening a new connection when the pool has to grow."""
+    stats = {}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                num_checkouts=pool.num_checkouts,
+                total_wait_time=pool.total_wait_time,
+                avg_wait_time=pool.total_wait_time / pool.num_checkouts if pool.num_checkouts else 0.0,
+                max_wait_time=pool.max_wait_time,
+            )
+    return stats
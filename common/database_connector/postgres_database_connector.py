@@ -1,13 +1,28 @@
+import logging
+import time
+import uuid
 from urllib.parse import quote
 
+from sqlalchemy import Integer, text
 from sqlalchemy.dialects.postgresql import insert
 
+from common.utils.sql_helper import (
+    COPY_CHUNK_SIZE,
+    PG_TYPE_OID_TO_ARROW,
+    copy_from_dataframe,
+    copy_query_to_arrow,
+    gen_upsert_from_select,
+    render_query,
+)
+
 from .database_connector import DatabaseConnector
 
+logger = logging.getLogger(__name__)
+
 
 class PostgresDatabaseConnector(DatabaseConnector):
-    def __init__(self, host, port, username, password, database_name):
-        super().__init__(host, port, username, password, database_name)
+    def __init__(self, host, port, username, password, database_name, **kwargs):
+        super().__init__(host, port, username, password, database_name, **kwargs)
         if self.port is None:
             self.port = 5432
 
@@ -17,6 +32,21 @@ class PostgresDatabaseConnector(DatabaseConnector):
         )
         return uri
 
+    def query_arrow(self, sql, params=None):
+        """Decode the result columnar through COPY ... TO STDOUT, without a Python object per value"""
+        with self.engine.connect() as conn:
+            cursor = conn.connection.cursor()
+            try:
+                if params:
+                    sql = render_query(cursor, text(sql).bindparams(**params), self.engine.dialect)
+                return copy_query_to_arrow(cursor, sql)
+            finally:
+                cursor.close()
+
+    def arrow_types_from_description(self, description):
+        # psycopg2 reports the type OID of every column
+        return [PG_TYPE_OID_TO_ARROW.get(column.type_code) for column in description]
+
     def gen_upsert_statement(self, df, table, keys, schema):
         orm_table = self.gen_table_instance_from_database(table, schema)
         stmt = insert(orm_table).values(df.to_dict("records"))
@@ -26,4 +56,79 @@ class PostgresDatabaseConnector(DatabaseConnector):
                 col: stmt.excluded[col] for col in df.columns.difference(keys).tolist()
             },
         )
-        return stmt
\ No newline at end of file
+        return stmt
+
+    def gen_upsert_template(self, table, keys, columns, schema=None):
+        orm_table = self.gen_table_instance_from_database(table, schema)
+        stmt = insert(orm_table)
+        update_columns = [col for col in columns if col not in keys]
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=keys)
+        return stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={col: stmt.excluded[col] for col in update_columns},
+        )
+
+    def create_staging_table(self, conn, table, columns, schema=None):
+        """Temporary staging tables are dropped on commit"""
+        staging_table = f"_stg_{table[:40]}_{uuid.uuid4().hex[:8]}"
+        column_str = ", ".join(self.quote_identifier(col) for col in columns)
+        conn.execute(
+            text(
+                f"CREATE TEMP TABLE {self.quote_identifier(staging_table)} ON COMMIT DROP AS "
+                f"SELECT {column_str} FROM {self.qualified_table_name(table, schema)} WITH NO DATA"
+            )
+        )
+        return staging_table
+
+    def load_staging_table(self, conn, staging_table, df, table, schema=None, batch_size=None):
+        """Stream df into the staging table with COPY, `batch_size` rows per chunk"""
+        orm_table = self.gen_table_instance_from_database(table, schema)
+        integer_columns = [
+            col for col in df.columns if col in orm_table.c and isinstance(orm_table.c[col].type, Integer)
+        ]
+        cursor = conn.connection.cursor()
+        try:
+            copy_from_dataframe(
+                cursor,
+                df,
+                self.quote_identifier(staging_table),
+                [self.quote_identifier(col) for col in df.columns],
+                integer_columns=integer_columns,
+                chunk_size=batch_size or COPY_CHUNK_SIZE,
+            )
+        finally:
+            cursor.close()
+
+    def drop_staging_table(self, conn, staging_table):
+        # Dropped on commit
+        pass
+
+    def null_safe_equal(self, left, right):
+        return f"{left} IS NOT DISTINCT FROM {right}"
+
+    def gen_merge_update_statement(self, staging_table, table, keys, columns, nullable_keys=[], schema=None):
+        update_columns = [col for col in columns if col not in keys]
+        if not update_columns:
+            return None
+        set_str = ", ".join(f"{self.quote_identifier(col)} = s.{self.quote_identifier(col)}" for col in update_columns)
+        return (
+            f"UPDATE {self.qualified_table_name(table, schema)} AS t SET {set_str} "
+            f"FROM {self.quote_identifier(staging_table)} AS s WHERE {self.gen_key_join_condition(keys, nullable_keys)}"
+        )
+
+    def gen_merge_from_staging_statement(self, staging_table, table, keys, columns, schema=None) -> str:
+        return gen_upsert_from_select(
+            self.qualified_table_name(table, schema),
+            self.quote_identifier(staging_table),
+            [self.quote_identifier(col) for col in columns],
+            [self.quote_identifier(key) for key in keys],
+        )
+
+    def copy_upsert(self, conn, df, table, keys, schema=None, chunk_size=None):
+        start = time.perf_counter()
+        columns = df.columns.tolist()
+        staging_table = self.create_staging_table(conn, table, columns, schema)
+        self.load_staging_table(conn, staging_table, df, table, schema, batch_size=chunk_size)
+        conn.execute(text(self.gen_merge_from_staging_statement(staging_table, table, keys, columns, schema)))
+        logger.info(f"Upserted {len(df)} rows into {table} via COPY in {time.perf_counter() - start:.2f}s")
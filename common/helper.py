@@ -1,5 +1,6 @@
 import logging
 import re
+import warnings
 from datetime import date, datetime
 from numbers import Integral, Number, Real
 from typing import Literal
@@ -44,6 +45,21 @@ def convert_to_sql_value(value: Integral | Real | str | datetime | date):
     return str(value)
 
 
+def convert_to_param_value(value: Integral | Real | str | datetime | date):
+    """Normalize a value for binding, the counterpart of `convert_to_sql_value` for bound parameters"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, Integral):
+        return int(value)
+    if isinstance(value, Real):
+        return float(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value
+    raise ValueError(f"Not supported type={type(value)}")
+
+
 def convert_to_alphanumeric_underscore(input_str: str) -> str:
     result = re.sub(r"[^a-zA-Z0-9_]", "", input_str)
     return result
@@ -60,6 +76,10 @@ def remove_leading_numbers(input_str: str) -> str:
 
 
 def create_in_filter(col_name: str, values: list[Integral | Real | str | datetime | date], not_in: bool = False):
+    """Deprecated, inlines the values as literals. Use `ParamFilterBuilder.add_in` instead."""
+    warnings.warn(
+        "create_in_filter is deprecated, use ParamFilterBuilder.add_in instead", DeprecationWarning, stacklevel=2
+    )
     operator = "NOT IN" if not_in else "IN"
     values_str = ", ".join([convert_to_sql_value(value) for value in values])
     return f"{col_name} {operator} ({values_str})"
@@ -70,9 +90,79 @@ def create_comparison_filter(
     value: Integral | Real | str | datetime | date,
     operator: Literal["=", "<", "<=", ">", ">=", "<>", "!="],
 ):
+    """Deprecated, inlines the value as a literal. Use `ParamFilterBuilder.add_comparison` instead."""
+    warnings.warn(
+        "create_comparison_filter is deprecated, use ParamFilterBuilder.add_comparison instead",
+        DeprecationWarning,
+        stacklevel=2,
+    )
     return f"{col_name} {operator} {convert_to_sql_value(value)}"
 
 
+class ParamFilterBuilder:
+    """Build a WHERE predicate whose values are bound parameters instead of inlined literals.
+
+    The SQL text only depends on which filters are used, not on their values, so the statement can be prepared and
+    cached. With `array_params` (Postgres), an IN list is a single array parameter: `col = ANY(:col)`.
+    Otherwise every value gets its own parameter.
+
+    Example:
+        >>> builder = ParamFilterBuilder().add_in("symbol", ["ACB", "VNM"]).add_comparison("time", start, ">=")
+        >>> where_predicate, params = builder.build()
+        >>> connector.query_by_sql(f"SELECT * FROM ohlcv WHERE {where_predicate}", params=params)
+    """
+
+    def __init__(self, array_params: bool = True) -> None:
+        self.array_params = array_params
+        self.filters: list[str] = []
+        self.params: dict = {}
+
+    def _param_name(self, col_name: str) -> str:
+        base_name = convert_to_alphanumeric_underscore(col_name) or "param"
+        name = base_name
+        i = 1
+        while name in self.params:
+            name = f"{base_name}_{i}"
+            i += 1
+        return name
+
+    def _add_param(self, col_name: str, value) -> str:
+        name = self._param_name(col_name)
+        self.params[name] = value
+        return name
+
+    def add_in(
+        self, col_name: str, values: list[Integral | Real | str | datetime | date], not_in: bool = False
+    ) -> "ParamFilterBuilder":
+        values = [convert_to_param_value(value) for value in values]
+        if len(values) == 0:
+            self.filters.append("TRUE" if not_in else "FALSE")
+        elif self.array_params:
+            operator = "<> ALL" if not_in else "= ANY"
+            self.filters.append(f"{col_name} {operator}(:{self._add_param(col_name, values)})")
+        else:
+            operator = "NOT IN" if not_in else "IN"
+            names = ", ".join(f":{self._add_param(col_name, value)}" for value in values)
+            self.filters.append(f"{col_name} {operator} ({names})")
+        return self
+
+    def add_comparison(
+        self,
+        col_name: str,
+        value: Integral | Real | str | datetime | date,
+        operator: Literal["=", "<", "<=", ">", ">=", "<>", "!="],
+    ) -> "ParamFilterBuilder":
+        self.filters.append(f"{col_name} {operator} :{self._add_param(col_name, convert_to_param_value(value))}")
+        return self
+
+    def build(self, operator: Literal["AND", "OR"] = "AND", with_bracket: bool = False) -> tuple[str, dict]:
+        """
+        Returns:
+            tuple[str, dict]: the predicate, empty if there is no filter, and its parameters
+        """
+        return create_logical_filter(self.filters, operator, with_bracket), dict(self.params)
+
+
 def create_logical_filter(filters: list[str], operator: Literal["AND", "OR"], with_bracket: bool = False):
     operator_sep = f" {operator} "
     return operator_sep.join([f"({filter})" for filter in filters]) if with_bracket else operator_sep.join(filters)
@@ -0,0 +1,114 @@
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+current_location = os.path.dirname(os.path.realpath(__file__))
+
+# Sorted int32 days since 1970-01-01 of the packaged holiday list, regenerate it with write_holiday_list
+HOLIDAY_DATASET_FILE = os.path.join(current_location, "datasets", "trading_holidays.npy")
+
+# Environment variable overriding where the holiday list fetched from the API is persisted
+PERSISTED_HOLIDAY_LIST_FILE_ENV = "DATX_HOLIDAY_LIST_FILE"
+# Where the holiday list used to be persisted, next to the package. Still read when the persisted file is missing
+LEGACY_PERSISTED_HOLIDAY_LIST_FILE = os.path.join(os.path.dirname(current_location), "holiday_list.json")
+
+_holiday_days: Optional[np.ndarray] = None
+_holiday_list: Optional[List[datetime.date]] = None
+_load_lock = threading.Lock()
+
+
+def load_holiday_days(file_name: str = HOLIDAY_DATASET_FILE) -> np.ndarray:
+    """Load the packaged holidays as a read-only datetime64[D] array, once per process"""
+    global _holiday_days
+    if file_name != HOLIDAY_DATASET_FILE:
+        return np.load(file_name).astype("datetime64[D]")
+    if _holiday_days is None:
+        with _load_lock:
+            if _holiday_days is None:
+                days = np.load(file_name).astype("datetime64[D]")
+                days.setflags(write=False)
+                _holiday_days = days
+    return _holiday_days
+
+
+def load_holiday_list() -> List[datetime.date]:
+    """Load the packaged holidays as a list of dates, once per process
+
+    The list is shared by every caller and must not be modified.
+    """
+    global _holiday_list
+    if _holiday_list is None:
+        holiday_list = load_holiday_days().tolist()
+        with _load_lock:
+            if _holiday_list is None:
+                _holiday_list = holiday_list
+    return _holiday_list
+
+
+def get_persisted_holiday_list_file() -> str:
+    """Path of the holiday list persisted from the API, outside of the installed package
+
+    $DATX_HOLIDAY_LIST_FILE if set, otherwise datx-common/holiday_list.json in the user cache directory
+    ($XDG_CACHE_HOME, by default ~/.cache).
+    """
+    file_name = os.environ.get(PERSISTED_HOLIDAY_LIST_FILE_ENV)
+    if file_name:
+        return file_name
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "datx-common", "holiday_list.json")
+
+
+def read_persisted_holiday_list(file_name: str) -> List[datetime.date]:
+    """Read the holiday list persisted from the API, falling back to the legacy file next to the package"""
+    try:
+        return read_holiday_list(file_name)
+    except FileNotFoundError:
+        if not os.path.exists(LEGACY_PERSISTED_HOLIDAY_LIST_FILE):
+            raise
+        return read_holiday_list(LEGACY_PERSISTED_HOLIDAY_LIST_FILE)
+
+
+def persist_holiday_list(holiday_list: List[datetime.date], file_name: str) -> bool:
+    """Persist the holiday list fetched from the API, creating its directory
+
+    Returns:
+        bool: whether it was written, a read-only location is logged and otherwise ignored
+    """
+    try:
+        os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+        write_holiday_list(holiday_list, file_name)
+    except OSError as e:
+        logger.warning(f"Failed to persist holiday list to {file_name}. Error: {repr(e)}")
+        return False
+    return True
+
+
+def read_holiday_list(file_name: str) -> List[datetime.date]:
+    """Read a holiday list written by write_holiday_list, as .npy or .json"""
+    if file_name.endswith(".npy"):
+        return load_holiday_days(file_name).tolist()
+    with open(file_name, "r") as f:
+        return [datetime.date.fromisoformat(d) for d in json.load(f)]
+
+
+def write_holiday_list(holiday_list: List[datetime.date], file_name: str) -> None:
+    """Write a holiday list as .npy (sorted int32 days since 1970-01-01) or .json (ISO dates)
+
+    The file is replaced atomically, so that concurrent readers never see a partial list.
+    """
+    tmp_file_name = f"{file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if file_name.endswith(".npy"):
+        days = np.unique(np.array(holiday_list, dtype="datetime64[D]")).astype(np.int64).astype(np.int32)
+        with open(tmp_file_name, "wb") as f:
+            np.save(f, days)
+    else:
+        with open(tmp_file_name, "w") as f:
+            f.write(json.dumps(holiday_list, default=str))
+    os.replace(tmp_file_name, file_name)
@@ -0,0 +1,117 @@
+import datetime
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a failed background refresh is retried, the stale list is served meanwhile
+REFRESH_RETRY_INTERVAL = 60
+
+
+class HolidaySnapshot:
+    """A holiday list shared by the whole process, refreshed with stale-while-revalidate
+
+    The list returned by `get()` is shared and must not be modified. It keeps its identity across refreshes that do
+    not change its content, so that derived data can be cached on it.
+
+    The first `get()` fetches the list and blocks. Afterwards `get()` never blocks: once the list is older than `ttl`
+    seconds the stale list is returned while a background thread fetches a new one. A failed refresh keeps the stale
+    list and is retried after REFRESH_RETRY_INTERVAL seconds.
+
+    Args:
+        fetch (Callable[[], List[datetime.date]]): loads the holiday list
+        ttl (float): seconds after which the list is refreshed
+        clock (Callable[[], float], optional): Defaults to time.monotonic.
+    """
+
+    def __init__(
+        self, fetch: Callable[[], List[datetime.date]], ttl: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.holiday_list: Optional[List[datetime.date]] = None
+        # Incremented whenever the list is replaced, a refresh with the same content keeps the list and the version
+        self.version = 0
+        self.next_refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> List[datetime.date]:
+        holiday_list = self.holiday_list
+        if holiday_list is None:
+            return self._load()
+        if self.clock() >= self.next_refresh_at:
+            with self._lock:
+                start_refresh = not self._refreshing and self.clock() >= self.next_refresh_at
+                self._refreshing = self._refreshing or start_refresh
+            if start_refresh:
+                threading.Thread(target=self._refresh, name="holiday-snapshot-refresh", daemon=True).start()
+        return holiday_list
+
+    def _load(self) -> List[datetime.date]:
+        # Concurrent first callers wait for a single fetch
+        with self._load_lock:
+            if self.holiday_list is None:
+                self._set(self.fetch())
+            return self.holiday_list
+
+    def _refresh(self) -> None:
+        try:
+            self._set(self.fetch())
+        except Exception as e:
+            logger.warning(f"Failed to refresh holiday list, serving the stale one. Error: {repr(e)}")
+            with self._lock:
+                self.next_refresh_at = self.clock() + min(self.ttl, REFRESH_RETRY_INTERVAL)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _set(self, holiday_list: List[datetime.date]) -> None:
+        with self._lock:
+            if holiday_list != self.holiday_list:
+                self.holiday_list = holiday_list
+                self.version += 1
+            self.next_refresh_at = self.clock() + self.ttl
+
+    def invalidate(self) -> None:
+        """Refresh the list on the next `get()`, still serving the current one until then"""
+        with self._lock:
+            self.next_refresh_at = 0.0
+
+
+_snapshots: Dict[str, HolidaySnapshot] = {}
+_snapshots_lock = threading.Lock()
+_clients: Dict[str, httpx.Client] = {}
+
+
+def get_holiday_snapshot(key: str, fetch: Callable[[], List[datetime.date]], ttl: float) -> HolidaySnapshot:
+    """Get the process-wide snapshot of a holiday source, creating it with `fetch` and `ttl` on first use
+
+    Args:
+        key (str): identifies the source, e.g. the API URL or the database table
+        fetch (Callable[[], List[datetime.date]]): loads the holiday list
+        ttl (float): seconds after which the list is refreshed
+
+    Returns:
+        HolidaySnapshot
+    """
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            snapshot = _snapshots[key] = HolidaySnapshot(fetch, ttl)
+        return snapshot
+
+
+def get_http_client(base_url: str) -> httpx.Client:
+    """Get the process-wide httpx.Client of a holiday API, created on first use"""
+    with _snapshots_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = httpx.Client(base_url=base_url)
+        return client
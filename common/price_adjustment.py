@@ -1,10 +1,17 @@
+import logging
 from datetime import date
 from enum import StrEnum
+from typing import Literal
 
+import numpy as np
 import pandas as pd
 
 from common.database_connector import factory
-from common.helper import create_comparison_filter, create_in_filter, create_logical_filter
+from common.helper import ParamFilterBuilder
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ["open", "high", "low", "close"]
 
 
 class EventType(StrEnum):
@@ -14,6 +21,84 @@ class EventType(StrEnum):
     RIGHTS = "RIGHTS"
 
 
+def compute_adjustment_factors(ratios: pd.DataFrame, ratio_col: str = "ratio") -> pd.DataFrame:
+    """Compute the cumulative back-adjustment factors of all symbols at once
+
+    `ratio_col` is the multiplier of an event for the prices before its ex-rights date. The back factor of an event
+    is the product of its ratio and the ratios of all later events of the symbol, it applies to the prices before
+    the event's ex-rights date and after the previous event's one.
+
+    Args:
+        ratios (pd.DataFrame): contains symbol, ex_rights_date and `ratio_col`
+        ratio_col (str, optional): Defaults to "ratio".
+
+    Returns:
+        pd.DataFrame: symbol, ex_rights_date and back_factor sorted by symbol and ex_rights_date, plus total_factor,
+            the product of all ratios of the symbol
+    """
+    factors = ratios[["symbol", "ex_rights_date", ratio_col]].dropna()
+    factors = factors.sort_values(["symbol", "ex_rights_date"], ignore_index=True)
+    # Events on the same day are merged, so that a price date falls between two distinct ex-rights dates
+    factors = factors.groupby(["symbol", "ex_rights_date"], as_index=False, sort=False)[ratio_col].prod()
+    reversed_ratios = factors[ratio_col].iloc[::-1]
+    factors["back_factor"] = reversed_ratios.groupby(factors["symbol"].iloc[::-1], sort=False).cumprod().iloc[::-1]
+    factors["total_factor"] = factors.groupby("symbol", sort=False)["back_factor"].transform("first")
+    return factors[["symbol", "ex_rights_date", "back_factor", "total_factor"]]
+
+
+def apply_adjustment_factors(
+    df: pd.DataFrame, factors: pd.DataFrame, adjust: Literal["back", "forward"] = "back"
+) -> pd.DataFrame:
+    """Adjust the open, high, low and close of OHLCV data, volumes are left as they are
+
+    "back" keeps the latest prices and scales down the history, "forward" keeps the earliest prices and scales up the
+    prices after each event.
+
+    Args:
+        df (pd.DataFrame): OHLCV data with time and symbol
+        factors (pd.DataFrame): output of `compute_adjustment_factors`
+        adjust (Literal["back", "forward"], optional): Defaults to "back".
+
+    Returns:
+        pd.DataFrame: adjusted copy of `df`, in the same order
+    """
+    if adjust not in ("back", "forward"):
+        raise ValueError(f"adjust must be back or forward, got {adjust}")
+    df = df.copy()
+    if df.empty:
+        return df
+    ex_rights_date = pd.to_datetime(factors["ex_rights_date"])
+    if getattr(df["time"].dtype, "tz", None) is not None:
+        ex_rights_date = ex_rights_date.dt.tz_localize(df["time"].dt.tz)
+    factors = factors.assign(ex_rights_date=ex_rights_date.astype(df["time"].dtype)).sort_values("ex_rights_date")
+
+    # For every bar, the first event with an ex-rights date after it
+    order = np.argsort(df["time"].to_numpy(), kind="stable")
+    bars = df[["time", "symbol"]].iloc[order].reset_index(drop=True).assign(position=order)
+    # merge_asof needs the same key types, e.g. a Categorical symbol of compact OHLCV data
+    bars["symbol"] = bars["symbol"].astype(factors["symbol"].dtype)
+    matched = pd.merge_asof(
+        bars,
+        factors[["symbol", "ex_rights_date", "back_factor"]],
+        left_on="time",
+        right_on="ex_rights_date",
+        by="symbol",
+        direction="forward",
+        allow_exact_matches=False,
+    )
+    back_factor = np.ones(len(df))
+    back_factor[matched["position"].to_numpy()] = matched["back_factor"].fillna(1.0).to_numpy()
+    if adjust == "back":
+        factor = back_factor
+    else:
+        total_factor = df["symbol"].map(factors.groupby("symbol")["total_factor"].first()).fillna(1.0).to_numpy()
+        factor = back_factor / total_factor
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col] * factor
+    return df
+
+
 class PriceAdjustment:
     def __init__(
         self,
@@ -32,6 +117,8 @@ class PriceAdjustment:
         self.price_adj_event_table = price_adj_event_table
         self.price_adj_ratio_table = price_adj_ratio_table
         self.conn = factory.get_connector(**db_config)
+        self._factors: dict[tuple[str, str], pd.DataFrame] = {}
+        self._fingerprints: dict[tuple[str, str], tuple] = {}
 
     def get_events(
         self,
@@ -54,23 +141,24 @@ class PriceAdjustment:
         symbol_col = "symbol"
         event_type_col = "event_type"
         ex_rights_date_col = "ex_rights_date"
-        where_predicates = []
+        filter_builder = self._create_filter_builder()
         if symbols and len(symbols) != 0:
-            where_predicates.append(create_in_filter(symbol_col, symbols))
+            filter_builder.add_in(symbol_col, symbols)
         if event_types and len(event_types) != 0:
-            where_predicates.append(create_in_filter(event_type_col, event_types))
+            filter_builder.add_in(event_type_col, event_types)
         if start_date:
-            where_predicates.append(create_comparison_filter(ex_rights_date_col, start_date))
+            filter_builder.add_comparison(ex_rights_date_col, start_date, ">=")
         if end_date:
-            where_predicates.append(create_comparison_filter(ex_rights_date_col, end_date))
-        where_clause = f"WHERE {create_logical_filter(where_predicates, 'AND')}" if len(where_predicates) != 0 else ""
+            filter_builder.add_comparison(ex_rights_date_col, end_date, "<=")
+        where_predicate, params = filter_builder.build("AND")
+        where_clause = f"WHERE {where_predicate}" if where_predicate else ""
         query = f"""
           SELECT *
           FROM {self.price_adj_event_table}
           {where_clause}
         """
 
-        df = self.conn.query_by_sql(query)
+        df = self.conn.query_by_sql(query, params=params)
         return df
 
     def get_ratios(
@@ -88,19 +176,67 @@ class PriceAdjustment:
         """
         symbol_col = "symbol"
         ex_rights_date_col = "ex_rights_date"
-        where_predicates = []
+        filter_builder = self._create_filter_builder()
         if symbols and len(symbols) != 0:
-            where_predicates.append(create_in_filter(symbol_col, symbols))
+            filter_builder.add_in(symbol_col, symbols)
         if start_date:
-            where_predicates.append(create_comparison_filter(ex_rights_date_col, start_date))
+            filter_builder.add_comparison(ex_rights_date_col, start_date, ">=")
         if end_date:
-            where_predicates.append(create_comparison_filter(ex_rights_date_col, end_date))
-        where_clause = f"WHERE {create_logical_filter(where_predicates, 'AND')}" if len(where_predicates) != 0 else ""
+            filter_builder.add_comparison(ex_rights_date_col, end_date, "<=")
+        where_predicate, params = filter_builder.build("AND")
+        where_clause = f"WHERE {where_predicate}" if where_predicate else ""
         query = f"""
           SELECT *
           FROM {self.price_adj_ratio_table}
           {where_clause}
         """
 
-        df = self.conn.query_by_sql(query)
+        df = self.conn.query_by_sql(query, params=params)
         return df
+
+    def get_adjustment_factors(self, symbols: list[str], ratio_col: str = "ratio") -> pd.DataFrame:
+        """Get the cumulative adjustment factors of symbols, see `compute_adjustment_factors`
+
+        Factors are cached per symbol. A cheap count / max(ex_rights_date) query per call detects the symbols with new
+        events, only their ratios are fetched again.
+
+        Args:
+            symbols (list[str]): list of symbols
+            ratio_col (str, optional): column of the ratio table holding the multiplier. Defaults to "ratio".
+
+        Returns:
+            pd.DataFrame: symbol, ex_rights_date, back_factor and total_factor
+        """
+        symbols = list(dict.fromkeys(symbols))
+        filter_builder = self._create_filter_builder().add_in("symbol", symbols)
+        where_predicate, params = filter_builder.build("AND")
+        fingerprint_df = self.conn.query_by_sql(
+            f"""
+          SELECT symbol, count(*) AS num_events, max(ex_rights_date) AS last_ex_rights_date
+          FROM {self.price_adj_ratio_table}
+          WHERE {where_predicate}
+          GROUP BY symbol
+        """,
+            params=params,
+        )
+        fingerprints = {
+            symbol: (num_events, last_ex_rights_date)
+            for symbol, num_events, last_ex_rights_date in fingerprint_df.itertuples(index=False, name=None)
+        }
+        stale_symbols = [
+            symbol
+            for symbol in symbols
+            if (symbol, ratio_col) not in self._factors
+            or self._fingerprints.get((symbol, ratio_col)) != fingerprints.get(symbol)
+        ]
+        if stale_symbols:
+            logger.debug(f"Fetching price adjustment ratios of {len(stale_symbols)} symbol(s)")
+            factors = compute_adjustment_factors(self.get_ratios(stale_symbols), ratio_col)
+            grouped = dict(tuple(factors.groupby("symbol", sort=False)))
+            for symbol in stale_symbols:
+                self._factors[(symbol, ratio_col)] = grouped.get(symbol, factors.iloc[:0])
+                self._fingerprints[(symbol, ratio_col)] = fingerprints.get(symbol)
+        return pd.concat([self._factors[(symbol, ratio_col)] for symbol in symbols], ignore_index=True)
+
+    def _create_filter_builder(self) -> ParamFilterBuilder:
+        return ParamFilterBuilder(array_params=self.conn.engine.dialect.name == "postgresql")
@@ -2,7 +2,7 @@ import requests
 import pandas as pd
 from common.data import HEADERS
 from common.database_connector import factory
-from common.helper import create_comparison_filter, create_in_filter, create_logical_filter
+from common.helper import ParamFilterBuilder
 import logging
 
 INDEX_LIST = [
@@ -100,63 +100,55 @@ class SymbolInfo:
         type: str | list[str] | None = DEFAULT_TYPE,
         columns: list[str] | None = DEFAULT_COLUMNS,
     ):
-        def create_filter(col_name, value):
+        conn = factory.get_connector(**self.db_config)
+        filter_builder = ParamFilterBuilder(array_params=conn.engine.dialect.name == "postgresql")
+
+        def add_filter(col_name, value):
             if isinstance(value, str):
-                filter = create_comparison_filter(col_name, value, "=")
+                filter_builder.add_comparison(col_name, value, "=")
             elif isinstance(value, list):
-                filter = create_in_filter(col_name, value)
+                filter_builder.add_in(col_name, value)
             else:
                 raise ValueError(f"Not supported type={type(value)} for `{col_name}`")
 
-            return filter
-
         exchange_col = "exchange"
         status_col = "status"
         type_col = "type"
 
-        filters = []
-        if exchange is None:
-            exchange_filter = None
-        else:
-            exchange_filter = create_filter(exchange_col, exchange)
-            filters.append(exchange_filter)
+        if exchange is not None:
+            add_filter(exchange_col, exchange)
 
-        if status is None:
-            status_filter = None
-        else:
-            status_filter = create_filter(status_col, status)
-            filters.append(status_filter)
+        if status is not None:
+            add_filter(status_col, status)
 
-        if type is None:
-            type_filter = None
-        else:
-            type_filter = create_filter(type_col, type)
-            filters.append(type_filter)
+        if type is not None:
+            add_filter(type_col, type)
 
         if columns is None:
             columns_str = "*"
         else:
             if isinstance(columns, str):
                 columns = [columns]
+            else:
+                columns = list(columns)
 
-            if exchange_filter is not None and exchange_col not in columns:
+            if exchange is not None and exchange_col not in columns:
                 columns.append(exchange_col)
 
-            if status_filter is not None and status_col not in columns:
+            if status is not None and status_col not in columns:
                 columns.append(status_col)
 
-            if type_filter is not None and type_col not in columns:
+            if type is not None and type_col not in columns:
                 columns.append(type_col)
 
             columns_str = ", ".join(columns)
 
         query = f"SELECT {columns_str} FROM {self.schema_name}.{self.table_name}"
-        if len(filters) > 0:
-            where_predicate = create_logical_filter(filters, "AND")
+        where_predicate, params = filter_builder.build("AND")
+        if where_predicate:
             query = f"{query} WHERE {where_predicate}"
 
-        conn = factory.get_connector(**self.db_config)
-        df = conn.query_by_sql(query)
+        df = conn.query_by_sql(query, params=params)
         return df
 
     def get_symbol_list(
@@ -1,23 +1,104 @@
 import datetime
-import json
 import logging
 import pandas as pd
 
-import httpx
 import numpy as np
-from cachetools import TTLCache, cached
 from typing import List, Union
 import os
 
+from common.holiday_dataset import (
+    get_persisted_holiday_list_file,
+    load_holiday_list,
+    persist_holiday_list,
+    read_persisted_holiday_list,
+)
+from common.holiday_snapshot import get_holiday_snapshot, get_http_client
+
 current_location = os.path.dirname(os.path.realpath(__file__))
 
 TRADING_HOLIDAY_PATH = "/trading_holiday/"
 COMMON_API_ENDPOINT = "https://common-api.datx.vn"
 CACHED_TTL = 600
-PERSISTED_HOLIDAY_LIST_FILE = current_location + "/../holiday_list.json"
+# Resolved at import, see get_persisted_holiday_list_file
+PERSISTED_HOLIDAY_LIST_FILE = get_persisted_holiday_list_file()
 
 logger = logging.getLogger(__name__)
 
+WEEKMASK = "1111100"
+# Years of trading days indexed around the holiday list, dates outside fall back to np.busday_* on the calendar
+INDEXED_YEARS_MARGIN = 10
+
+
+DateArray = Union[np.ndarray, pd.Series, pd.DatetimeIndex, List[datetime.date]]
+
+
+def _to_days(dates: DateArray) -> np.ndarray:
+    """Convert dates to a datetime64[D] array, time zone aware values are taken at their local date"""
+    if isinstance(dates, (pd.Series, pd.DatetimeIndex)):
+        dates = pd.DatetimeIndex(dates)
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        return dates.to_numpy().astype("datetime64[D]")
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+def _like(values: np.ndarray, dates: DateArray) -> Union[np.ndarray, pd.Series]:
+    """Return the result as a Series aligned with `dates` when it is one"""
+    if isinstance(dates, pd.Series):
+        return pd.Series(values, index=dates.index, name=dates.name)
+    return values
+
+
+class CompiledCalendar:
+    """A holiday list compiled into a np.busdaycalendar and a sorted array of trading days
+
+    Membership, offsets and counts inside the indexed range are binary searches on `trading_days`, the position of a
+    day in the array being its cumulative trading day count.
+    """
+
+    def __init__(self, holiday_list: List[datetime.date]) -> None:
+        self.holiday_list = holiday_list
+        holidays = np.array(sorted(holiday_list), dtype="datetime64[D]")
+        self.busdaycalendar = np.busdaycalendar(weekmask=WEEKMASK, holidays=holidays)
+        if len(holidays):
+            first_year, last_year = holidays[0].astype(object).year, holidays[-1].astype(object).year
+        else:
+            first_year = last_year = datetime.date.today().year
+        self.first_day = np.datetime64(f"{first_year - INDEXED_YEARS_MARGIN}-01-01", "D")
+        self.last_day = np.datetime64(f"{last_year + INDEXED_YEARS_MARGIN}-12-31", "D")
+        days = np.arange(self.first_day, self.last_day + 1, dtype="datetime64[D]")
+        self.trading_days = days[np.is_busday(days, busdaycal=self.busdaycalendar)]
+
+    def in_index(self, begin: np.datetime64, end: np.datetime64) -> bool:
+        return self.first_day <= begin and end <= self.last_day
+
+    def is_busday(self, date: np.datetime64) -> bool:
+        if self.in_index(date, date):
+            position = np.searchsorted(self.trading_days, date)
+            return position < len(self.trading_days) and self.trading_days[position] == date
+        return bool(np.is_busday(date, busdaycal=self.busdaycalendar))
+
+    def count(self, begin: np.datetime64, end: np.datetime64) -> int:
+        """Number of trading days in [begin, end)"""
+        if end <= begin:
+            return 0
+        if self.in_index(begin, end):
+            return int(np.searchsorted(self.trading_days, end) - np.searchsorted(self.trading_days, begin))
+        return int(np.busday_count(begin, end, busdaycal=self.busdaycalendar))
+
+    def between(self, begin: np.datetime64, end: np.datetime64) -> np.ndarray:
+        """Trading days in [begin, end]"""
+        if self.in_index(begin, end):
+            start = np.searchsorted(self.trading_days, begin, side="left")
+            stop = np.searchsorted(self.trading_days, end, side="right")
+            return self.trading_days[start:stop]
+        days = np.arange(begin, end + 1, dtype="datetime64[D]")
+        return days[np.is_busday(days, busdaycal=self.busdaycalendar)]
+
+
+# Last compiled calendar, reused by the instances sharing its holiday list (hard coded or API snapshot)
+_last_compiled: CompiledCalendar | None = None
+
 
 class TradingCalendar:
     def __init__(self, cache_to_file: bool = True, use_hard_coded_data: bool = False) -> None:
@@ -30,29 +111,43 @@ class TradingCalendar:
         `use_harded_code_data` (bool): A boolean indicating whether to use hard coded data.
         """
         self.use_harded_code_data = use_hard_coded_data
+        self._compiled: CompiledCalendar | None = None
         if self.use_harded_code_data:
-            from common.trading_holiday_list import HARD_CODED_TRADING_HOLIDAY_LIST
-
-            self.holiday_list = [datetime.date.fromisoformat(holiday) for holiday in HARD_CODED_TRADING_HOLIDAY_LIST]
+            # Shared by all instances, the list is only replaced and never modified in place
+            self.holiday_list = load_holiday_list()
         else:
-            self.client = httpx.Client(base_url=COMMON_API_ENDPOINT)
+            self.client = get_http_client(COMMON_API_ENDPOINT)
             self.cache_to_file = cache_to_file
 
-    @cached(cache=TTLCache(maxsize=1, ttl=CACHED_TTL))
     def get_holiday_list(self) -> List[datetime.date]:
-        """Get holiday list, caching and return it
+        """Get holiday list from the snapshot shared by the process and return a copy of it
+
+        The list is fetched once per process, then refreshed in the background every CACHED_TTL seconds while the
+        current one keeps being served.
 
         Returns:
-            list[datetime.date]
+            List[datetime.date]
         """
+        return list(self._get_shared_holiday_list())
+
+    def _get_shared_holiday_list(self) -> List[datetime.date]:
+        """Return the holiday list shared by all calendars, it must not be modified"""
         if self.use_harded_code_data:
             return self.holiday_list
 
+        snapshot = get_holiday_snapshot(
+            f"{COMMON_API_ENDPOINT}{TRADING_HOLIDAY_PATH}?cache_to_file={self.cache_to_file}",
+            self._fetch_holiday_list,
+            CACHED_TTL,
+        )
+        self.holiday_list = snapshot.get()
+        return self.holiday_list
+
+    def _fetch_holiday_list(self) -> List[datetime.date]:
         try:
             res = self.client.get(TRADING_HOLIDAY_PATH)
             res.raise_for_status()
             holiday_list = [datetime.date.fromisoformat(d) for d in res.json()["data"]]
-            self.holiday_list = holiday_list.copy()
             if self.cache_to_file:
                 self._persist_holiday_list(holiday_list)
             return holiday_list
@@ -60,14 +155,27 @@ class TradingCalendar:
             if self.cache_to_file:
                 logger.info(f"Failed to get holiday list from api. Reading from file. Error: {repr(e)}")
                 try:
-                    holiday_list = self._read_peristed_holiday_list()
+                    return self._read_peristed_holiday_list()
                 except FileNotFoundError as e:
                     logger.error("Persisted holiday list file not found.")
                     raise e
-                self.holiday_list = holiday_list.copy()
-                return holiday_list
             raise e
 
+    def get_compiled_calendar(self) -> CompiledCalendar:
+        """Get the compiled calendar of the current holiday list, it is rebuilt only when the list changes"""
+        holiday_list = self._get_shared_holiday_list()
+        global _last_compiled
+        compiled = self._compiled
+        # The shared list keeps its identity while its content does not change, see HolidaySnapshot
+        if compiled is None or compiled.holiday_list is not holiday_list:
+            last_compiled = _last_compiled
+            if last_compiled is not None and last_compiled.holiday_list is holiday_list:
+                compiled = last_compiled
+            else:
+                compiled = _last_compiled = CompiledCalendar(holiday_list)
+            self._compiled = compiled
+        return compiled
+
     def get_holiday_list_for_year(self, year: int) -> List[datetime.date]:
         """Get holiday list for a given year
 
@@ -77,19 +185,15 @@ class TradingCalendar:
         Returns:
             list[datetime.date]
         """
-        holiday_list = self.get_holiday_list()
+        holiday_list = self._get_shared_holiday_list()
         return [d for d in holiday_list if d.year == year]
 
     def _persist_holiday_list(self, holiday_list: List[datetime.date], file_name=PERSISTED_HOLIDAY_LIST_FILE) -> None:
-        with open(file_name, "w") as f:
-            json_str = json.dumps(holiday_list, default=str)
-            f.write(json_str)
+        if persist_holiday_list(holiday_list, file_name):
             logger.info("Holiday list persisted to file.")
 
     def _read_peristed_holiday_list(self, file_name=PERSISTED_HOLIDAY_LIST_FILE) -> List[datetime.date]:
-        with open(file_name, "r") as f:
-            holiday_list = json.loads(f.read())
-            return [datetime.date.fromisoformat(d) for d in holiday_list]
+        return read_persisted_holiday_list(file_name)
 
     def is_business_day(self, to_check_date: Union[datetime.datetime, datetime.date, None] = datetime.date.today()) -> bool:
         """
@@ -107,8 +211,7 @@ class TradingCalendar:
         if weekday == 5 or weekday == 6:
             return False
 
-        self.get_holiday_list()
-        return to_check_date not in self.holiday_list
+        return self.get_compiled_calendar().is_busday(np.datetime64(to_check_date, "D"))
 
     def get_offset_busday(self, date: datetime.date, offset=-1, on_zero_offset_roll="backward") -> np.datetime64:
         """
@@ -123,15 +226,77 @@ class TradingCalendar:
         Returns:
             np.datetime64: The resulting date after applying the business day offset.
         """
-        self.get_holiday_list()
         roll = "backward" if offset < 0 else "forward" if offset > 0 else on_zero_offset_roll
         return np.busday_offset(
             date,
             offsets=offset,
             roll=roll,
-            holidays=self.holiday_list,
+            busdaycal=self.get_compiled_calendar().busdaycalendar,
         )
 
+    def is_business_day_many(self, dates: DateArray) -> Union[np.ndarray, pd.Series]:
+        """
+        Vectorised `is_business_day`.
+
+        Args:
+            dates (np.ndarray | pd.Series | pd.DatetimeIndex | list): The dates to check, NaT is not a business day.
+
+        Returns:
+            np.ndarray | pd.Series: Booleans, a Series aligned with `dates` when it is one.
+        """
+        days = _to_days(dates)
+        return _like(np.is_busday(days, busdaycal=self.get_compiled_calendar().busdaycalendar), dates)
+
+    def offset_busday_many(
+        self,
+        dates: DateArray,
+        offsets: Union[int, np.ndarray, pd.Series] = -1,
+        on_zero_offset_roll: str = "backward",
+    ) -> Union[np.ndarray, pd.Series]:
+        """
+        Vectorised `get_offset_busday`, rolling backward for negative offsets and forward for positive ones.
+
+        Args:
+            dates (np.ndarray | pd.Series | pd.DatetimeIndex | list): The dates to start from.
+            offsets (int | np.ndarray | pd.Series, optional): The business day offset of every date. Defaults to -1.
+            on_zero_offset_roll (str, optional): The direction to roll if the offset is zero. Defaults to "backward".
+
+        Returns:
+            np.ndarray | pd.Series: datetime64[D] dates, a Series aligned with `dates` when it is one.
+        """
+        days = _to_days(dates)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        busdaycal = self.get_compiled_calendar().busdaycalendar
+        if offsets.ndim == 0:
+            roll = "backward" if offsets < 0 else "forward" if offsets > 0 else on_zero_offset_roll
+            result = np.busday_offset(days, offsets, roll=roll, busdaycal=busdaycal)
+        else:
+            forward = np.busday_offset(days, offsets, roll="forward", busdaycal=busdaycal)
+            backward = np.busday_offset(days, offsets, roll="backward", busdaycal=busdaycal)
+            roll_forward = (offsets > 0) | ((offsets == 0) & (on_zero_offset_roll == "forward"))
+            result = np.where(roll_forward, forward, backward)
+        return _like(result, dates)
+
+    def busday_diff_many(self, start_dates: DateArray, end_dates: DateArray) -> Union[np.ndarray, pd.Series]:
+        """
+        Vectorised `get_busday_diff` without time: the number of business days strictly between the dates.
+
+        Args:
+            start_dates (np.ndarray | pd.Series | pd.DatetimeIndex | list): The start dates.
+            end_dates (np.ndarray | pd.Series | pd.DatetimeIndex | list): The end dates.
+
+        Returns:
+            np.ndarray | pd.Series: timedelta64[D] differences, NaT where a date is NaT, a Series aligned with
+                `start_dates` when it is one.
+        """
+        start_days, end_days = np.broadcast_arrays(_to_days(start_dates), _to_days(end_dates))
+        valid = ~(np.isnat(start_days) | np.isnat(end_days))
+        begin = np.where(valid, start_days + 1, np.datetime64(0, "D"))
+        end = np.where(valid, end_days, np.datetime64(0, "D"))
+        counts = np.busday_count(begin, np.maximum(begin, end), busdaycal=self.get_compiled_calendar().busdaycalendar)
+        result = np.where(valid, counts.astype("timedelta64[D]"), np.timedelta64("NaT", "D"))
+        return _like(result, start_dates)
+
     def get_busday_diff(
         self,
         start_date: Union[pd.Timestamp, datetime.datetime, datetime.date],
@@ -145,22 +310,18 @@ class TradingCalendar:
             start_date (pd.Timestamp | datetime.datetime | datetime.date): The start date.
             end_date (pd.Timestamp | datetime.datetime | datetime.date): The end date.
             included_time (bool, optional): Whether to include time in the calculation. Defaults to False.
+            Every business day counts for 24 hours, use TradingSession.trading_minutes_between for trading hours.
 
         Returns:
             pd.Timedelta: The business day difference between the two dates.
         """
-        self.get_holiday_list()
         start_date = pd.Timestamp(start_date)
         end_date = pd.Timestamp(end_date)
+        # Trading days strictly between the two dates
         diff_without_time = pd.Timedelta(
-            days=pd.bdate_range(
-                start_date,
-                end_date,
-                freq="C",
-                weekmask="1111100",
-                holidays=self.holiday_list,
-                inclusive="neither",
-            ).size
+            days=self.get_compiled_calendar().count(
+                np.datetime64(start_date.date(), "D") + 1, np.datetime64(end_date.date(), "D")
+            )
         )
         if not included_time:
             return diff_without_time
@@ -189,17 +350,6 @@ class TradingCalendar:
         Returns:
             List[datetime.datetime]: A list of trading days between the two dates.
         """
-        self.get_holiday_list()
-        start_date = pd.Timestamp(start_date)
-        end_date = pd.Timestamp(end_date)
-        return (
-            pd.bdate_range(
-                start_date,
-                end_date,
-                freq="C",
-                weekmask="1111100",
-                holidays=self.holiday_list,
-            )
-            .to_pydatetime()
-            .tolist()
-        )
+        start_date = np.datetime64(pd.Timestamp(start_date).date(), "D")
+        end_date = np.datetime64(pd.Timestamp(end_date).date(), "D")
+        return self.get_compiled_calendar().between(start_date, end_date).astype("datetime64[us]").tolist()
@@ -1,21 +1,26 @@
 import datetime
-import json
 import logging
 import pandas as pd
 
-import httpx
 import numpy as np
-from cachetools import TTLCache, cached
 from typing import Union, Literal
 import os
 
+from common.holiday_dataset import (
+    get_persisted_holiday_list_file,
+    load_holiday_list,
+    persist_holiday_list,
+    read_persisted_holiday_list,
+)
+from common.holiday_snapshot import get_holiday_snapshot, get_http_client
+
 current_location = os.path.dirname(os.path.realpath(__file__))
 
 TRADING_HOLIDAY_PATH = "/trading_holiday/"
 COMMON_API_ENDPOINT = "https://common-api.datx.vn"
 CACHED_TTL = 600
-PERSISTED_HOLIDAY_LIST_FILE = current_location + "/../holiday_list.json"
-print('holiday file located at:',PERSISTED_HOLIDAY_LIST_FILE)
+# Resolved at import, see get_persisted_holiday_list_file
+PERSISTED_HOLIDAY_LIST_FILE = get_persisted_holiday_list_file()
 logger = logging.getLogger(__name__)
 
 
@@ -31,28 +36,41 @@ class TradingCalendar:
         """
         self.use_harded_code_data = use_hard_coded_data
         if self.use_harded_code_data:
-            from common.trading_holiday_list import HARD_CODED_TRADING_HOLIDAY_LIST
-
-            self.holiday_list = [datetime.date.fromisoformat(holiday) for holiday in HARD_CODED_TRADING_HOLIDAY_LIST]
+            # Shared by all instances, the list is only replaced and never modified in place
+            self.holiday_list = load_holiday_list()
         else:
-            self.client = httpx.Client(base_url=COMMON_API_ENDPOINT)
+            self.client = get_http_client(COMMON_API_ENDPOINT)
             self.cache_to_file = cache_to_file
 
-    @cached(cache=TTLCache(maxsize=1, ttl=CACHED_TTL))
     def get_holiday_list(self) -> list[datetime.date]:
-        """Get holiday list, caching and return it
+        """Get holiday list from the snapshot shared by the process and return a copy of it
+
+        The list is fetched once per process, then refreshed in the background every CACHED_TTL seconds while the
+        current one keeps being served.
 
         Returns:
             list[datetime.date]
         """
+        return list(self._get_shared_holiday_list())
+
+    def _get_shared_holiday_list(self) -> list[datetime.date]:
+        """Return the holiday list shared by all calendars, it must not be modified"""
         if self.use_harded_code_data:
             return self.holiday_list
 
+        snapshot = get_holiday_snapshot(
+            f"{COMMON_API_ENDPOINT}{TRADING_HOLIDAY_PATH}?cache_to_file={self.cache_to_file}",
+            self._fetch_holiday_list,
+            CACHED_TTL,
+        )
+        self.holiday_list = snapshot.get()
+        return self.holiday_list
+
+    def _fetch_holiday_list(self) -> list[datetime.date]:
         try:
             res = self.client.get(TRADING_HOLIDAY_PATH)
             res.raise_for_status()
             holiday_list = [datetime.date.fromisoformat(d) for d in res.json()["data"]]
-            self.holiday_list = holiday_list.copy()
             if self.cache_to_file:
                 self._persist_holiday_list(holiday_list)
             return holiday_list
@@ -60,12 +78,10 @@ class TradingCalendar:
             if self.cache_to_file:
                 logger.info(f"Failed to get holiday list from api. Reading from file. Error: {repr(e)}")
                 try:
-                    holiday_list = self._read_peristed_holiday_list()
+                    return self._read_peristed_holiday_list()
                 except FileNotFoundError as e:
                     logger.error("Persisted holiday list file not found.")
                     raise e
-                self.holiday_list = holiday_list.copy()
-                return holiday_list
             raise e
 
     def get_holiday_list_for_year(self, year: int, output_option: Literal["datetime", "str"]) -> list[datetime.date]:
@@ -77,23 +93,19 @@ class TradingCalendar:
         Returns:
             list[datetime.date]
         """
-        holiday_list = self.get_holiday_list()
+        holiday_list = self._get_shared_holiday_list()
         if output_option == "str":
             return [d.isoformat() for d in holiday_list if d.year == year]
         else:
             return [d for d in holiday_list if d.year == year]
 
     def _persist_holiday_list(self, holiday_list: list[datetime.date], file_name=PERSISTED_HOLIDAY_LIST_FILE) -> None:
-        with open(file_name, "w") as f:
-            json_str = json.dumps(holiday_list, default=str)
-            f.write(json_str)
+        if persist_holiday_list(holiday_list, file_name):
             logger.info("Holiday list persisted to file.")
 
     def _read_peristed_holiday_list(self, file_name=PERSISTED_HOLIDAY_LIST_FILE) -> list[datetime.date]:
         logger.info("Reading persisted holiday list from file: {}".format(file_name))
-        with open(file_name, "r") as f:
-            holiday_list = json.loads(f.read())
-            return [datetime.date.fromisoformat(d) for d in holiday_list]
+        return read_persisted_holiday_list(file_name)
 
     def is_business_day(
         self, to_check_date: Union[datetime.datetime, datetime.date, None] = datetime.date.today()
@@ -113,7 +125,7 @@ class TradingCalendar:
         if weekday == 5 or weekday == 6:
             return False
 
-        self.get_holiday_list()
+        self._get_shared_holiday_list()
         return to_check_date not in self.holiday_list
 
     def get_offset_busday(self, date: datetime.date, offset=-1, on_zero_offset_roll="backward") -> np.datetime64:
@@ -129,7 +141,7 @@ class TradingCalendar:
         Returns:
             np.datetime64: The resulting date after applying the business day offset.
         """
-        self.get_holiday_list()
+        self._get_shared_holiday_list()
         roll = "backward" if offset < 0 else "forward" if offset > 0 else on_zero_offset_roll
         return np.busday_offset(
             date,
@@ -155,7 +167,7 @@ class TradingCalendar:
         Returns:
             pd.Timedelta: The business day difference between the two dates.
         """
-        self.get_holiday_list()
+        self._get_shared_holiday_list()
         start_date = pd.Timestamp(start_date)
         end_date = pd.Timestamp(end_date)
         diff_without_time = pd.Timedelta(
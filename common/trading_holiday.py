@@ -1,11 +1,32 @@
+import functools
+import logging
 from datetime import date, datetime, timedelta
 
 from common.database_connector import factory
+from common.holiday_dataset import load_holiday_list
+from common.holiday_snapshot import get_holiday_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _query_holiday_list(conn, holiday_table_name: str) -> list[date]:
+    query = f"SELECT * FROM {holiday_table_name}"
+    return conn.query_by_sql(query).date.tolist()
+
+
+def _snapshot_key(holiday_db_config: dict, holiday_table_name: str, cache_ttl: timedelta) -> str:
+    """Identify a holiday table and how it is read, every setting but the password is part of the key"""
+    settings = ",".join(f"{key}={value}" for key, value in sorted(holiday_db_config.items()) if key != "password")
+    return f"db:{settings}/{holiday_table_name}?ttl={cache_ttl.total_seconds()}"
 
 
 class TradingHoliday:
     def __init__(
-        self, holiday_db_config: dict, holiday_table_name="holiday", cache_ttl: timedelta = timedelta(days=1)
+        self,
+        holiday_db_config: dict,
+        holiday_table_name="holiday",
+        cache_ttl: timedelta = timedelta(days=1),
+        fallback_to_hard_coded_data: bool = False,
     ) -> None:
         """Provide holiday list from db
 
@@ -13,25 +34,40 @@ class TradingHoliday:
             holiday_db_config (dict): contains database_type, host, port, username, password, database_name
             holiday_table_name (str, optional): Defaults to "holiday".
             cache_ttl (timedelta, optional): TTL for caching the holiday list. Defaults to timedelta(days=1).
+            fallback_to_hard_coded_data (bool, optional): use the packaged holiday list while the db cannot be
+                queried and no list was loaded yet. Defaults to False.
         """
         self.db_config = holiday_db_config
         self.conn = factory.get_connector(**holiday_db_config)
         self.holiday_table_name = holiday_table_name
         self.holiday_list = None
         self.cache_ttl = cache_ttl
-        self.last_call_time = None
+        self.fallback_to_hard_coded_data = fallback_to_hard_coded_data
+        # The snapshot outlives this instance, it fetches through a function of the settings in its key only
+        self.snapshot = get_holiday_snapshot(
+            _snapshot_key(holiday_db_config, holiday_table_name, cache_ttl),
+            functools.partial(_query_holiday_list, self.conn, holiday_table_name),
+            cache_ttl.total_seconds(),
+        )
 
     def get_holiday_list(self) -> list[date]:
-        """get holiday list, caching and return it
+        """get holiday list from the snapshot shared by the instances reading the same table and return a copy of it
 
         Returns:
             list[date]
         """
-        now = datetime.now()
-        if not self.last_call_time or now - self.last_call_time >= self.cache_ttl:
-            query = f"SELECT * FROM {self.holiday_table_name}"
-            self.holiday_list = self.conn.query_by_sql(query).date.tolist()
-            self.last_call_time = datetime.now()
+        return list(self._get_shared_holiday_list())
+
+    def _get_shared_holiday_list(self) -> list[date]:
+        """Return the holiday list shared by the instances, it must not be modified"""
+        try:
+            self.holiday_list = self.snapshot.get()
+        except Exception as e:
+            # Only the first load raises, failed refreshes keep serving the previous list
+            if not self.fallback_to_hard_coded_data:
+                raise e
+            logger.warning(f"Failed to get holiday list from db. Using hard coded data. Error: {repr(e)}")
+            self.holiday_list = load_holiday_list()
         return self.holiday_list
 
     def is_business_day(self, to_check_date: datetime | date | None = date.today()) -> bool:
@@ -41,5 +77,4 @@ class TradingHoliday:
         if weekday == 5 or weekday == 6:
             return False
 
-        self.get_holiday_list()
-        return to_check_date not in self.holiday_list
+        return to_check_date not in self._get_shared_holiday_list()
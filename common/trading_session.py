@@ -0,0 +1,225 @@
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Literal, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from common.data_feed.timescale.table_definition import STOCK_RESOLUTION_TABLE_NAME_MAP
+from common.trading_calendar import DateArray, TradingCalendar, _like
+
+LOCAL_TIME_ZONE = "Asia/Ho_Chi_Minh"
+# Vietnam has no daylight saving time, local time is always GMT+7
+LOCAL_UTC_OFFSET = np.timedelta64(7, "h")
+MINUTES_PER_DAY = 24 * 60
+# Any trading day, cumulative trading minutes are counted from it
+_ANCHOR_DAY = np.datetime64("2000-01-03", "D")
+
+TimeArray = Union[DateArray, pd.Timestamp, datetime.datetime]
+
+
+@dataclass(frozen=True)
+class SessionTemplate:
+    """Trading periods of an exchange in local time, each one is [start, end)
+
+    The lunch break is the gap between the periods, the ATC auction is part of the last one.
+    """
+
+    exchange: str
+    periods: Tuple[Tuple[datetime.time, datetime.time], ...]
+
+    @property
+    def open(self) -> datetime.time:
+        return self.periods[0][0]
+
+    @property
+    def close(self) -> datetime.time:
+        return self.periods[-1][1]
+
+
+SESSION_TEMPLATES: Dict[str, SessionTemplate] = {
+    # ATO and continuous 9:00-11:30, continuous 13:00-14:30, ATC 14:30-14:45
+    "HOSE": SessionTemplate(
+        "HOSE", ((datetime.time(9, 0), datetime.time(11, 30)), (datetime.time(13, 0), datetime.time(14, 45)))
+    ),
+    # As HOSE, followed by the post-close (PLO) session until 15:00
+    "HNX": SessionTemplate(
+        "HNX", ((datetime.time(9, 0), datetime.time(11, 30)), (datetime.time(13, 0), datetime.time(15, 0)))
+    ),
+    # Continuous trading only
+    "UPCOM": SessionTemplate(
+        "UPCOM", ((datetime.time(9, 0), datetime.time(11, 30)), (datetime.time(13, 0), datetime.time(15, 0)))
+    ),
+    # ATO 8:45-9:00, continuous 9:00-11:30 and 13:00-14:30, ATC 14:30-14:45
+    "DERIVATIVES": SessionTemplate(
+        "DERIVATIVES", ((datetime.time(8, 45), datetime.time(11, 30)), (datetime.time(13, 0), datetime.time(14, 45)))
+    ),
+}
+
+
+def _minute_of_day(time: datetime.time) -> int:
+    return time.hour * 60 + time.minute
+
+
+class TradingSession:
+    """Intraday calendar of an exchange, the trading days of a TradingCalendar with the periods of a SessionTemplate
+
+    The session is compiled into per-minute lookup tables of the local day, so that the methods are vectorised over
+    arrays, Series or DatetimeIndex of timestamps.
+
+    Naive timestamps are read and returned in `timezone`: "local" (GMT+7) or "GMT", the time zone of the OHLCV tables.
+    Time zone aware timestamps are converted to local time first.
+
+    Args:
+        exchange (str, optional): a key of SESSION_TEMPLATES. Defaults to "HOSE".
+        trading_calendar (TradingCalendar | None, optional): Defaults to None, a TradingCalendar().
+        timezone (str, optional): time zone of naive timestamps. Defaults to "local".
+    """
+
+    def __init__(
+        self,
+        exchange: Literal["HOSE", "HNX", "UPCOM", "DERIVATIVES"] = "HOSE",
+        trading_calendar: TradingCalendar | None = None,
+        timezone: Literal["local", "GMT"] = "local",
+    ) -> None:
+        if exchange not in SESSION_TEMPLATES:
+            raise ValueError(f"Unsupported exchange: {exchange}")
+        if timezone not in ("local", "GMT"):
+            raise ValueError(f"timezone must be local or GMT, got {timezone}")
+        self.template = SESSION_TEMPLATES[exchange]
+        self.trading_calendar = trading_calendar if trading_calendar is not None else TradingCalendar()
+        self.timezone = timezone
+
+        self.period_starts = np.array([_minute_of_day(start) for start, _ in self.template.periods])
+        self.period_ends = np.array([_minute_of_day(end) for _, end in self.template.periods])
+        # is_trading_minute[m]: minute m of the local day is in a period, elapsed[m]: trading minutes before minute m
+        self.is_trading_minute = np.zeros(MINUTES_PER_DAY, dtype=bool)
+        for start, end in zip(self.period_starts, self.period_ends):
+            self.is_trading_minute[start:end] = True
+        self.elapsed = np.concatenate([[0], np.cumsum(self.is_trading_minute)])
+        self.minutes_per_session = int(self.elapsed[-1])
+        self._bar_offsets: Dict[str, np.ndarray] = {}
+
+    def _to_local(self, times: TimeArray) -> Tuple[np.ndarray, bool]:
+        """Convert timestamps to a naive datetime64[ns] array in local time, also telling whether `times` is a scalar"""
+        is_scalar = np.ndim(times) == 0
+        index = pd.DatetimeIndex(pd.to_datetime([times] if is_scalar else times))
+        if index.tz is not None:
+            return index.tz_convert(LOCAL_TIME_ZONE).tz_localize(None).to_numpy(), is_scalar
+        values = index.to_numpy().astype("datetime64[ns]")
+        return (values + LOCAL_UTC_OFFSET if self.timezone == "GMT" else values), is_scalar
+
+    def _from_local(self, values: np.ndarray) -> np.ndarray:
+        return values - LOCAL_UTC_OFFSET if self.timezone == "GMT" else values
+
+    def _split(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Split local timestamps into their day, minute of day and second fraction of the minute, NaT as the anchor"""
+        valid = ~np.isnat(values)
+        values = np.where(valid, values, _ANCHOR_DAY)
+        days = values.astype("datetime64[D]")
+        minutes = (values - days) / np.timedelta64(1, "m")
+        minute = np.floor(minutes).astype(np.intp)
+        return days, minute, minutes - minute, valid
+
+    def _cumulative_minutes(self, values: np.ndarray) -> np.ndarray:
+        """Trading minutes from the anchor day to every local timestamp, NaN for NaT"""
+        busdaycal = self.trading_calendar.get_compiled_calendar().busdaycalendar
+        days, minute, fraction, valid = self._split(values)
+        sessions_before = np.busday_count(_ANCHOR_DAY, days, busdaycal=busdaycal)
+        in_day = self.elapsed[minute] + self.is_trading_minute[minute] * fraction
+        in_day = np.where(np.is_busday(days, busdaycal=busdaycal), in_day, 0)
+        return np.where(valid, sessions_before * self.minutes_per_session + in_day, np.nan)
+
+    def is_open(self, times: TimeArray) -> Union[bool, np.ndarray, pd.Series]:
+        """Whether the exchange is trading at every timestamp, False in the lunch break and on non-trading days"""
+        values, is_scalar = self._to_local(times)
+        days, minute, _, valid = self._split(values)
+        busdaycal = self.trading_calendar.get_compiled_calendar().busdaycalendar
+        result = valid & self.is_trading_minute[minute] & np.is_busday(days, busdaycal=busdaycal)
+        return bool(result[0]) if is_scalar else _like(result, times)
+
+    def trading_minutes_between(self, start: TimeArray, end: TimeArray) -> Union[float, np.ndarray, pd.Series]:
+        """Trading minutes from `start` to `end`, lunch breaks, nights, weekends and holidays excluded
+
+        Args:
+            start (TimeArray): start timestamps
+            end (TimeArray): end timestamps, broadcast against `start`
+
+        Returns:
+            float | np.ndarray | pd.Series: the minutes, negative when end is before start and NaN for NaT
+        """
+        start_values, start_is_scalar = self._to_local(start)
+        end_values, end_is_scalar = self._to_local(end)
+        result = self._cumulative_minutes(end_values) - self._cumulative_minutes(start_values)
+        if start_is_scalar and end_is_scalar:
+            return float(result[0])
+        return _like(result, end if start_is_scalar else start)
+
+    def next_session_open(self, times: TimeArray) -> Union[pd.Timestamp, np.ndarray, pd.Series]:
+        """Start of the first trading period at or after every timestamp, e.g. 13:00 during the lunch break
+
+        Returns:
+            pd.Timestamp | np.ndarray | pd.Series: naive timestamps in `timezone`, NaT for NaT
+        """
+        values, is_scalar = self._to_local(times)
+        busdaycal = self.trading_calendar.get_compiled_calendar().busdaycalendar
+        days, minute, fraction, valid = self._split(values)
+        position = np.searchsorted(self.period_starts, minute + (fraction > 0), side="left")
+        same_day = np.is_busday(days, busdaycal=busdaycal) & (position < len(self.period_starts))
+        next_day = np.busday_offset(days + 1, 0, roll="forward", busdaycal=busdaycal)
+        same_day_open = self.period_starts[np.minimum(position, len(self.period_starts) - 1)]
+        open_minute = np.where(same_day, same_day_open, self.period_starts[0])
+        result = np.where(same_day, days, next_day).astype("datetime64[ns]") + open_minute.astype("timedelta64[m]")
+        result = np.where(valid, self._from_local(result), np.datetime64("NaT", "ns"))
+        return pd.Timestamp(result[0]) if is_scalar else _like(result, times)
+
+    def bar_offsets(self, resolution: str) -> np.ndarray:
+        """Local time of day of the bars of a resolution, as timedelta64[m] from midnight
+
+        Bars are labelled like time_bucket does in the OHLCV tables: by the start of a bucket aligned on midnight GMT,
+        so a 4h bar covering 9:00-11:00 local time is labelled 7:00. Only buckets containing trading minutes are kept.
+        """
+        if resolution not in STOCK_RESOLUTION_TABLE_NAME_MAP:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+        if resolution not in self._bar_offsets:
+            if resolution == "day":
+                offsets = np.zeros(1, dtype=np.int64)
+            else:
+                size = int(pd.Timedelta(resolution) / pd.Timedelta(minutes=1))
+                offset = int(LOCAL_UTC_OFFSET / np.timedelta64(1, "m"))
+                gmt_minutes = np.flatnonzero(self.is_trading_minute) - offset
+                offsets = np.unique(gmt_minutes // size * size) + offset
+            self._bar_offsets[resolution] = offsets.astype("timedelta64[m]")
+        return self._bar_offsets[resolution]
+
+    def bar_timestamps(
+        self,
+        start_date: TimeArray,
+        end_date: TimeArray,
+        resolution: Literal["1min", "5min", "15min", "30min", "1h", "4h", "day"] = "1min",
+    ) -> pd.DatetimeIndex:
+        """Expected bar timestamps from `start_date` to `end_date` (both inclusive) in `timezone`
+
+        Daily bars are labelled at midnight of their trading day, whatever the time zone.
+
+        Args:
+            start_date (TimeArray): first timestamp
+            end_date (TimeArray): last timestamp
+            resolution (str, optional): a resolution of STOCK_RESOLUTION_TABLE_NAME_MAP. Defaults to "1min".
+
+        Returns:
+            pd.DatetimeIndex: the sorted timestamps
+        """
+        offsets = self.bar_offsets(resolution)
+        start, _ = self._to_local(start_date)
+        end, _ = self._to_local(end_date)
+        days = self.trading_calendar.get_compiled_calendar().between(
+            start[0].astype("datetime64[D]") - 1, end[0].astype("datetime64[D]") + 1
+        )
+        if resolution == "day":
+            stamps = days.astype("datetime64[ns]")
+            keep = (stamps >= start[0].astype("datetime64[D]")) & (stamps <= end[0])
+            return pd.DatetimeIndex(stamps[keep], name="time")
+        stamps = (days.astype("datetime64[ns]")[:, None] + offsets[None, :]).ravel()
+        stamps = stamps[(stamps >= start[0]) & (stamps <= end[0])]
+        return pd.DatetimeIndex(self._from_local(stamps), name="time")
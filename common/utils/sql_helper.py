@@ -1,35 +1,393 @@
 from psycopg2.extras import execute_values
 import datetime
+import io
 import logging
+import uuid
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from sqlalchemy import types as sa_types
 
 
 logger = logging.getLogger(__name__)
 
+COPY_NULL = "\\N"
+COPY_CHUNK_SIZE = 100_000
+# Target number of values per INSERT statement when the page size of upsert_many is derived
+PAGE_SIZE_VALUES = 20_000
+
+# Postgres type OID -> Arrow type for results decoded from COPY ... TO STDOUT, other types are read as strings
+PG_TYPE_OID_TO_ARROW = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    700: pa.float32(),
+    701: pa.float64(),
+    1700: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp("us"),
+    1184: pa.timestamp("us", tz="UTC"),
+}
+
 
 def upsert_many(
     cur,
     table: str,
-    columns: list[str],
+    columns: list[str] | None,
     primary_keys: list[str],
-    data: list[dict],
+    data: list[dict] | pd.DataFrame | pa.Table,
     include_updated_at: bool = True,
-):
-    if include_updated_at:
-        now = datetime.datetime.now(datetime.timezone.utc)
-        for row in data:
-            row["updated_at"] = now
-        columns.append("updated_at")
+    page_size: int | None = None,
+    copy_threshold: int | None = None,
+) -> tuple[int, int]:
+    """Upsert rows into a table with INSERT ... ON CONFLICT DO UPDATE
 
-    column_str = ", ".join(columns)
-    primary_key_str = ", ".join(primary_keys)
-    on_conflict_update_str = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns if col not in primary_keys])
-    template = "(" + ", ".join([f"%({col})s" for col in columns]) + ")"
-    query = f"""
-        INSERT INTO {table} ({column_str})
-        VALUES %s
-        ON CONFLICT ({primary_key_str})
-        DO UPDATE SET 
-            {on_conflict_update_str}
+    Args:
+        cur: psycopg2 cursor, the caller owns the transaction
+        table (str): table name
+        columns (list[str] | None): columns to write. Defaults to all columns of a DataFrame / Arrow table.
+        primary_keys (list[str]): conflict target
+        data (list[dict] | pd.DataFrame | pa.Table): rows to upsert
+        include_updated_at (bool, optional): also set an `updated_at` column to the current time. Defaults to True.
+        page_size (int | None, optional): rows per INSERT statement. Defaults to None, derived from the number of
+            columns.
+        copy_threshold (int | None, optional): from this many rows on, COPY the data into a temporary staging table
+            and merge it with a single INSERT ... SELECT. Defaults to None, never.
+
+    Returns:
+        tuple[int, int]: number of inserted rows and number of updated rows
     """
+    if columns is None:
+        if isinstance(data, pd.DataFrame):
+            columns = data.columns.tolist()
+        elif isinstance(data, pa.Table):
+            columns = data.column_names
+        else:
+            raise ValueError("columns is required when data is a list of dicts")
+    columns = list(columns)
+    num_rows = data.num_rows if isinstance(data, pa.Table) else len(data)
+    if num_rows == 0:
+        return 0, 0
+
+    # updated_at is rendered once as a literal instead of being added to every row
+    now_sql = cur.mogrify("%s", (datetime.datetime.now(datetime.timezone.utc),)).decode()
+    target_columns = columns + ["updated_at"] if include_updated_at else columns
+    primary_key_str = ", ".join(primary_keys)
+    on_conflict_update_str = ", ".join(
+        [f"{col} = EXCLUDED.{col}" for col in target_columns if col not in primary_keys]
+    )
+    on_conflict = (
+        f"ON CONFLICT ({primary_key_str}) DO UPDATE SET {on_conflict_update_str}"
+        if on_conflict_update_str
+        else f"ON CONFLICT ({primary_key_str}) DO NOTHING"
+    )
+
+    if copy_threshold is not None and num_rows >= copy_threshold:
+        return _upsert_many_with_copy(cur, table, columns, data, include_updated_at, now_sql, on_conflict)
+
+    query = _count_upserted_rows_sql(
+        f"INSERT INTO {table} ({', '.join(target_columns)}) VALUES %s {on_conflict} RETURNING (xmax = 0) AS inserted"
+    )
+    extra_values = [now_sql] if include_updated_at else []
+    if isinstance(data, list):
+        template = "(" + ", ".join([f"%({col})s" for col in columns] + extra_values) + ")"
+        batches = [data]
+    else:
+        template = "(" + ", ".join(["%s"] * len(columns) + extra_values) + ")"
+        batches = _iter_row_tuples(data, columns)
+    if page_size is None:
+        page_size = max(100, PAGE_SIZE_VALUES // len(target_columns))
     logger.debug("Executing query: %s", query)
-    execute_values(cur, query, data, template)
+
+    inserted = updated = 0
+    for rows in batches:
+        for page_inserted, page_updated in execute_values(cur, query, rows, template, page_size=page_size, fetch=True):
+            inserted += page_inserted
+            updated += page_updated
+    return inserted, updated
+
+
+def _count_upserted_rows_sql(upsert_sql: str) -> str:
+    return (
+        f"WITH upserted AS ({upsert_sql}) "
+        "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted"
+    )
+
+
+def _iter_row_tuples(data: pd.DataFrame | pa.Table, columns: list[str]) -> Iterator[list[tuple]]:
+    """Yield the rows of a DataFrame or Arrow table as tuples, COPY_CHUNK_SIZE rows at a time, NaN/null as None"""
+    num_rows = len(data) if isinstance(data, pd.DataFrame) else data.num_rows
+    for start in range(0, num_rows, COPY_CHUNK_SIZE):
+        if isinstance(data, pd.DataFrame):
+            chunk = data.iloc[start : start + COPY_CHUNK_SIZE]
+            values = []
+            for col in columns:
+                series = chunk[col].astype(object)
+                if series.hasnans:
+                    series = series.where(chunk[col].notna(), None)
+                values.append(series.tolist())
+        else:
+            chunk = data.slice(start, COPY_CHUNK_SIZE).select(columns)
+            values = [chunk.column(col).to_pylist() for col in columns]
+        yield list(zip(*values))
+
+
+def _upsert_many_with_copy(cur, table, columns, data, include_updated_at, now_sql, on_conflict) -> tuple[int, int]:
+    staging_table = f"_stg_upsert_{uuid.uuid4().hex[:8]}"
+    column_str = ", ".join(columns)
+    # Not ON COMMIT DROP, the cursor may be in autocommit mode
+    cur.execute(f"CREATE TEMP TABLE {staging_table} AS SELECT {column_str} FROM {table} WITH NO DATA")
+    if isinstance(data, pa.Table):
+        buffer = io.BytesIO()
+        pa_csv.write_csv(data.select(columns), buffer, pa_csv.WriteOptions(include_header=False))
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {staging_table} ({column_str}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame.from_records(data, columns=columns)
+        cur.execute(f"SELECT {column_str} FROM {staging_table} LIMIT 0")
+        integer_columns = [
+            col for col, description in zip(columns, cur.description) if description.type_code in (20, 21, 23)
+        ]
+        copy_from_dataframe(cur, df[columns], staging_table, columns, integer_columns=integer_columns)
+
+    select_str = f"{column_str}, {now_sql}" if include_updated_at else column_str
+    target_str = f"{column_str}, updated_at" if include_updated_at else column_str
+    cur.execute(
+        _count_upserted_rows_sql(
+            f"INSERT INTO {table} ({target_str}) SELECT {select_str} FROM {staging_table} {on_conflict} "
+            "RETURNING (xmax = 0) AS inserted"
+        )
+    )
+    inserted, updated = cur.fetchone()
+    cur.execute(f"DROP TABLE {staging_table}")
+    return inserted, updated
+
+
+def iter_csv_chunks(
+    df: pd.DataFrame,
+    integer_columns: list[str] | None = None,
+    chunk_size: int = COPY_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Serialize a DataFrame to headerless CSV for `COPY ... FROM STDIN WITH (FORMAT csv, NULL '\\N')`,
+    `chunk_size` rows at a time.
+
+    Args:
+        integer_columns (list[str] | None, optional): df columns that target integer columns. Float values in them
+            are written without a fractional part, since Postgres rejects "1.0" for integer types.
+    """
+    integer_columns = [col for col in integer_columns or [] if pd.api.types.is_float_dtype(df[col])]
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        if integer_columns:
+            chunk = chunk.astype({col: "Int64" for col in integer_columns})
+        yield chunk.to_csv(header=False, index=False, na_rep=COPY_NULL)
+
+
+def copy_from_dataframe(
+    cur,
+    df: pd.DataFrame,
+    table: str,
+    columns: list[str] | None = None,
+    integer_columns: list[str] | None = None,
+    chunk_size: int = COPY_CHUNK_SIZE,
+) -> int:
+    """Stream a DataFrame into a table with `COPY ... FROM STDIN` in CSV format.
+
+    The frame is serialized `chunk_size` rows at a time, so only one chunk of CSV text is held in memory.
+
+    Args:
+        cur: psycopg2 cursor
+        table (str): quoted, optionally schema-qualified table name
+        columns (list[str] | None, optional): quoted column names in df order. Defaults to df columns.
+        integer_columns (list[str] | None, optional): df columns that target integer columns, see `iter_csv_chunks`
+        chunk_size (int, optional): number of rows per COPY chunk. Defaults to 100_000.
+
+    Returns:
+        int: number of copied rows
+    """
+    if columns is None:
+        columns = [f'"{col}"' for col in df.columns]
+    copy_sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    for chunk in iter_csv_chunks(df, integer_columns, chunk_size):
+        cur.copy_expert(copy_sql, io.StringIO(chunk))
+    return len(df)
+
+
+def gen_upsert_from_select(table: str, source: str, columns: list[str], keys: list[str]) -> str:
+    """`INSERT INTO table SELECT ... FROM source ON CONFLICT (keys) DO UPDATE`, all names already quoted"""
+    column_str = ", ".join(columns)
+    update_columns = [col for col in columns if col not in keys]
+    if update_columns:
+        set_str = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+        on_conflict = f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {set_str}"
+    else:
+        on_conflict = f"ON CONFLICT ({', '.join(keys)}) DO NOTHING"
+    return f"INSERT INTO {table} ({column_str}) SELECT {column_str} FROM {source} {on_conflict}"
+
+
+def render_query(cur, query, dialect, schema_translate_map: dict | None = None) -> str:
+    """Render a SQLAlchemy query to plain SQL with its parameters escaped by the psycopg2 cursor
+
+    `schema_translate_map` is applied at compile time, as the statement does not go through an engine.
+    """
+    compiled = query.compile(
+        dialect=dialect,
+        schema_translate_map=schema_translate_map,
+        render_schema_translate=schema_translate_map is not None,
+        compile_kwargs={"render_postcompile": True},
+    )
+    return cur.mogrify(str(compiled), compiled.params).decode()
+
+
+def _sqlalchemy_type_to_arrow(sql_type) -> pa.DataType | None:
+    if isinstance(sql_type, sa_types.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, sa_types.SmallInteger):
+        return pa.int16()
+    if isinstance(sql_type, sa_types.Integer):
+        # Also count(*), which is a bigint in Postgres
+        return pa.int64()
+    if isinstance(sql_type, sa_types.REAL):
+        return pa.float32()
+    if isinstance(sql_type, (sa_types.Float, sa_types.Numeric)):
+        return pa.float64()
+    if isinstance(sql_type, sa_types.DateTime):
+        return pa.timestamp("us", tz="UTC") if sql_type.timezone else pa.timestamp("us")
+    if isinstance(sql_type, sa_types.Date):
+        return pa.date32()
+    if isinstance(sql_type, sa_types.String):
+        return pa.string()
+    return None
+
+
+def arrow_types_from_select(query) -> dict[str, pa.DataType] | None:
+    """Arrow types of the columns of a SQLAlchemy SELECT, from their declared types
+
+    Returns:
+        dict[str, pa.DataType] | None: column name -> Arrow type, None for raw SQL or when a column type is unknown
+    """
+    selected_columns = getattr(query, "selected_columns", None)
+    if selected_columns is None:
+        return None
+    column_types = {}
+    for column in selected_columns:
+        arrow_type = _sqlalchemy_type_to_arrow(column.type)
+        if arrow_type is None:
+            return None
+        column_types[column.name] = arrow_type
+    return column_types
+
+
+def read_copy_csv(buffer, columns: list[tuple[str, int]]) -> pa.Table:
+    """Decode the CSV output of `COPY ... TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\\N')` into Arrow columns
+
+    Args:
+        buffer: binary file-like object holding the CSV
+        columns (list[tuple[str, int]]): (name, Postgres type OID) of the result columns
+    """
+    return _read_copy_csv(buffer, _column_types_from_oids(columns))
+
+
+def _column_types_from_oids(columns: list[tuple[str, int]]) -> dict[str, pa.DataType]:
+    return {name: PG_TYPE_OID_TO_ARROW.get(type_oid, pa.string()) for name, type_oid in columns}
+
+
+def _read_copy_csv(buffer, column_types: dict[str, pa.DataType]) -> pa.Table:
+    convert_options = pa_csv.ConvertOptions(
+        column_types=column_types,
+        null_values=[COPY_NULL],
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+        true_values=["t"],
+        false_values=["f"],
+    )
+    return pa_csv.read_csv(buffer, convert_options=convert_options)
+
+
+def _copy_to_stdout_sql(sql: str) -> str:
+    return f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '{COPY_NULL}')"
+
+
+def copy_query_to_arrow(cur, sql: str, column_types: dict[str, pa.DataType] | None = None) -> pa.Table:
+    """Run a query through `COPY (...) TO STDOUT` and decode the result straight into an Arrow table,
+    without creating a Python object per value.
+
+    Args:
+        cur: psycopg2 cursor
+        sql (str): SELECT query with all parameters rendered
+        column_types (dict[str, pa.DataType] | None, optional): Arrow type of every result column, see
+            `arrow_types_from_select`. Defaults to None, the types are read from a `LIMIT 0` run of the query first.
+            The result is decoded again with the probed types when it does not match the declared ones.
+    """
+    sql = sql.strip().rstrip(";")
+    is_declared = column_types is not None
+    if not is_declared:
+        column_types = _probe_column_types(cur, sql)
+    buffer = io.BytesIO()
+    cur.copy_expert(_copy_to_stdout_sql(sql), buffer)
+    try:
+        buffer.seek(0)
+        return _read_copy_csv(buffer, column_types)
+    except pa.ArrowInvalid:
+        if not is_declared:
+            raise
+        logger.warning("Result does not match the declared column types, reading the types from the database")
+        buffer.seek(0)
+        return _read_copy_csv(buffer, _probe_column_types(cur, sql))
+
+
+def _probe_column_types(cur, sql: str) -> dict[str, pa.DataType]:
+    cur.execute(f"SELECT * FROM ({sql}) AS q LIMIT 0")
+    return _column_types_from_oids([(column.name, column.type_code) for column in cur.description])
+
+
+async def acopy_query_to_arrow(
+    conn, sql: str, *args, column_types: dict[str, pa.DataType] | None = None
+) -> pa.Table:
+    """Async version of `copy_query_to_arrow`
+
+    Args:
+        conn: asyncpg connection
+        sql (str): SELECT query with $n placeholders
+        args: query arguments
+        column_types (dict[str, pa.DataType] | None, optional): see `copy_query_to_arrow`. Defaults to None.
+    """
+    sql = sql.strip().rstrip(";")
+    is_declared = column_types is not None
+    if not is_declared:
+        column_types = await _aprobe_column_types(conn, sql)
+    buffer = io.BytesIO()
+    await conn.copy_from_query(sql, *args, output=buffer, format="csv", header=True, null=COPY_NULL)
+    try:
+        buffer.seek(0)
+        return _read_copy_csv(buffer, column_types)
+    except pa.ArrowInvalid:
+        if not is_declared:
+            raise
+        logger.warning("Result does not match the declared column types, reading the types from the database")
+        buffer.seek(0)
+        return _read_copy_csv(buffer, await _aprobe_column_types(conn, sql))
+
+
+async def _aprobe_column_types(conn, sql: str) -> dict[str, pa.DataType]:
+    stmt = await conn.prepare(sql)
+    return _column_types_from_oids([(attribute.name, attribute.type.oid) for attribute in stmt.get_attributes()])
+
+
+def arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table to pandas, avoiding copies where the column types allow it.
+    The table must not be used afterwards, its buffers are released during the conversion."""
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def drop_time_zone(table: pa.Table, column: str = "time") -> pa.Table:
+    """Cast a timestamptz column to a naive timestamp in UTC, e.g. to combine index (timestamptz) and stock (naive GMT)
+    OHLCV tables"""
+    time_type = table.schema.field(column).type
+    if time_type.tz is None:
+        return table
+    index = table.schema.get_field_index(column)
+    return table.set_column(index, column, table[column].cast(pa.timestamp(time_type.unit)))
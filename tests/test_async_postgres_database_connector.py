@@ -0,0 +1,144 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+
+import pandas as pd
+
+from common.database_connector import async_postgres_database_connector
+from common.database_connector.async_postgres_database_connector import AsyncPostgresDatabaseConnector
+from common.database_connector.database_connector_factory import DatabaseConnectorFactory
+
+CONNECTION = ("localhost", 5432, "postgres", "secret", "db")
+
+
+class FakePool:
+    def __init__(self):
+        self.terminated = False
+        self.closed = False
+
+    def terminate(self):
+        self.terminated = True
+
+    async def close(self):
+        self.closed = True
+
+
+def test_get_pool_recreates_the_pool_in_another_loop_under_contention(monkeypatch):
+    pools = []
+
+    async def create_pool(**kwargs):
+        # Yield so that concurrent get_pool calls wait on the lock
+        await asyncio.sleep(0)
+        pools.append(FakePool())
+        return pools[-1]
+
+    monkeypatch.setattr(async_postgres_database_connector.asyncpg, "create_pool", create_pool)
+    connector = AsyncPostgresDatabaseConnector(*CONNECTION)
+
+    async def get_pools():
+        return await asyncio.gather(*[connector.get_pool() for _ in range(3)])
+
+    first_loop_pools = asyncio.run(get_pools())
+    assert len(pools) == 1 and all(pool is pools[0] for pool in first_loop_pools)
+
+    second_loop_pools = asyncio.run(get_pools())
+    assert len(pools) == 2 and all(pool is pools[1] for pool in second_loop_pools)
+    assert pools[0].terminated
+
+
+def test_get_pool_keeps_one_pool_per_running_loop(monkeypatch):
+    async def create_pool(**kwargs):
+        return FakePool()
+
+    monkeypatch.setattr(async_postgres_database_connector.asyncpg, "create_pool", create_pool)
+    connector = AsyncPostgresDatabaseConnector(*CONNECTION)
+    both_pools_created = threading.Barrier(2)
+    pools = {}
+
+    async def use_pool(name):
+        pool = await connector.get_pool()
+        await asyncio.to_thread(both_pools_created.wait, 5)
+        # The other loop created its pool meanwhile, this one must still be usable
+        assert not pool.terminated and await connector.get_pool() is pool
+        await asyncio.to_thread(both_pools_created.wait, 5)
+        await connector.close()
+        pools[name] = pool
+
+    threads = [threading.Thread(target=asyncio.run, args=(use_pool(name),)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pools["a"] is not pools["b"]
+    assert all(pool.closed and not pool.terminated for pool in pools.values())
+    assert len(connector.pools) == 0
+
+
+class FakeAsyncContext:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeAsyncConnection:
+    def __init__(self):
+        self.statements = []
+        self.copies = []
+
+    def transaction(self):
+        return FakeAsyncContext()
+
+    async def execute(self, sql, *args):
+        self.statements.append(sql)
+
+    async def prepare(self, sql):
+        attribute_type = type("Type", (), {"oid": 701})
+        attributes = [type("Attribute", (), {"type": attribute_type})() for _ in range(2)]
+        return type("Statement", (), {"get_attributes": lambda self: attributes})()
+
+    async def copy_to_table(self, table, source, columns, schema_name, format, null):
+        self.copies.append((table, columns, source.read().decode()))
+
+
+def test_aupsert_copies_into_staging_table_and_merges():
+    conn = FakeAsyncConnection()
+    connector = AsyncPostgresDatabaseConnector(*CONNECTION)
+    pool = type("Pool", (), {"acquire": lambda self: FakeAsyncContext(conn)})()
+
+    async def aupsert():
+        connector.pools[asyncio.get_running_loop()] = pool
+        await connector.aupsert(pd.DataFrame({"id": [1, 2], "price": [1.5, None]}), "prices", ["id"], schema="market")
+
+    asyncio.run(aupsert())
+    create_stmt, merge_stmt = conn.statements
+    staging_table = conn.copies[0][0]
+    assert create_stmt == (
+        f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS SELECT id, price FROM market.prices WITH NO DATA"
+    )
+    assert merge_stmt == (
+        f"INSERT INTO market.prices (id, price) SELECT id, price FROM {staging_table} "
+        "ON CONFLICT (id) DO UPDATE SET price = EXCLUDED.price"
+    )
+    assert conn.copies[0][1:] == (["id", "price"], "1,1.5\n2,\\N\n")
+
+
+def test_async_connectors_are_shared_per_connection_and_pool_options():
+    factory = DatabaseConnectorFactory()
+    factory.register_async_connector("postgres", AsyncPostgresDatabaseConnector)
+    connector = factory.get_async_connector("postgres", *CONNECTION)
+    assert factory.get_async_connector("postgres", "localhost", "5432", *CONNECTION[2:]) is connector
+    assert factory.get_async_connector("postgres", *CONNECTION, max_pool_size=20) is not connector
+    assert factory.get_async_connector("postgres", *CONNECTION, shared_pool=False) is not connector
+
+    # Pools belong to the parent process, a forked child gets new connectors
+    factory._reset_after_fork()
+    assert factory.get_async_connector("postgres", *CONNECTION) is not connector
@@ -0,0 +1,115 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from common.data_feed import cached_data_feed
+from common.data_feed.cached_data_feed import CachedPriceVolumeDataFeed
+from common.data_feed.price_volume_data_feed import PriceVolumeDataFeed
+from common.symbol_info import SymbolInfo
+
+
+class FakeDataFeed(PriceVolumeDataFeed):
+    def __init__(self):
+        self.calls = []
+
+    def query_ohlcv(self, symbol=None, resolution="day", start_date=None, end_date=None, *args, **kwargs):
+        self.calls.append((list(symbol), start_date, end_date))
+        times, symbols = [], []
+        day = start_date
+        while day < end_date:
+            for sym in symbol:
+                times.append(day)
+                symbols.append(sym)
+            day += datetime.timedelta(days=1)
+        return pa.table(
+            {
+                "time": pa.array(times, type=pa.timestamp("us")),
+                "symbol": pa.array(symbols, type=pa.string()),
+                "close": pa.array([float(t.day) for t in times]),
+            }
+        )
+
+
+def test_cached_data_feed_fetches_only_missing_months(tmp_path):
+    fake = FakeDataFeed()
+    feed = CachedPriceVolumeDataFeed(fake, str(tmp_path))
+
+    df = feed.query_ohlcv(["ACB", "VNM"], "day", "2023-01-10", "2023-02-05")
+    assert len(df) == 2 * 27
+    assert df["time"].min() == datetime.datetime(2023, 1, 10)
+    assert df["time"].is_monotonic_increasing
+    assert fake.calls == [(["ACB", "VNM"], datetime.datetime(2023, 1, 1), datetime.datetime(2023, 3, 1))]
+
+    fake.calls.clear()
+    table = feed.query_ohlcv("ACB", "day", "2023-02-01", "2023-03-31", inclusive="left", return_type="arrow")
+    assert table.num_rows == 28 + 30
+    assert fake.calls == [(["ACB"], datetime.datetime(2023, 3, 1), datetime.datetime(2023, 4, 1))]
+
+
+def test_cached_data_feed_evicts_over_size_limit(tmp_path):
+    fake = FakeDataFeed()
+    feed = CachedPriceVolumeDataFeed(fake, str(tmp_path), size_limit=0)
+
+    feed.query_ohlcv("ACB", "day", "2023-01-01", "2023-01-31")
+    assert not os.listdir(tmp_path / "day" / "ACB")
+
+
+def test_cached_data_feed_scans_the_cache_only_over_size_limit(tmp_path, monkeypatch):
+    walks = []
+    walk = os.walk
+    monkeypatch.setattr(cached_data_feed.os, "walk", lambda top: walks.append(top) or walk(top))
+    feed = CachedPriceVolumeDataFeed(FakeDataFeed(), str(tmp_path), size_limit=10**9)
+
+    feed.query_ohlcv("ACB", "day", "2023-01-01", "2023-01-31")
+    assert len(walks) == 1
+    # A cache hit writes nothing and does not evict, a miss adds the new file to the running total
+    feed.query_ohlcv("ACB", "day", "2023-01-01", "2023-01-31")
+    feed.query_ohlcv("ACB", "day", "2023-02-01", "2023-02-28")
+    assert len(walks) == 1
+    cache_size = sum(path.stat().st_size for path in tmp_path.rglob("*.parquet"))
+    assert feed._cache_size == cache_size
+
+    feed.size_limit = cache_size - 1
+    feed.query_ohlcv("ACB", "day", "2023-03-01", "2023-03-31")
+    assert len(walks) == 2
+    assert sorted(os.listdir(tmp_path / "day" / "ACB")) == ["2023-03.parquet"]
+
+
+class TableByFirstSymbolDataFeed(FakeDataFeed):
+    """Reads the index or the stock table depending on the first symbol, like _contruct_ohlcv_query"""
+
+    def query_ohlcv(self, symbol=None, resolution="day", start_date=None, end_date=None, *args, **kwargs):
+        table = super().query_ohlcv(symbol, resolution, start_date, end_date, *args, **kwargs)
+        is_index = symbol[0] in SymbolInfo.get_index_list()
+        same_table = [sym for sym in symbol if (sym in SymbolInfo.get_index_list()) == is_index]
+        return table.filter(pc.is_in(table["symbol"], value_set=pa.array(same_table)))
+
+
+def test_cached_data_feed_fetches_indexes_and_stocks_separately(tmp_path):
+    fake = TableByFirstSymbolDataFeed()
+    feed = CachedPriceVolumeDataFeed(fake, str(tmp_path))
+
+    df = feed.query_ohlcv(["VN30", "ACB"], "day", "2023-01-01", "2023-01-31")
+    assert sorted(call[0] for call in fake.calls) == [["ACB"], ["VN30"]]
+    assert df.groupby("symbol").size().to_dict() == {"ACB": 31, "VN30": 31}
+
+
+def test_cached_data_feed_does_not_cache_empty_current_month(tmp_path):
+    fake = FakeDataFeed()
+    feed = CachedPriceVolumeDataFeed(fake, str(tmp_path))
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    month = datetime.datetime(now.year, now.month, 1)
+
+    empty = fake.query_ohlcv(["ACB"], "day", month, month)
+    feed._write_partitions(empty, ["ACB"], "day", month, month + datetime.timedelta(days=31))
+    assert not os.path.exists(feed.partition_path("day", "ACB", month))
+
+    ended_month = datetime.datetime(2023, 1, 1)
+    feed._write_partitions(empty, ["ACB"], "day", ended_month, datetime.datetime(2023, 2, 1))
+    assert os.path.exists(feed.partition_path("day", "ACB", ended_month))
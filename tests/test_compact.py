@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pyarrow as pa
+
+from common.data_feed.compact import compact_ohlcv_table
+from common.utils.sql_helper import arrow_to_pandas
+
+
+def test_compact_ohlcv_table():
+    table = pa.table(
+        {
+            "time": pa.array(
+                [datetime.datetime(2024, 1, 2, 2, 15), datetime.datetime(2024, 1, 2, 2, 16)], pa.timestamp("us")
+            ),
+            "symbol": ["ACB", "ACB"],
+            "open": [23.45, 1234.56],
+            "close": [23.45, 0.123456],
+            "vol": [1200.0, 300.0],
+            "total_vol": [1200.0, None],
+        }
+    )
+    df = arrow_to_pandas(compact_ohlcv_table(table))
+
+    assert str(df["time"].dtype) == "datetime64[ns, UTC]"
+    assert df["time"].iloc[0] == datetime.datetime(2024, 1, 2, 2, 15, tzinfo=datetime.timezone.utc)
+    assert str(df["symbol"].dtype) == "category"
+    assert str(df["open"].dtype) == "float32"
+    assert str(df["close"].dtype) == "float64"
+    assert str(df["vol"].dtype) == "int64"
+    assert str(df["total_vol"].dtype) == "float64"
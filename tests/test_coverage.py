@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pandas as pd
+
+from common.data_feed.coverage import CoverageReport, build_coverage_report
+
+SESSIONS = [datetime.date(2024, 1, day) for day in (2, 3, 4, 5, 8, 9)]
+
+
+def test_build_coverage_report():
+    counts = pd.DataFrame(
+        {
+            "symbol": ["ACB", "ACB", "ACB", "VNM", "VNM", "FPT"],
+            "session": pd.to_datetime(
+                ["2024-01-02", "2024-01-05", "2024-01-09", "2024-01-03", "2024-01-06", "2024-01-02"]
+            ),
+            "num_bars": [240, 240, 100, 240, 10, 240],
+        }
+    )
+    report = build_coverage_report(counts, ["ACB", "VNM"], SESSIONS, "1min", min_bars=200)
+
+    assert report.present.tolist() == [
+        [True, False, False, True, False, False],
+        [False, True, False, False, False, False],
+    ]
+    assert report.bar_counts[0].tolist() == [240, 0, 0, 240, 0, 100]
+    assert report.missing_sessions("VNM") == [datetime.date(2024, 1, day) for day in (2, 4, 5, 8, 9)]
+    assert report.gaps("ACB") == [
+        (datetime.date(2024, 1, 3), datetime.date(2024, 1, 4)),
+        (datetime.date(2024, 1, 8), datetime.date(2024, 1, 9)),
+    ]
+    assert report.coverage["ACB"] == 2 / 6
+
+
+def test_coverage_report_round_trip():
+    counts = pd.DataFrame({"symbol": ["ACB"], "session": [datetime.date(2024, 1, 4)], "num_bars": [1]})
+    report = build_coverage_report(counts, ["ACB", "VNM"], SESSIONS, "day")
+    restored = CoverageReport.from_dict(report.to_dict())
+
+    assert restored.symbols == report.symbols
+    assert (restored.sessions == report.sessions).all()
+    assert (restored.present == report.present).all()
+    assert (restored.bar_counts == report.bar_counts).all()
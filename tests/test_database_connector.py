@@ -0,0 +1,258 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from cachetools import TTLCache
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.pool import StaticPool
+
+from common.database_connector import database_connector
+from common.database_connector.database_connector import METADATA_CACHE_SIZE, DatabaseConnector
+from common.database_connector.postgres_database_connector import PostgresDatabaseConnector
+
+
+class SqliteDatabaseConnector(DatabaseConnector):
+    def create_uri(self) -> str:
+        return "sqlite://"
+
+
+@pytest.fixture
+def sqlite_connector():
+    # A single in-memory database shared by every connection
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    return SqliteDatabaseConnector(engine=engine)
+
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+        self.pending = []
+
+    def commit(self):
+        self.conn.committed.extend(self.pending)
+        self.conn.events.append("commit")
+        self.pending = []
+
+    def rollback(self):
+        self.conn.events.append("rollback")
+        self.pending = []
+
+
+class FakeConnection:
+    def __init__(self, fail_at_batch=None):
+        self.fail_at_batch = fail_at_batch
+        self.committed = []
+        self.events = []
+        self.num_batches = 0
+        self.transaction = None
+
+    def begin(self):
+        self.transaction = FakeTransaction(self)
+        return self.transaction
+
+    def execute(self, stmt, records=None):
+        self.num_batches += 1
+        if self.num_batches == self.fail_at_batch:
+            raise RuntimeError("batch failed")
+        self.transaction.pending.extend(records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def connect(self):
+        return self.conn
+
+
+@pytest.fixture
+def connector(monkeypatch):
+    connector = PostgresDatabaseConnector("localhost", 5432, "postgres", "secret", "db")
+    monkeypatch.setattr(connector, "gen_upsert_template", lambda table, keys, columns, schema=None: "UPSERT")
+    return connector
+
+
+def upsert_in_batches(connector, conn, transaction):
+    connector.engine = FakeEngine(conn)
+    df = pd.DataFrame({"id": range(5), "price": [1.0, None, 3.0, 4.0, 5.0]})
+    connector.upsert_in_batches(df, "t", ["id"], batch_size=2, transaction=transaction)
+
+
+def test_upsert_in_batches_single_transaction(connector):
+    conn = FakeConnection()
+    upsert_in_batches(connector, conn, "single")
+    assert conn.num_batches == 3 and conn.events == ["commit"]
+    assert [record["id"] for record in conn.committed] == [0, 1, 2, 3, 4]
+    assert conn.committed[1]["price"] is None
+
+    conn = FakeConnection(fail_at_batch=3)
+    with pytest.raises(RuntimeError):
+        upsert_in_batches(connector, conn, "single")
+    assert conn.committed == [] and conn.events == ["rollback"]
+
+
+def test_upsert_in_batches_commits_every_batch(connector):
+    conn = FakeConnection(fail_at_batch=3)
+    with pytest.raises(RuntimeError):
+        upsert_in_batches(connector, conn, "batch")
+    assert conn.events == ["commit", "commit", "rollback"]
+    assert [record["id"] for record in conn.committed] == [0, 1, 2, 3]
+
+    with pytest.raises(ValueError):
+        upsert_in_batches(connector, FakeConnection(), "per_row")
+
+
+class FakeMergeConnection:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(str(stmt))
+        return type("Result", (), {"rowcount": 1})()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def test_upsert_with_non_primary_keys_merges_through_staging_table(connector, monkeypatch):
+    conn = FakeMergeConnection()
+    connector.engine = type("Engine", (), {"begin": lambda self: conn, "dialect": connector.engine.dialect})()
+    loaded = []
+    monkeypatch.setattr(connector, "check_table_exists", lambda table, schema=None: True)
+    monkeypatch.setattr(connector, "create_staging_table", lambda conn, table, columns, schema=None: "_stg")
+
+    def load_staging_table(conn, staging_table, df, table, schema=None, batch_size=None):
+        loaded.append(df)
+
+    monkeypatch.setattr(connector, "load_staging_table", load_staging_table)
+
+    df = pd.DataFrame({"symbol": ["ACB", "VNM"], "exchange": ["HOSE", None], "price": [1.0, 2.0]})
+    connector.upsert_with_non_primary_keys(df, "prices", ["symbol", "exchange"], schema="market")
+    assert len(loaded) == 1 and loaded[0] is df
+
+    update_stmt, insert_stmt = conn.statements
+    # Only the key holding NULLs is compared NULL-safe, the other one can use the target's indexes
+    join = "t.symbol = s.symbol AND t.exchange IS NOT DISTINCT FROM s.exchange"
+    assert update_stmt == f"UPDATE market.prices AS t SET price = s.price FROM _stg AS s WHERE {join}"
+    assert insert_stmt == (
+        "INSERT INTO market.prices (symbol, exchange, price) SELECT s.symbol, s.exchange, s.price FROM _stg AS s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM market.prices AS t WHERE {join})"
+    )
+
+
+def test_merge_update_statement_without_columns_to_set(connector):
+    assert connector.gen_merge_update_statement("_stg", "prices", ["symbol"], ["symbol"]) is None
+    assert connector.gen_key_join_condition(["symbol", "time"]) == "t.symbol = s.symbol AND t.time = s.time"
+
+
+def test_iter_query_arrow_batches_share_the_first_schema(sqlite_connector):
+    sqlite_connector.execute_sql("CREATE TABLE prices (id INTEGER, note TEXT, price REAL)")
+    sqlite_connector.execute_sql(
+        "INSERT INTO prices VALUES (1, NULL, 1.5), (2, NULL, NULL), (3, 'x', 3), (4, 'y', 4.5), (5, NULL, 5)"
+    )
+    sql = "SELECT * FROM prices WHERE id >= :min_id ORDER BY id"
+
+    batches = list(sqlite_connector.iter_query(sql, chunk_size=2, return_type="arrow", params={"min_id": 1}))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    # note is all NULL in the first batch, so its type is not inferred from it
+    assert all(batch.schema == batches[0].schema for batch in batches)
+    assert batches[0].schema == pa.schema([("id", pa.int64()), ("note", pa.string()), ("price", pa.float64())])
+    table = pa.Table.from_batches(batches)
+    assert table.column("note").to_pylist() == [None, None, "x", "y", None]
+
+    frames = list(sqlite_connector.iter_query(sql, chunk_size=2, params={"min_id": 4}))
+    assert [frame["id"].tolist() for frame in frames] == [[4, 5]]
+
+
+def test_postgres_arrow_types_come_from_type_oids():
+    connector = PostgresDatabaseConnector("localhost", 5432, "postgres", "secret", "db")
+    Column = namedtuple("Column", ["name", "type_code"])
+    description = [Column("time", 1184), Column("volume", 20), Column("price", 1700), Column("tags", 1009)]
+    assert connector.arrow_types_from_description(description) == [
+        pa.timestamp("us", tz="UTC"),
+        pa.int64(),
+        pa.float64(),
+        None,
+    ]
+
+
+@pytest.fixture
+def reflections(monkeypatch):
+    """Count the inspector passes of the connectors"""
+    inspections = []
+    inspect = database_connector.inspect
+    monkeypatch.setattr(database_connector, "inspect", lambda engine: inspections.append(engine) or inspect(engine))
+    return inspections
+
+
+def test_table_metadata_is_cached_for_the_ttl(sqlite_connector, reflections):
+    now = [0.0]
+    sqlite_connector._metadata_cache = TTLCache(maxsize=METADATA_CACHE_SIZE, ttl=60, timer=lambda: now[0])
+    sqlite_connector.execute_sql("CREATE TABLE prices (id INTEGER PRIMARY KEY, price REAL)")
+
+    metadata = sqlite_connector.get_table_metadata("prices")
+    assert (metadata.primary_keys, metadata.columns) == (["id"], ["id", "price"])
+    sqlite_connector.execute_sql("ALTER TABLE prices ADD COLUMN note TEXT")
+    now[0] = 59
+    assert sqlite_connector.get_table_metadata("prices") is metadata
+    assert len(reflections) == 1
+
+    now[0] = 61
+    assert sqlite_connector.get_table_metadata("prices").columns == ["id", "price", "note"]
+    assert len(reflections) == 2
+
+
+def test_missing_table_metadata_is_not_cached(sqlite_connector):
+    assert sqlite_connector.get_table_metadata("prices") is None
+    assert not sqlite_connector.check_table_exists("prices", None)
+    # Created behind the connector's back, it is found on the next lookup
+    sqlite_connector.execute_sql("CREATE TABLE prices (id INTEGER PRIMARY KEY)")
+    assert sqlite_connector.get_table_metadata("prices").columns == ["id"]
+
+
+def test_table_metadata_is_invalidated_by_schema_changes(sqlite_connector):
+    sqlite_connector.insert(pd.DataFrame({"id": [1]}), "prices")
+    assert sqlite_connector.get_table_metadata("prices").columns == ["id"]
+    sqlite_connector.insert(pd.DataFrame({"id": [1], "price": [1.5]}), "prices", if_exists="replace")
+    assert sqlite_connector.get_table_metadata("prices").columns == ["id", "price"]
+
+    assert sqlite_connector.get_table_metadata("events") is None
+    sqlite_connector.execute_sql("CREATE TABLE events (id INTEGER)")
+    assert sqlite_connector.get_table_metadata("events").primary_keys == []
+    sqlite_connector.execute_sql("DROP TABLE events")
+    sqlite_connector.create_table("events", [Column("id", Integer, primary_key=True), Column("name", String)])
+    metadata = sqlite_connector.get_table_metadata("events")
+    assert (metadata.primary_keys, metadata.columns) == (["id"], ["id", "name"])
+
+
+def test_warm_metadata_caches_tables_per_schema(sqlite_connector, reflections):
+    sqlite_connector.execute_sql("ATTACH DATABASE ':memory:' AS market")
+    sqlite_connector.execute_sql("CREATE TABLE prices (id INTEGER PRIMARY KEY, price REAL)")
+    sqlite_connector.execute_sql("CREATE TABLE market.events (symbol TEXT, day TEXT, PRIMARY KEY (symbol, day))")
+
+    sqlite_connector.warm_metadata(["prices", ("market", "events"), "missing"])
+    assert len(reflections) == 1
+    assert set(sqlite_connector._metadata_cache.keys()) == {(None, "prices"), ("market", "events")}
+    assert sqlite_connector.get_primary_keys("events", "market") == ["symbol", "day"]
+    assert sqlite_connector.get_table_metadata("prices").table.schema is None
+    assert len(reflections) == 1
+
+    sqlite_connector.invalidate_metadata("events", "market")
+    assert set(sqlite_connector._metadata_cache.keys()) == {(None, "prices")}
+    sqlite_connector.invalidate_metadata()
+    assert len(sqlite_connector._metadata_cache) == 0
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.database_connector.database_connector_factory import DatabaseConnectorFactory
+from common.database_connector.pool import TimedQueuePool, get_pool_stats
+from common.database_connector.postgres_database_connector import PostgresDatabaseConnector
+
+CONNECTION = ("localhost", 5432, "postgres", "secret", "db")
+
+
+def make_factory() -> DatabaseConnectorFactory:
+    factory = DatabaseConnectorFactory()
+    factory.register_connector("postgres", PostgresDatabaseConnector)
+    return factory
+
+
+def test_connectors_share_engine_per_connection_and_pool_options():
+    factory = make_factory()
+    first = factory.get_connector("postgres", *CONNECTION)
+    assert factory.get_connector("postgres", *CONNECTION).engine is first.engine
+    # The port is part of the key whatever its type
+    assert factory.get_connector("postgres", "localhost", "5432", *CONNECTION[2:]).engine is first.engine
+
+    sized = factory.get_connector("postgres", *CONNECTION, pool_size=20)
+    assert sized.engine is not first.engine
+    assert factory.get_connector("postgres", *CONNECTION, pool_size=20).engine is sized.engine
+    assert factory.get_connector("postgres", *CONNECTION, shared_engine=False).engine is not first.engine
+
+    assert sorted(factory.pool_stats()) == [
+        "postgres://postgres@localhost:5432/db",
+        "postgres://postgres@localhost:5432/db?pool_size=20",
+    ]
+
+
+def test_reset_after_fork_disposes_engines_without_closing_connections(monkeypatch):
+    factory = make_factory()
+    engine = factory.get_connector("postgres", *CONNECTION).engine
+    dispose_calls = []
+    monkeypatch.setattr(engine, "dispose", lambda close=True: dispose_calls.append(close))
+
+    factory._reset_after_fork()
+    assert dispose_calls == [False]
+    assert factory._pid == os.getpid()
+    # The engine is kept, it opens new connections in the child
+    assert factory.get_connector("postgres", *CONNECTION).engine is engine
+
+
+class FakeDBAPIConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_timed_queue_pool_stats():
+    pool = TimedQueuePool(FakeDBAPIConnection, pool_size=2, max_overflow=1)
+    first, second, third = pool.connect(), pool.connect(), pool.connect()
+    third.close()
+
+    stats = get_pool_stats(pool)
+    assert stats["num_checkouts"] == 3
+    assert stats["checked_out"] == 2 and stats["checked_in"] == 1 and stats["overflow"] == 1
+    assert stats["max_wait_time"] >= stats["avg_wait_time"] >= 0
+    assert stats["total_wait_time"] >= stats["max_wait_time"]
+    first.close()
+    second.close()
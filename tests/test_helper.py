@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pytest
+
+from common.helper import ParamFilterBuilder, create_comparison_filter, create_in_filter, create_logical_filter
+
+
+def test_param_filter_builder_array_params():
+    where_predicate, params = (
+        ParamFilterBuilder()
+        .add_in("symbol", ["ACB", "VNM"])
+        .add_comparison("ex_rights_date", datetime.date(2023, 1, 1), ">=")
+        .add_comparison("ex_rights_date", datetime.date(2023, 12, 31), "<=")
+        .build("AND")
+    )
+    assert where_predicate == (
+        "symbol = ANY(:symbol) AND ex_rights_date >= :ex_rights_date AND ex_rights_date <= :ex_rights_date_1"
+    )
+    assert params == {
+        "symbol": ["ACB", "VNM"],
+        "ex_rights_date": datetime.date(2023, 1, 1),
+        "ex_rights_date_1": datetime.date(2023, 12, 31),
+    }
+
+
+def test_param_filter_builder_sql_does_not_depend_on_values():
+    where_predicate_1, _ = ParamFilterBuilder().add_in("symbol", ["ACB"]).build()
+    where_predicate_2, _ = ParamFilterBuilder().add_in("symbol", [f"S{i}" for i in range(1600)]).build()
+    assert where_predicate_1 == where_predicate_2
+
+
+def test_param_filter_builder_scalar_params():
+    filter_builder = ParamFilterBuilder(array_params=False).add_in("symbol", ["ACB", "VNM"], not_in=True)
+    where_predicate, params = filter_builder.build()
+    assert where_predicate == "symbol NOT IN (:symbol, :symbol_1)"
+    assert params == {"symbol": "ACB", "symbol_1": "VNM"}
+
+
+def test_param_filter_builder_empty():
+    assert ParamFilterBuilder().build() == ("", {})
+    assert ParamFilterBuilder().add_in("symbol", []).build() == ("FALSE", {})
+
+
+def test_string_filters_are_deprecated_and_unchanged():
+    with pytest.warns(DeprecationWarning, match="ParamFilterBuilder.add_in"):
+        in_filter = create_in_filter("symbol", ["ACB", "VNM"], not_in=True)
+    with pytest.warns(DeprecationWarning, match="ParamFilterBuilder.add_comparison"):
+        comparison_filter = create_comparison_filter("time", datetime.datetime(2023, 1, 2, 9, 15), ">=")
+    assert in_filter == "symbol NOT IN ('ACB', 'VNM')"
+    assert comparison_filter == "time >= '2023-01-02 09:15:00'"
+    assert create_logical_filter([in_filter, comparison_filter], "OR", with_bracket=True) == (
+        "(symbol NOT IN ('ACB', 'VNM')) OR (time >= '2023-01-02 09:15:00')"
+    )
@@ -0,0 +1,128 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+import threading
+
+import pandas as pd
+import pytest
+
+from common import trading_holiday
+from common.holiday_dataset import load_holiday_list
+from common.holiday_snapshot import HolidaySnapshot, get_holiday_snapshot
+from common.trading_holiday import TradingHoliday
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def wait_for_refresh(snapshot: HolidaySnapshot) -> None:
+    for thread in threading.enumerate():
+        if thread.name == "holiday-snapshot-refresh":
+            thread.join(timeout=5)
+    assert not snapshot._refreshing
+
+
+def test_snapshot_serves_stale_list_while_refreshing():
+    clock = FakeClock()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(clock.now)
+        if len(calls) > 1:
+            release.wait(timeout=5)
+        return [datetime.date(2023, 9, len(calls))]
+
+    snapshot = HolidaySnapshot(fetch, ttl=600, clock=clock)
+    first = snapshot.get()
+    assert first == [datetime.date(2023, 9, 1)]
+    clock.now = 100
+    assert snapshot.get() is first and len(calls) == 1
+
+    clock.now = 700
+    assert snapshot.get() is first
+    assert snapshot.get() is first
+    release.set()
+    wait_for_refresh(snapshot)
+    assert len(calls) == 2
+    assert snapshot.get() == [datetime.date(2023, 9, 2)]
+
+
+def test_snapshot_keeps_stale_list_when_refresh_fails():
+    clock = FakeClock()
+    results = [[datetime.date(2023, 9, 1)], RuntimeError("api down"), [datetime.date(2023, 9, 2)]]
+
+    def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    snapshot = HolidaySnapshot(fetch, ttl=600, clock=clock)
+    first = snapshot.get()
+    clock.now = 600
+    snapshot.get()
+    wait_for_refresh(snapshot)
+    assert snapshot.get() is first
+    assert snapshot.next_refresh_at == 660
+
+    clock.now = 660
+    snapshot.get()
+    wait_for_refresh(snapshot)
+    assert snapshot.get() == [datetime.date(2023, 9, 2)]
+
+
+def test_get_holiday_snapshot_is_shared_per_key():
+    snapshot = get_holiday_snapshot("test:shared", lambda: [], 600)
+    assert get_holiday_snapshot("test:shared", lambda: [datetime.date(2023, 9, 1)], 600) is snapshot
+    assert get_holiday_snapshot("test:other", lambda: [], 600) is not snapshot
+
+
+def test_snapshot_keeps_list_identity_when_refresh_has_same_content():
+    clock = FakeClock()
+    snapshot = HolidaySnapshot(lambda: [datetime.date(2023, 9, 1)], ttl=600, clock=clock)
+    first = snapshot.get()
+    clock.now = 600
+    snapshot.get()
+    wait_for_refresh(snapshot)
+    assert snapshot.get() is first and snapshot.version == 1
+
+
+class FakeConnector:
+    def __init__(self, holidays):
+        self.holidays = holidays
+        self.queries = []
+
+    def query_by_sql(self, query):
+        self.queries.append(query)
+        if isinstance(self.holidays, Exception):
+            raise self.holidays
+        return pd.DataFrame({"date": self.holidays})
+
+
+def test_trading_holiday_shares_snapshot_per_settings(monkeypatch):
+    conn = FakeConnector([datetime.date(2023, 9, 1), datetime.date(2023, 9, 4)])
+    monkeypatch.setattr(trading_holiday.factory, "get_connector", lambda **kwargs: conn)
+    config = {"database_type": "postgres", "host": "holiday-db", "port": 5432, "database_name": "common"}
+
+    first, second = TradingHoliday(dict(config, password="a")), TradingHoliday(dict(config, password="b"))
+    holiday_list = first.get_holiday_list()
+    holiday_list.append(datetime.date(2023, 9, 5))
+    assert second.get_holiday_list() == [datetime.date(2023, 9, 1), datetime.date(2023, 9, 4)]
+    assert not second.is_business_day(datetime.date(2023, 9, 4)) and second.is_business_day(datetime.date(2023, 9, 5))
+    assert len(conn.queries) == 1
+
+    # Another table is another snapshot, and the fallback setting is not baked into the shared fetch
+    conn.holidays = RuntimeError("db down")
+    with pytest.raises(RuntimeError):
+        TradingHoliday(config, holiday_table_name="other_holiday").get_holiday_list()
+    fallback = TradingHoliday(config, holiday_table_name="other_holiday", fallback_to_hard_coded_data=True)
+    assert fallback.get_holiday_list() == load_holiday_list()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import numpy as np
+import pyarrow as pa
+
+from common.data_feed.panel import build_ohlcv_panel
+
+
+def test_build_ohlcv_panel_mixes_stock_and_index_tables():
+    stock_table = pa.table(
+        {
+            "time": pa.array([datetime.datetime(2024, 1, 2), datetime.datetime(2024, 1, 1)], type=pa.timestamp("us")),
+            "symbol": ["ACB", "VNM"],
+            "close": [1.0, 2.0],
+            "total_vol": [5.0, 6.0],
+        }
+    )
+    index_table = pa.table(
+        {
+            "time": pa.array([datetime.datetime(2024, 1, 1)], type=pa.timestamp("us", tz="UTC")),
+            "symbol": ["VNINDEX"],
+            "close": [3.0],
+        }
+    )
+    panel = build_ohlcv_panel([stock_table, index_table], ["VNINDEX", "ACB", "VNM"], ["close", "total_vol"])
+
+    assert panel.shape == (2, 2, 3)
+    assert panel.time.tolist() == [datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2)]
+    np.testing.assert_array_equal(panel["close"].to_numpy(), [[3.0, np.nan, 2.0], [np.nan, 1.0, np.nan]])
+    assert np.isnan(panel["total_vol"]["VNINDEX"]).all()
+
+
+def test_build_ohlcv_panel_empty():
+    panel = build_ohlcv_panel([], ["ACB"], ["close"])
+    assert panel.shape == (1, 0, 1)
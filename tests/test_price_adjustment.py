@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pandas as pd
+import pytest
+
+from common import price_adjustment
+from common.price_adjustment import PriceAdjustment, apply_adjustment_factors, compute_adjustment_factors
+
+RATIOS = pd.DataFrame(
+    {
+        "symbol": ["ACB", "VNM", "ACB"],
+        "ex_rights_date": [datetime.date(2024, 1, 5), datetime.date(2024, 1, 2), datetime.date(2024, 1, 3)],
+        "ratio": [0.8, 0.9, 0.5],
+    }
+)
+
+OHLCV = pd.DataFrame(
+    {
+        "time": [
+            datetime.datetime(2024, 1, 2),
+            datetime.datetime(2024, 1, 3, 2, 15),
+            datetime.datetime(2024, 1, 4),
+            datetime.datetime(2024, 1, 5),
+            datetime.datetime(2024, 1, 1),
+            datetime.datetime(2024, 1, 2),
+        ],
+        "symbol": ["ACB", "ACB", "ACB", "ACB", "VNM", "VNM"],
+        "close": [100.0, 50.0, 50.0, 40.0, 10.0, 9.0],
+        "vol": [1.0, 2.0, 2.0, 2.5, 1.0, 1.0],
+    }
+)
+
+
+def test_compute_adjustment_factors():
+    factors = compute_adjustment_factors(RATIOS)
+    assert factors["symbol"].tolist() == ["ACB", "ACB", "VNM"]
+    assert factors["back_factor"].tolist() == pytest.approx([0.4, 0.8, 0.9])
+    assert factors["total_factor"].tolist() == pytest.approx([0.4, 0.4, 0.9])
+
+
+def test_apply_adjustment_factors():
+    factors = compute_adjustment_factors(RATIOS)
+
+    back = apply_adjustment_factors(OHLCV, factors, "back")
+    assert back["close"].tolist() == pytest.approx([40.0, 40.0, 40.0, 40.0, 9.0, 9.0])
+    assert back["vol"].tolist() == OHLCV["vol"].tolist()
+
+    forward = apply_adjustment_factors(OHLCV, factors, "forward")
+    assert forward["close"].tolist() == pytest.approx([100.0, 100.0, 100.0, 100.0, 10.0, 10.0])
+
+    utc = OHLCV.assign(time=OHLCV["time"].dt.tz_localize("UTC"))
+    assert apply_adjustment_factors(utc, factors, "back")["close"].tolist() == back["close"].tolist()
+
+
+class FakeRatioConnector:
+    """Serves the fingerprint and ratio queries of PriceAdjustment from an in-memory ratio table"""
+
+    engine = type("Engine", (), {"dialect": type("Dialect", (), {"name": "postgresql"})()})()
+
+    def __init__(self, ratios):
+        self.ratios = ratios
+        self.ratio_queries = 0
+
+    def query_by_sql(self, sql, params=None):
+        ratios = self.ratios[self.ratios["symbol"].isin(params["symbol"])]
+        if "count(*)" in sql:
+            return ratios.groupby("symbol", as_index=False).agg(
+                num_events=("ex_rights_date", "count"), last_ex_rights_date=("ex_rights_date", "max")
+            )
+        self.ratio_queries += 1
+        return ratios
+
+
+def test_get_adjustment_factors_refreshes_every_ratio_col(monkeypatch):
+    conn = FakeRatioConnector(RATIOS.assign(cash_ratio=RATIOS["ratio"]))
+    monkeypatch.setattr(price_adjustment.factory, "get_connector", lambda **db_config: conn)
+    adjustment = PriceAdjustment({})
+
+    adjustment.get_adjustment_factors(["ACB"], "ratio")
+    adjustment.get_adjustment_factors(["ACB"], "cash_ratio")
+    assert adjustment.get_adjustment_factors(["ACB"], "cash_ratio")["back_factor"].tolist() == pytest.approx([0.4, 0.8])
+    assert conn.ratio_queries == 2
+
+    new_event = {"symbol": "ACB", "ex_rights_date": datetime.date(2024, 1, 8), "ratio": 0.5, "cash_ratio": 0.5}
+    conn.ratios = pd.concat([conn.ratios, pd.DataFrame([new_event])], ignore_index=True)
+    assert adjustment.get_adjustment_factors(["ACB"], "ratio")["back_factor"].tolist() == pytest.approx([0.2, 0.4, 0.5])
+    # The new event was seen through "ratio" first, the factors of "cash_ratio" must be refreshed too
+    factors = adjustment.get_adjustment_factors(["ACB"], "cash_ratio")
+    assert factors["back_factor"].tolist() == pytest.approx([0.2, 0.4, 0.5])
@@ -0,0 +1,213 @@
+import datetime
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from common.database_connector.postgres_database_connector import PostgresDatabaseConnector
+from common.data_feed.timescale.helper import _contruct_ohlcv_query
+from common.utils.sql_helper import (
+    arrow_types_from_select,
+    copy_from_dataframe,
+    copy_query_to_arrow,
+    gen_upsert_from_select,
+    iter_csv_chunks,
+    read_copy_csv,
+    upsert_many,
+)
+
+
+class FakeCopyCursor:
+    def __init__(self):
+        self.copies = []
+
+    def copy_expert(self, sql, file):
+        self.copies.append((sql, file.read()))
+
+
+class FakeUpsertCursor:
+    """Renders parameters with repr and timestamps as ISO literals, every row of a page counts as inserted"""
+
+    connection = type("Connection", (), {"encoding": "UTF8"})()
+
+    def __init__(self, inserted_flags=None):
+        self.statements = []
+        self.copies = []
+        self.inserted_flags = inserted_flags
+
+    @staticmethod
+    def _render(value):
+        return f"'{value.isoformat()}'" if isinstance(value, datetime.datetime) else repr(value)
+
+    def mogrify(self, template, args):
+        if isinstance(args, dict):
+            return (template % {key: self._render(value) for key, value in args.items()}).encode()
+        return (template % tuple(self._render(value) for value in args)).encode()
+
+    def execute(self, sql):
+        self.statements.append(sql.decode() if isinstance(sql, bytes) else sql)
+
+    def fetchall(self):
+        # One (inserted, updated) row per page, the page is counted from its VALUES tuples
+        rows = self.statements[-1].count("),(") + 1
+        return [(rows, 0)]
+
+    def fetchone(self):
+        return (2, 1)
+
+    def copy_expert(self, sql, file):
+        self.copies.append((sql, file.read()))
+
+
+def test_upsert_many_sums_pages_and_renders_updated_at_once():
+    cursor = FakeUpsertCursor()
+    df = pd.DataFrame({"id": [1, 2, 3], "price": [1.5, np.nan, 2.5]})
+    assert upsert_many(cursor, "prices", None, ["id"], df, page_size=2) == (3, 0)
+    assert len(cursor.statements) == 2
+    now_sql = cursor.statements[0].split("),(")[0].rsplit(", ", 1)[1]
+    assert cursor.statements[0] == (
+        "WITH upserted AS (INSERT INTO prices (id, price, updated_at) "
+        f"VALUES (1, 1.5, {now_sql}),(2, None, {now_sql}) "
+        "ON CONFLICT (id) DO UPDATE SET price = EXCLUDED.price, updated_at = EXCLUDED.updated_at "
+        "RETURNING (xmax = 0) AS inserted) "
+        "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted"
+    )
+    assert f"VALUES (3, 2.5, {now_sql})" in cursor.statements[1]
+
+
+def test_upsert_many_list_of_dicts():
+    cursor = FakeUpsertCursor()
+    rows = [{"id": 1, "price": 1.5}, {"id": 2, "price": 2.5}]
+    assert upsert_many(cursor, "prices", ["id"], ["id"], rows, include_updated_at=False) == (2, 0)
+    assert "INSERT INTO prices (id) VALUES (1),(2) ON CONFLICT (id) DO NOTHING" in cursor.statements[0]
+    with pytest.raises(ValueError):
+        upsert_many(cursor, "prices", None, ["id"], rows)
+    assert upsert_many(cursor, "prices", ["id"], ["id"], []) == (0, 0)
+
+
+def test_upsert_many_copies_arrow_table_above_threshold():
+    cursor = FakeUpsertCursor()
+    table = pa.table({"id": [1, 2, 3], "price": [1.5, None, 2.5]})
+    assert upsert_many(cursor, "prices", None, ["id"], table, include_updated_at=False, copy_threshold=3) == (2, 1)
+    create_stmt, merge_stmt, drop_stmt = cursor.statements
+    staging_table = drop_stmt.removeprefix("DROP TABLE ")
+    assert create_stmt == f"CREATE TEMP TABLE {staging_table} AS SELECT id, price FROM prices WITH NO DATA"
+    assert f"INSERT INTO prices (id, price) SELECT id, price FROM {staging_table} ON CONFLICT (id)" in merge_stmt
+    assert cursor.copies == [(f"COPY {staging_table} (id, price) FROM STDIN WITH (FORMAT csv)", b"1,1.5\n2,\n3,2.5\n")]
+
+
+def test_iter_csv_chunks_writes_nulls_and_integers():
+    df = pd.DataFrame({"id": [1.0, np.nan, 3.0], "name": ["a", None, "c,d"], "price": [1.5, 2.0, np.nan]})
+    chunks = list(iter_csv_chunks(df, integer_columns=["id"], chunk_size=2))
+    assert chunks == ['1,a,1.5\n\\N,\\N,2.0\n', '3,"c,d",\\N\n']
+
+
+def test_copy_from_dataframe_streams_chunks():
+    cursor = FakeCopyCursor()
+    df = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", "c"]})
+    assert copy_from_dataframe(cursor, df, '"staging"', chunk_size=2) == 3
+    assert [sql for sql, _ in cursor.copies] == [
+        """COPY "staging" ("id", "name") FROM STDIN WITH (FORMAT csv, NULL '\\N')"""
+    ] * 2
+    assert "".join(data for _, data in cursor.copies) == "1,a\n2,b\n3,c\n"
+
+
+def test_gen_upsert_from_select():
+    assert gen_upsert_from_select('"t"', '"s"', ['"id"', '"price"'], ['"id"']) == (
+        'INSERT INTO "t" ("id", "price") SELECT "id", "price" FROM "s" '
+        'ON CONFLICT ("id") DO UPDATE SET "price" = EXCLUDED."price"'
+    )
+    assert gen_upsert_from_select('"t"', '"s"', ['"id"'], ['"id"']).endswith('ON CONFLICT ("id") DO NOTHING')
+
+
+def test_copy_upsert_requires_primary_key():
+    connector = PostgresDatabaseConnector("localhost", 5432, "postgres", "secret", "db")
+    with pytest.raises(ValueError):
+        connector.upsert(pd.DataFrame({"id": [1]}), "t", ["id"], primary_key=False, method="copy")
+    assert connector.gen_merge_from_staging_statement("_stg", "t", ["id"], ["id", "price"], schema="s") == (
+        'INSERT INTO s.t (id, price) SELECT id, price FROM _stg ON CONFLICT (id) DO UPDATE SET price = EXCLUDED.price'
+    )
+
+
+COPY_CSV = (
+    b"active,volume,price,day,time,note\n"
+    b"t,100,1.5,2024-01-02,2024-01-02 09:15:00+07,\"\"\n"
+    b"f,\\N,\\N,\\N,2024-01-02 02:15:00.5+00,\\N\n"
+)
+COPY_COLUMNS = [("active", 16), ("volume", 20), ("price", 1700), ("day", 1082), ("time", 1184), ("note", 25)]
+
+
+def test_read_copy_csv_decodes_postgres_text_output():
+    table = read_copy_csv(io.BytesIO(COPY_CSV), COPY_COLUMNS)
+    assert table.schema == pa.schema(
+        [
+            ("active", pa.bool_()),
+            ("volume", pa.int64()),
+            ("price", pa.float64()),
+            ("day", pa.date32()),
+            ("time", pa.timestamp("us", tz="UTC")),
+            ("note", pa.string()),
+        ]
+    )
+    assert table.column("active").to_pylist() == [True, False]
+    assert table.column("volume").to_pylist() == [100, None]
+    # \N is NULL, a quoted empty string is an empty string
+    assert table.column("note").to_pylist() == ["", None]
+    # Offsets are applied, both rows are 02:15 UTC
+    assert table.column("time").cast(pa.timestamp("us")).to_pylist() == [
+        datetime.datetime(2024, 1, 2, 2, 15),
+        datetime.datetime(2024, 1, 2, 2, 15, 0, 500000),
+    ]
+
+
+class FakeCopyToCursor:
+    def __init__(self, csv, description):
+        self.csv = csv
+        self.description = description
+        self.statements = []
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, file):
+        self.statements.append(sql)
+        file.write(self.csv)
+
+
+def test_copy_query_to_arrow_probes_only_without_declared_types():
+    Column = namedtuple("Column", ["name", "type_code"])
+    description = [Column(name, type_oid) for name, type_oid in COPY_COLUMNS]
+    column_types = {field.name: field.type for field in read_copy_csv(io.BytesIO(COPY_CSV), COPY_COLUMNS).schema}
+
+    cursor = FakeCopyToCursor(COPY_CSV, description)
+    assert copy_query_to_arrow(cursor, "SELECT * FROM t;", column_types).num_rows == 2
+    assert cursor.statements == ["COPY (SELECT * FROM t) TO STDOUT WITH (FORMAT csv, HEADER true, NULL '\\N')"]
+
+    cursor = FakeCopyToCursor(COPY_CSV, description)
+    assert copy_query_to_arrow(cursor, "SELECT * FROM t").schema.field("volume").type == pa.int64()
+    assert cursor.statements[0] == "SELECT * FROM (SELECT * FROM t) AS q LIMIT 0"
+
+    # A declared type that does not match the data falls back to the probed types, without a second COPY
+    cursor = FakeCopyToCursor(COPY_CSV, description)
+    table = copy_query_to_arrow(cursor, "SELECT * FROM t", {**column_types, "time": pa.timestamp("us")})
+    assert table.schema.field("time").type == pa.timestamp("us", tz="UTC")
+    assert [sql.split(" ")[0] for sql in cursor.statements] == ["COPY", "SELECT"]
+
+
+def test_arrow_types_from_select():
+    column_types = arrow_types_from_select(_contruct_ohlcv_query(["ACB"], "10min", "2024-01-01", "2024-02-01"))
+    assert column_types["time"] == pa.timestamp("us")
+    assert column_types["symbol"] == pa.string()
+    assert column_types["open"] == column_types["vol"] == pa.float64()
+    assert arrow_types_from_select(_contruct_ohlcv_query(["VNINDEX"], "day", "2024-01-01"))["time"] == pa.timestamp(
+        "us", tz="UTC"
+    )
+    assert arrow_types_from_select("SELECT * FROM t") is None
@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pyarrow as pa
+
+from common.data_feed.tail import OHLCVTail
+
+
+class FakeDataFeed:
+    def __init__(self):
+        self.tables = []
+
+    def query_arrow(self, query):
+        return self.tables.pop(0)
+
+
+def _bars(rows, tz=None):
+    return pa.table(
+        {
+            "time": pa.array([row[0] for row in rows], type=pa.timestamp("us", tz=tz)),
+            "symbol": pa.array([row[1] for row in rows], type=pa.string()),
+            "close": pa.array([row[2] for row in rows], type=pa.float64()),
+        }
+    )
+
+
+def test_ohlcv_tail_merges_new_and_refreshed_bars():
+    t0 = datetime.datetime(2024, 1, 2, 2, 15)
+    t1 = t0 + datetime.timedelta(minutes=1)
+    t2 = t1 + datetime.timedelta(minutes=1)
+    feed = FakeDataFeed()
+    tail = OHLCVTail(feed, ["VNINDEX", "ACB"], max_bars=2, start_date=t0)
+
+    feed.tables = [_bars([(t0, "VNINDEX", 1.0)], tz="UTC"), _bars([(t0, "ACB", 10.0), (t1, "ACB", 11.0)])]
+    new_bars = tail.poll()
+    assert len(new_bars) == 3
+    assert tail.last_seen == {"VNINDEX": t0, "ACB": t1}
+
+    # The forming ACB bar at t1 is updated, and rows before the last seen bar are ignored
+    feed.tables = [
+        _bars([(t1, "VNINDEX", 2.0)], tz="UTC"),
+        _bars([(t0, "ACB", 10.0), (t1, "ACB", 11.5), (t2, "ACB", 12.0)]),
+    ]
+    new_bars = tail.poll()
+    assert new_bars["close"].tolist() == [2.0, 11.5, 12.0]
+    assert tail.bars("ACB")["close"].tolist() == [11.5, 12.0]
+    assert tail.bars("VNINDEX")["close"].tolist() == [1.0, 2.0]
+    assert len(tail.snapshot()) == 4
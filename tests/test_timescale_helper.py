@@ -0,0 +1,101 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from common.data_feed.timescale.helper import (
+    _construct_ohlcv_page_query,
+    _contruct_ohlcv_query,
+    _shard_time_range,
+    get_source_resolution,
+    parse_resolution,
+)
+
+
+def test_parse_resolution():
+    assert parse_resolution("day") == datetime.timedelta(days=1)
+    assert parse_resolution("10min") == datetime.timedelta(minutes=10)
+    assert parse_resolution("2h") == datetime.timedelta(hours=2)
+    assert parse_resolution("week") == datetime.timedelta(weeks=1)
+    with pytest.raises(ValueError):
+        parse_resolution("2 months")
+
+
+def test_get_source_resolution_picks_coarsest_divisor():
+    assert get_source_resolution(datetime.timedelta(minutes=10)) == "5min"
+    assert get_source_resolution(datetime.timedelta(minutes=45)) == "15min"
+    assert get_source_resolution(datetime.timedelta(hours=8)) == "4h"
+    assert get_source_resolution(datetime.timedelta(weeks=1)) == "day"
+
+
+def test_contruct_ohlcv_query_with_bucket():
+    query = _contruct_ohlcv_query(["ACB"], "2h", "2024-01-01")
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    assert "time_bucket(INTERVAL '7200 seconds', ssi_iboard_ohlcv_1h.time) AS time" in sql
+    assert "GROUP BY time_bucket" in sql
+
+
+def test_construct_ohlcv_page_query_continues_after_last_row():
+    after = (datetime.datetime(2024, 1, 5, 2, 30), "ACB")
+    query = _construct_ohlcv_page_query(["ACB", "VNM"], "1min", "2024-01-01", "2024-02-01", "left", 1000, after)
+    compiled = query.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "WHERE (page.time, page.symbol) > (" in sql
+    assert "ORDER BY page.time, page.symbol" in sql
+    assert "ssi_iboard_ohlcv_1m.time >= " in sql and "ssi_iboard_ohlcv_1m.time < " in sql
+    assert after[0] in compiled.params.values() and 1000 in compiled.params.values()
+
+
+def test_shard_time_range():
+    windows = _shard_time_range("2024-01-01", "2024-01-25", "both", datetime.timedelta(days=10))
+    assert windows == [
+        (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 11), "left"),
+        (datetime.datetime(2024, 1, 11), datetime.datetime(2024, 1, 21), "left"),
+        (datetime.datetime(2024, 1, 21), datetime.datetime(2024, 1, 25), "both"),
+    ]
+    assert _shard_time_range("2024-01-01", None, "neither", datetime.timedelta(days=10)) == [
+        (datetime.datetime(2024, 1, 1), None, "neither")
+    ]
+
+
+def test_shard_time_range_inclusive_mapping():
+    for inclusive, first, last in [
+        ("both", "left", "both"),
+        ("left", "left", "left"),
+        ("right", "neither", "both"),
+        ("neither", "neither", "left"),
+    ]:
+        windows = _shard_time_range("2024-01-01", "2024-01-25", inclusive, datetime.timedelta(days=10))
+        assert [window[2] for window in windows] == [first, "left", last]
+    # A single window keeps the requested bounds
+    assert _shard_time_range("2024-01-01", "2024-01-05", "right", datetime.timedelta(days=10)) == [
+        (datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 5), "right")
+    ]
+
+
+def test_shard_time_range_aligns_windows_on_buckets():
+    windows = _shard_time_range(
+        "2024-01-01 01:30", "2024-01-01 12:00", "both", datetime.timedelta(hours=3), datetime.timedelta(hours=2)
+    )
+    assert [window[:2] for window in windows] == [
+        (datetime.datetime(2024, 1, 1, 1, 30), datetime.datetime(2024, 1, 1, 6)),
+        (datetime.datetime(2024, 1, 1, 6), datetime.datetime(2024, 1, 1, 10)),
+        (datetime.datetime(2024, 1, 1, 10), datetime.datetime(2024, 1, 1, 12)),
+    ]
+    # Weekly buckets start on Monday like time_bucket, 2024-01-01 is a Monday
+    windows = _shard_time_range("2024-01-03", "2024-02-01", "both", datetime.timedelta(days=10), parse_resolution("1w"))
+    assert [window[1] for window in windows] == [
+        datetime.datetime(2024, 1, 15),
+        datetime.datetime(2024, 1, 29),
+        datetime.datetime(2024, 2, 1),
+    ]
+
+
+def test_shard_time_range_rejects_non_positive_shard():
+    with pytest.raises(ValueError):
+        _shard_time_range("2024-01-01", "2024-01-25", "both", datetime.timedelta(0))
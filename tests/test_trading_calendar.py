@@ -4,10 +4,19 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import datetime
+import numpy as np
 import pandas as pd
 
 import pytest
 
+from common import holiday_dataset
+from common.holiday_dataset import (
+    get_persisted_holiday_list_file,
+    persist_holiday_list,
+    read_holiday_list,
+    read_persisted_holiday_list,
+    write_holiday_list,
+)
 from common.trading_calendar import TradingCalendar
 
 
@@ -100,3 +109,86 @@ def test_get_busday_diff(trading_calendar):
     end_date = datetime.datetime(2023, 12, 1, 13, 30)
     result = trading_calendar.get_busday_diff(start_date, end_date, included_time=True)
     assert result == pd.Timedelta(days=0, hours=3, minutes=0)
+
+
+def test_get_trading_days(trading_calendar):
+    result = trading_calendar.get_trading_days(datetime.date(2023, 8, 30), datetime.date(2023, 9, 6))
+    assert result == [
+        datetime.datetime(2023, 8, 30),
+        datetime.datetime(2023, 8, 31),
+        datetime.datetime(2023, 9, 5),
+        datetime.datetime(2023, 9, 6),
+    ]
+
+
+def test_compiled_calendar_rebuilt_when_holiday_list_changes(trading_calendar):
+    compiled = trading_calendar.get_compiled_calendar()
+    assert trading_calendar.get_compiled_calendar() is compiled
+
+    trading_calendar.holiday_list = trading_calendar.holiday_list + [datetime.date(2023, 12, 1)]
+    assert trading_calendar.get_compiled_calendar() is not compiled
+    assert not trading_calendar.is_business_day(datetime.date(2023, 12, 1))
+
+
+def test_many_variants_match_scalar_methods(trading_calendar):
+    start_dates = pd.Series(pd.to_datetime(["2023-08-30", "2023-09-02", "2023-09-04", "2023-12-05"]))
+    end_dates = pd.Series(pd.to_datetime(["2023-09-06", "2023-09-01", "2023-09-05", "2023-12-07"]))
+
+    is_business_day = trading_calendar.is_business_day_many(start_dates)
+    assert is_business_day.tolist() == [trading_calendar.is_business_day(d.date()) for d in start_dates]
+
+    offsets = np.array([1, -1, 0, 2])
+    result = trading_calendar.offset_busday_many(start_dates, offsets, on_zero_offset_roll="forward")
+    assert result.tolist() == [
+        trading_calendar.get_offset_busday(d.date(), int(o), on_zero_offset_roll="forward")
+        for d, o in zip(start_dates, offsets)
+    ]
+
+    diff = trading_calendar.busday_diff_many(start_dates, end_dates)
+    assert [pd.Timedelta(d) for d in diff] == [
+        trading_calendar.get_busday_diff(s, e) for s, e in zip(start_dates, end_dates)
+    ]
+
+
+def test_hard_coded_holiday_list_is_loaded_once():
+    from common.trading_holiday_list import HARD_CODED_TRADING_HOLIDAY_LIST
+
+    first, second = TradingCalendar(use_hard_coded_data=True), TradingCalendar(use_hard_coded_data=True)
+    assert first.holiday_list is second.holiday_list
+    assert [holiday.isoformat() for holiday in first.holiday_list] == HARD_CODED_TRADING_HOLIDAY_LIST
+    assert first.get_compiled_calendar() is second.get_compiled_calendar()
+
+
+def test_holiday_list_file_round_trip(tmp_path):
+    holiday_list = [datetime.date(2023, 9, 4), datetime.date(2023, 9, 1)]
+    for file_name in ["holidays.npy", "holidays.json"]:
+        write_holiday_list(holiday_list, str(tmp_path / file_name))
+        assert sorted(read_holiday_list(str(tmp_path / file_name))) == sorted(holiday_list)
+
+
+def test_persisted_holiday_list_file_is_outside_the_package(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATX_HOLIDAY_LIST_FILE", raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    assert get_persisted_holiday_list_file() == str(tmp_path / "cache" / "datx-common" / "holiday_list.json")
+    monkeypatch.setenv("DATX_HOLIDAY_LIST_FILE", str(tmp_path / "holidays.json"))
+    assert get_persisted_holiday_list_file() == str(tmp_path / "holidays.json")
+
+
+def test_persisted_holiday_list_falls_back_to_the_legacy_file(tmp_path, monkeypatch):
+    holiday_list = [datetime.date(2023, 9, 1)]
+    file_name = str(tmp_path / "cache" / "holiday_list.json")
+    legacy_file_name = str(tmp_path / "legacy.json")
+    monkeypatch.setattr(holiday_dataset, "LEGACY_PERSISTED_HOLIDAY_LIST_FILE", legacy_file_name)
+    with pytest.raises(FileNotFoundError):
+        read_persisted_holiday_list(file_name)
+
+    write_holiday_list(holiday_list, legacy_file_name)
+    assert read_persisted_holiday_list(file_name) == holiday_list
+    # The directory is created on the first write
+    assert persist_holiday_list(holiday_list + [datetime.date(2023, 9, 4)], file_name)
+    assert read_persisted_holiday_list(file_name) == holiday_list + [datetime.date(2023, 9, 4)]
+
+
+def test_persist_holiday_list_ignores_unwritable_locations(tmp_path):
+    (tmp_path / "file").write_text("")
+    assert not persist_holiday_list([datetime.date(2023, 9, 1)], str(tmp_path / "file" / "holiday_list.json"))
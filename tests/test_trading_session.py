@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.trading_calendar import TradingCalendar
+from common.trading_session import TradingSession
+
+
+@pytest.fixture
+def trading_calendar():
+    return TradingCalendar(use_hard_coded_data=True)
+
+
+def test_trading_minutes_between(trading_calendar):
+    session = TradingSession("HOSE", trading_calendar)
+    assert session.minutes_per_session == 255
+
+    # Lunch break is skipped
+    assert session.trading_minutes_between(pd.Timestamp("2023-08-31 11:00"), pd.Timestamp("2023-08-31 13:30")) == 60
+    # 2023-09-01 and 2023-09-04 are holidays
+    assert session.trading_minutes_between(pd.Timestamp("2023-08-31 10:00"), pd.Timestamp("2023-09-05 09:30")) == 225
+
+    start = pd.Series([pd.Timestamp("2023-08-31 09:00:30"), pd.Timestamp("2023-09-02 10:00"), pd.NaT])
+    end = pd.Series([pd.Timestamp("2023-08-31 09:01"), pd.Timestamp("2023-09-05 09:00"), pd.Timestamp("2023-09-05")])
+    result = session.trading_minutes_between(start, end)
+    assert isinstance(result, pd.Series)
+    assert result.iloc[:2].tolist() == [0.5, 0] and np.isnan(result.iloc[2])
+
+
+def test_next_session_open(trading_calendar):
+    session = TradingSession("HOSE", trading_calendar)
+    times = pd.Series(
+        [
+            pd.Timestamp("2023-08-31 09:00"),
+            pd.Timestamp("2023-08-31 11:45"),
+            pd.Timestamp("2023-08-31 14:50"),
+            pd.NaT,
+        ]
+    )
+    assert session.next_session_open(times).tolist() == [
+        pd.Timestamp("2023-08-31 09:00"),
+        pd.Timestamp("2023-08-31 13:00"),
+        pd.Timestamp("2023-09-05 09:00"),
+        pd.NaT,
+    ]
+
+    gmt_session = TradingSession("DERIVATIVES", trading_calendar, timezone="GMT")
+    assert gmt_session.next_session_open(datetime.datetime(2023, 8, 31, 1, 0)) == pd.Timestamp("2023-08-31 01:45")
+    assert gmt_session.is_open(pd.Timestamp("2023-08-31 09:00", tz="Asia/Ho_Chi_Minh"))
+    assert not gmt_session.is_open(datetime.datetime(2023, 8, 31, 5, 0))
+
+
+def test_bar_timestamps(trading_calendar):
+    session = TradingSession("HOSE", trading_calendar)
+    assert len(session.bar_timestamps("2023-08-31", "2023-09-05 23:59", "1min")) == 2 * 255
+
+    hourly = session.bar_timestamps("2023-08-31", "2023-08-31 23:59", "1h")
+    assert [stamp.strftime("%H:%M") for stamp in hourly] == ["09:00", "10:00", "11:00", "13:00", "14:00"]
+
+    # 4h buckets are aligned on midnight GMT like time_bucket
+    gmt_session = TradingSession("HOSE", trading_calendar, timezone="GMT")
+    four_hourly = gmt_session.bar_timestamps("2023-08-31", "2023-08-31 23:59", "4h")
+    assert four_hourly.tolist() == [pd.Timestamp("2023-08-31 00:00"), pd.Timestamp("2023-08-31 04:00")]
+
+    with pytest.raises(ValueError):
+        session.bar_timestamps("2023-08-31", "2023-09-05", "2min")